@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+意图规则遮蔽/冗余分析脚本
+
+找出重复、被子串遮蔽、跨标签冲突以及永远不会成为最佳匹配的规则，
+结果按标签分组输出，可用 --output 保存完整 JSON 报告。
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.app.core.database import SessionLocal
+from backend.app.services.rule_analysis import analyze_rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析意图规则的重复、遮蔽和冲突")
+    parser.add_argument("--output", help="把完整报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    print("🔍 正在分析意图规则...")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        report = analyze_rules(db)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    summary = report["summary"]
+    print(f"✅ 分析完成: {summary['rules']} 条规则, {summary['patterns']} 个模式, 耗时 {elapsed:.2f}s")
+    for kind, count in summary.items():
+        if kind not in ("rules", "patterns"):
+            print(f"   - {kind}: {count}")
+
+    for group in report["labels"]:
+        print(f"\n📌 {group['label_code']} ({group['label_name'] or '-'})")
+        for finding in group["findings"]:
+            if "by_rule_code" in finding:
+                print(f"   [{finding['type']}] {finding['rule_code']} '{finding['pattern']}'"
+                      f" <- {finding['by_rule_code']} '{finding['by_pattern']}' ({finding['by_label_code']})")
+            else:
+                detail = f" ({finding['rule_type']})" if "rule_type" in finding else ""
+                print(f"   [{finding['type']}] {finding['rule_code']}{detail}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n📄 报告已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+变更日志API: 增量同步（分页拉取和 SSE 推送）
+"""
+import asyncio
+import time
+from typing import Optional
+
+import anyio.to_thread
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal, get_db
+from backend.app.core.fast_json import dumps
+from backend.app.core.schemas import ResponseModel
+from backend.app.services.change_log import change_log, change_notifier
+
+router = APIRouter()
+
+@router.get("/", response_model=ResponseModel)
+def get_changes(
+    since: int = Query(0, ge=0, description="上次同步到的序号，返回其后的变更"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="每页条数，为空时使用 CHANGE_FEED_PAGE_SIZE"),
+    db: Session = Depends(get_db)
+):
+    """
+    seq 大于 since 的变更，按序号升序分页；has_more 为真时以 next_since 继续拉取。
+    reset_required 为真时所需的变更已被清理，应整体重新同步后从 latest_seq 继续
+    """
+    return ResponseModel(data=change_log.changes_since(db, since, limit or settings.CHANGE_FEED_PAGE_SIZE))
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="从该序号之后开始推送，为空时只推送新的变更"),
+    last_event_id: Optional[str] = Header(None, description="断线重连时由 EventSource 自动携带"),
+):
+    """
+    以 Server-Sent Events 推送变更: 每条变更一个 change 事件 (id 为序号)，
+    需要整体重新同步时发送 reset 事件，空闲时定期发送注释行作为心跳
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id)
+    if since is None:
+        since = await anyio.to_thread.run_sync(_latest_seq)
+    wake = change_notifier.subscribe(limit=settings.CHANGE_FEED_MAX_STREAMS)
+    if wake is None:
+        raise HTTPException(status_code=503, detail="变更推送连接数已满", headers={"Retry-After": "5"})
+    return _ChangeStream(
+        wake,
+        _change_events(request, since, wake),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class _ChangeStream(StreamingResponse):
+    """响应结束（包括未能开始发送）时注销订阅，归还连接名额"""
+
+    def __init__(self, wake: asyncio.Event, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wake = wake
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            change_notifier.unsubscribe(self.wake)
+
+def _latest_seq() -> int:
+    with SessionLocal() as db:
+        return change_log.latest_seq(db)
+
+def _load_page(since: int) -> dict:
+    with SessionLocal() as db:
+        return change_log.changes_since(db, since, settings.CHANGE_FEED_PAGE_SIZE)
+
+async def _change_events(request: Request, since: int, wake: asyncio.Event):
+    """数据库是唯一的数据源: 收到本进程的写入通知或轮询间隔到期时读取 since 之后的变更"""
+    cursor = since
+    last_sent = time.monotonic()
+    try:
+        yield b"retry: 3000\n\n"
+        while not await request.is_disconnected():
+            # 先清除再读取，读取期间到达的通知不会丢失
+            wake.clear()
+            page = await anyio.to_thread.run_sync(_load_page, cursor)
+            if page["reset_required"]:
+                yield _event("reset", page["latest_seq"], {"latest_seq": page["latest_seq"]})
+                cursor = page["latest_seq"]
+                last_sent = time.monotonic()
+                continue
+            for change in page["changes"]:
+                yield _event("change", change["seq"], change)
+            if page["changes"]:
+                cursor = page["next_since"]
+                last_sent = time.monotonic()
+            if page["has_more"]:
+                continue
+            if time.monotonic() - last_sent >= settings.CHANGE_FEED_HEARTBEAT_INTERVAL:
+                yield b": keepalive\n\n"
+                last_sent = time.monotonic()
+            try:
+                await asyncio.wait_for(wake.wait(), settings.CHANGE_FEED_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        change_notifier.unsubscribe(wake)
+
+def _event(name: str, event_id: int, data: dict) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, name.encode("ascii"), dumps(data))
@@ -0,0 +1,13 @@
+"""
+调试API
+"""
+from fastapi import APIRouter, Query
+from backend.app.core.schemas import ResponseModel
+from backend.app.services.memory_report import memory_report
+
+router = APIRouter()
+
+@router.get("/memory", response_model=ResponseModel)
+def get_memory_report(deep: bool = Query(True, description="逐个对象累加各结构的字节数 (大索引较慢)")):
+    """当前 worker 的进程内存和各内存结构的字节数，用于估算容器内存"""
+    return ResponseModel(data=memory_report(deep))
@@ -1,84 +1,46 @@
 """
 意图识别API (V2)
 """
+import logging
+import time
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.fast_json import dumps
 from backend.app.core.schemas import (
-    IntentRecognitionRequest, IntentRecognitionResponse,
-    ResponseModel, ExtractedEntity, MatchedRule
+    DocumentRecognitionRequest, IntentRecognitionBatchRequest, IntentRecognitionResponse,
+    IntentRecognitionRequest, ResponseModel
 )
-from backend.app.services.intent_rule_service import IntentRuleService
-from backend.app.services.item_service import ItemService
-from backend.app.services.label_service import LabelService
+from backend.app.services.document_recognition import DocumentRecognizer
+from backend.app.services.intent_recognition_service import IntentRecognitionService
+from backend.app.services.recognition_bundle import get_recognition_bundle
+from backend.app.services.recognition_log import recognition_log
+from backend.app.services.recognition_stats import recognition_stats
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/", response_model=ResponseModel)
-async def recognize_intent(
+def recognize_intent(
     request: IntentRecognitionRequest,
     db: Session = Depends(get_db)
 ):
-    """意图识别接口"""
+    """
+    意图识别接口 (同步执行，数据库查询和匹配在线程池中进行，不阻塞事件循环)。
+    与正在进行的相同请求合并，只识别一次
+    """
+    started = time.perf_counter()
     try:
         text = request.text.strip()
         if not text:
             raise HTTPException(status_code=400, detail="输入文本不能为空")
         
-        # 1. 初始化服务
-        rule_service = IntentRuleService(db)
-        item_service = ItemService(db)
-        label_service = LabelService(db)
-        
-        # 2. 匹配规则
-        matched_rules_data = rule_service.match_rules(text)
-        
-        if not matched_rules_data:
-            return ResponseModel(
-                data=IntentRecognitionResponse(
-                    intent="未识别",
-                    confidence=0.0,
-                    matched_rules=[],
-                    extracted_entities=[],
-                    suggested_actions=["请提供更明确的描述"]
-                )
-            )
-        
-        # 3. 获取最佳匹配和目标意图
-        best_rule = matched_rules_data[0]
-        target_label = label_service.get_by_code(best_rule["label_code"])
-        intent_name = target_label.label_name if target_label else "未知意图"
-        
-        # 4. 提取实体
-        extracted_entities_data = item_service.extract_entities_from_text(text)
-        
-        # 5. 生成建议操作 (此函数可保持不变)
-        suggested_actions = generate_suggested_actions(intent_name, extracted_entities_data)
-        
-        # 6. 构建响应
-        response_data = IntentRecognitionResponse(
-            intent=intent_name,
-            confidence=best_rule["confidence"],
-            matched_rules=[
-                MatchedRule(
-                    rule_code=rule["rule_code"],
-                    rule_type=rule["rule_type"],
-                    rule_entity=rule["rule_entity"],
-                    matched_text=rule["matched_text"],
-                    confidence=rule["confidence"]
-                ) for rule in matched_rules_data
-            ],
-            extracted_entities=[
-                ExtractedEntity(
-                    entity_type=entity["entity_type"],
-                    entity_value=entity["entity_value"],
-                    start_pos=entity["start_pos"],
-                    end_pos=entity["end_pos"]
-                ) for entity in extracted_entities_data
-            ],
-            suggested_actions=suggested_actions
-        )
-        
+        label_code, response_data, _ = IntentRecognitionService(db).recognize_coalesced(text, request.context)
+        record_result(request.text, request.context, label_code, response_data,
+                      (time.perf_counter() - started) * 1000)
         return ResponseModel(data=response_data)
         
     except HTTPException:
@@ -89,16 +51,60 @@ async def recognize_intent(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_suggested_actions(intent_name: str, extracted_entities: list) -> list:
-    """生成建议操作"""
-    actions = []
-    if "故障码" in intent_name:
-        actions.append("查询故障码详细信息")
-        actions.append("提供故障码解决方案")
-        if extracted_entities:
-            actions.append(f"分析{extracted_entities[0]['entity_value']}相关故障")
-    elif "代码" in intent_name or "编程" in intent_name:
-        actions.append("提供代码示例")
-    else:
-        actions.append("提供相关帮助")
-    return actions
+@router.post("/batch", response_model=ResponseModel)
+def recognize_intent_batch(request: IntentRecognitionBatchRequest, db: Session = Depends(get_db)):
+    """
+    批量意图识别，按输入顺序返回每条文本的结果。
+    同一批内的重复文本、以及与其他正在进行的请求相同的文本只识别一次；coalesced 为复用结果的条数
+    """
+    if len(request.texts) > settings.RECOGNITION_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"单次最多识别 {settings.RECOGNITION_BATCH_MAX_TEXTS} 条文本")
+    texts = [text.strip() for text in request.texts]
+    if not all(texts):
+        raise HTTPException(status_code=400, detail="输入文本不能为空")
+
+    started = time.perf_counter()
+    results = IntentRecognitionService(db).recognize_batch(texts, request.context)
+    # 批量请求的耗时均摊到每条文本
+    elapsed_ms = (time.perf_counter() - started) * 1000 / len(texts)
+    for text, (label_code, response_data, _) in zip(request.texts, results):
+        record_result(text, request.context, label_code, response_data, elapsed_ms)
+    return ResponseModel(data={
+        "results": [response_data for _, response_data, _ in results],
+        "coalesced": sum(1 for _, _, shared in results if shared),
+    })
+
+@router.post("/document")
+def recognize_document(request: DocumentRecognitionRequest, db: Session = Depends(get_db)):
+    """
+    长文档识别: 按窗口返回意图和实体 (NDJSON 流，每行一个 type=segment 的窗口结果，按完成顺序)，
+    最后一行为 type=summary 的汇总。实体位置为全文偏移，跨窗口已去重。
+    响应开始后出错时以一行 type=error 结束（没有 summary 行），客户端据此区分中断和正常结束。
+    """
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="输入文本不能为空")
+    if len(request.text) > settings.DOCUMENT_MAX_CHARS:
+        raise HTTPException(status_code=413, detail=f"文档超过 {settings.DOCUMENT_MAX_CHARS} 个字符")
+    window_chars = request.window_chars or settings.DOCUMENT_WINDOW_CHARS
+    overlap_chars = settings.DOCUMENT_OVERLAP_CHARS if request.overlap_chars is None else request.overlap_chars
+    if overlap_chars >= window_chars:
+        raise HTTPException(status_code=400, detail="overlap_chars 必须小于 window_chars")
+
+    # 在返回流之前取定快照，整篇文档使用同一版本
+    recognizer = DocumentRecognizer(get_recognition_bundle(db), window_chars, overlap_chars, request.mode)
+    return StreamingResponse(_ndjson(recognizer.recognize(request.text)), media_type="application/x-ndjson")
+
+def _ndjson(results):
+    try:
+        for result in results:
+            yield dumps(result) + b"\n"
+    except Exception as e:
+        logger.exception("document recognition failed")
+        yield dumps({"type": "error", "detail": str(e)}) + b"\n"
+
+def record_result(text: str, context, label_code, response_data: IntentRecognitionResponse,
+                  elapsed_ms: float) -> None:
+    """记录识别统计（含补全热度）和请求日志（均只写内存，由后台线程落盘）"""
+    entity_values = (e.entity_value for e in response_data.extracted_entities if not e.from_context)
+    recognition_stats.record_recognition(label_code, text, elapsed_ms, entity_values)
+    recognition_log.submit(text, context, response_data, elapsed_ms)
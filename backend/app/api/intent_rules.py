@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.etag import ConditionalGet
+from backend.app.core.fast_json import fast_json_response
 from backend.app.services.intent_rule_service import IntentRuleService
-from backend.app.core.schemas import IntentRuleCreate, IntentRuleUpdate, IntentRuleResponse
+from backend.app.services.rule_analysis import analyze_rules
+from backend.app.core.schemas import IntentRuleCreate, IntentRuleUpdate, IntentRuleResponse, ResponseModel
 
 router = APIRouter()
 
@@ -15,11 +19,18 @@ def create_rule(rule: IntentRuleCreate, db: Session = Depends(get_db)):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/by_label/{label_code}", response_model=List[IntentRuleResponse])
-def get_rules_by_label(label_code: str, db: Session = Depends(get_db)):
+@router.get("/by_label/{label_code}", response_model=List[IntentRuleResponse], dependencies=[Depends(ConditionalGet("intent_rules"))])
+def get_rules_by_label(label_code: str, response: Response, db: Session = Depends(get_db)):
     service = IntentRuleService(db)
+    if settings.FAST_RESPONSE_ENABLED:
+        return fast_json_response(service.get_by_label_rows(label_code), response)
     return service.get_by_label(label_code)
 
+@router.get("/analysis", response_model=ResponseModel, dependencies=[Depends(ConditionalGet("intent_rules"))])
+def get_rule_analysis(db: Session = Depends(get_db)):
+    """规则遮蔽/冗余分析报告，按标签分组"""
+    return ResponseModel(data=analyze_rules(db))
+
 @router.get("/id/{rule_id}", response_model=IntentRuleResponse)
 def get_rule_by_id(rule_id: int, db: Session = Depends(get_db)):
     service = IntentRuleService(db)
@@ -39,7 +50,10 @@ def get_rule(rule_code: str, db: Session = Depends(get_db)):
 @router.put("/id/{rule_id}", response_model=IntentRuleResponse)
 def update_rule_by_id(rule_id: int, rule: IntentRuleUpdate, db: Session = Depends(get_db)):
     service = IntentRuleService(db)
-    db_rule = service.update_by_id(rule_id, rule)
+    try:
+        db_rule = service.update_by_id(rule_id, rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if db_rule is None:
         raise HTTPException(status_code=404, detail="Rule not found")
     return db_rule
@@ -47,7 +61,10 @@ def update_rule_by_id(rule_id: int, rule: IntentRuleUpdate, db: Session = Depend
 @router.put("/{rule_code}", response_model=IntentRuleResponse)
 def update_rule(rule_code: str, rule: IntentRuleUpdate, db: Session = Depends(get_db)):
     service = IntentRuleService(db)
-    db_rule = service.update(rule_code, rule)
+    try:
+        db_rule = service.update(rule_code, rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if db_rule is None:
         raise HTTPException(status_code=404, detail="Rule not found")
     return db_rule
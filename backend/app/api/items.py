@@ -1,25 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.etag import ConditionalGet
+from backend.app.core.fast_json import envelope, fast_json_response
+from backend.app.services.autocomplete_index import autocomplete_index
 from backend.app.services.item_service import ItemService
-from backend.app.core.schemas import ItemCreate, ItemUpdate, ItemResponse, ResponseModel
+from backend.app.services.surface_index import SurfaceCollisionError
+from backend.app.core.schemas import (
+    ItemCreate, ItemUpdate, ItemResponse, ItemSubtreeCopyRequest, ResponseModel, SubtreeMoveRequest
+)
 
 router = APIRouter()
 
+def _collision_conflict(e: SurfaceCollisionError) -> HTTPException:
+    return HTTPException(status_code=409, detail={"message": str(e), "collisions": e.collisions})
+
 @router.post("/", response_model=ItemResponse)
-def create_item(item: ItemCreate, db: Session = Depends(get_db)):
+def create_item(
+    item: ItemCreate,
+    allow_collision: bool = Query(False, description="允许名称/同义词与其他实体重复"),
+    db: Session = Depends(get_db)
+):
     service = ItemService(db)
     try:
-        return service.create(item)
+        return service.create(item, allow_collision=allow_collision)
+    except SurfaceCollisionError as e:
+        raise _collision_conflict(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/by_label/{label_code}", response_model=ResponseModel)
-def get_items_by_label(label_code: str, db: Session = Depends(get_db)):
+@router.get("/by_label/{label_code}", response_model=ResponseModel, dependencies=[Depends(ConditionalGet("items"))])
+def get_items_by_label(label_code: str, response: Response, db: Session = Depends(get_db)):
     service = ItemService(db)
     # Service层已经返回了包含parent_item_name的字典列表
-    items_data = service.get_by_label(label_code)
+    if settings.FAST_RESPONSE_ENABLED:
+        items_data = service.get_by_label_rows(label_code)
+    else:
+        items_data = service.get_by_label(label_code)
     # 确保同义词格式正确，使用逗号连接
     for item in items_data:
         # 将同义词列表转换为逗号连接的字符串
@@ -27,8 +46,31 @@ def get_items_by_label(label_code: str, db: Session = Depends(get_db)):
             item["synonyms_text"] = ", ".join(item["synonyms"])
         else:
             item["synonyms_text"] = ""
+    if settings.FAST_RESPONSE_ENABLED:
+        return fast_json_response(envelope(items_data), response)
     return ResponseModel(data=items_data)
 
+@router.get("/autocomplete", response_model=ResponseModel)
+def autocomplete_items(
+    prefix: str = Query(..., min_length=1, description="输入的前缀"),
+    label_code: Optional[str] = Query(None, description="限定标签编码"),
+    active_only: bool = Query(False, description="仅返回可用的实体"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: Session = Depends(get_db)
+):
+    """按前缀补全实体名称和同义词，按识别热度、更新时间排序"""
+    index = autocomplete_index.get(db)
+    return ResponseModel(data=index.complete(prefix, limit=limit, label_code=label_code, active_only=active_only))
+
+@router.get("/collisions", response_model=ResponseModel)
+def get_surface_collisions(
+    system_code: str = Query(..., description="体系编码"),
+    db: Session = Depends(get_db)
+):
+    """冲突报告: 体系内被多个可用实体共用的名称/同义词"""
+    collisions = ItemService(db).collision_report(system_code)
+    return ResponseModel(data={"system_code": system_code, "total": len(collisions), "collisions": collisions})
+
 @router.get("/children_of/{parent_item_code}", response_model=List[ItemResponse])
 def get_item_children(parent_item_code: str, db: Session = Depends(get_db)):
     service = ItemService(db)
@@ -43,9 +85,17 @@ def get_item(item_code: str, db: Session = Depends(get_db)):
     return db_item
 
 @router.put("/{item_code}", response_model=ItemResponse)
-def update_item(item_code: str, item: ItemUpdate, db: Session = Depends(get_db)):
+def update_item(
+    item_code: str,
+    item: ItemUpdate,
+    allow_collision: bool = Query(False, description="允许名称/同义词与其他实体重复"),
+    db: Session = Depends(get_db)
+):
     service = ItemService(db)
-    db_item = service.update(item_code, item)
+    try:
+        db_item = service.update(item_code, item, allow_collision=allow_collision)
+    except SurfaceCollisionError as e:
+        raise _collision_conflict(e)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
@@ -56,3 +106,43 @@ def delete_item(item_code: str, db: Session = Depends(get_db)):
     if not service.delete(item_code):
         raise HTTPException(status_code=404, detail="Item not found")
     return {"ok": True}
+
+@router.post("/{item_code}/move", response_model=ResponseModel)
+def move_item_subtree(item_code: str, request: SubtreeMoveRequest, db: Session = Depends(get_db)):
+    """把实体及其子树移到新的父实体下"""
+    service = ItemService(db)
+    try:
+        result = service.move_subtree(item_code, request.new_parent_code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return ResponseModel(data=result)
+
+@router.post("/{item_code}/copy", response_model=ResponseModel)
+def copy_item_subtree(item_code: str, request: ItemSubtreeCopyRequest, db: Session = Depends(get_db)):
+    """深拷贝实体子树及同义词，新编码为前缀 + 原编码"""
+    service = ItemService(db)
+    try:
+        result = service.copy_subtree(item_code, request.new_parent_code, request.code_prefix, active=request.active)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return ResponseModel(data=result)
+
+@router.delete("/{item_code}/subtree", response_model=ResponseModel)
+def delete_item_subtree(
+    item_code: str,
+    hard: bool = Query(False, description="为真时物理删除，否则只停用"),
+    db: Session = Depends(get_db)
+):
+    """停用（或删除）实体及其全部子实体"""
+    service = ItemService(db)
+    try:
+        result = service.delete_subtree(item_code, hard)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return ResponseModel(data=result)
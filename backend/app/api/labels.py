@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.etag import ConditionalGet
+from backend.app.core.fast_json import envelope, fast_json_response
 from backend.app.services.label_service import LabelService
-from backend.app.core.schemas import LabelCreate, LabelUpdate, LabelResponse, ResponseModel
+from backend.app.core.schemas import (
+    LabelCreate, LabelUpdate, LabelResponse, LabelSubtreeCopyRequest, ResponseModel, SubtreeMoveRequest
+)
 
 router = APIRouter()
 
@@ -16,8 +21,10 @@ def create_label(label: LabelCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/by_system/{system_code}", response_model=List[LabelResponse])
-def get_labels_by_system(system_code: str, db: Session = Depends(get_db)):
+def get_labels_by_system(system_code: str, response: Response, db: Session = Depends(get_db)):
     service = LabelService(db)
+    if settings.FAST_RESPONSE_ENABLED:
+        return fast_json_response(service.get_by_system_rows(system_code), response)
     return service.get_by_system(system_code)
 
 @router.get("/children_of/{parent_label_code}", response_model=List[LabelResponse])
@@ -25,8 +32,8 @@ def get_label_children(parent_label_code: str, db: Session = Depends(get_db)):
     service = LabelService(db)
     return service.get_children(parent_label_code)
 
-@router.get("/tree", response_model=ResponseModel)
-def get_label_tree_endpoint(label_type: str, db: Session = Depends(get_db)):
+@router.get("/tree", response_model=ResponseModel, dependencies=[Depends(ConditionalGet("labels"))])
+def get_label_tree_endpoint(label_type: str, response: Response, db: Session = Depends(get_db)):
     """获取指定类型的标签树"""
     # Map the old label_type to the new system_code for frontend compatibility
     system_code_map = {
@@ -39,6 +46,8 @@ def get_label_tree_endpoint(label_type: str, db: Session = Depends(get_db)):
         
     service = LabelService(db)
     tree_data = service.get_label_tree(system_code)
+    if settings.FAST_RESPONSE_ENABLED:
+        return fast_json_response(envelope(tree_data), response)
     return ResponseModel(data=tree_data)
 
 @router.get("/{label_code}", response_model=LabelResponse)
@@ -63,3 +72,46 @@ def delete_label(label_code: str, db: Session = Depends(get_db)):
     if not service.delete(label_code):
         raise HTTPException(status_code=404, detail="Label not found")
     return {"ok": True}
+
+@router.post("/{label_code}/move", response_model=ResponseModel)
+def move_label_subtree(label_code: str, request: SubtreeMoveRequest, db: Session = Depends(get_db)):
+    """把标签及其子树移到新的父标签下，层级随之重新计算"""
+    service = LabelService(db)
+    try:
+        result = service.move_subtree(label_code, request.new_parent_code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Label not found")
+    return ResponseModel(data=result)
+
+@router.post("/{label_code}/copy", response_model=ResponseModel)
+def copy_label_subtree(label_code: str, request: LabelSubtreeCopyRequest, db: Session = Depends(get_db)):
+    """深拷贝标签子树（可含实体、同义词和规则），新编码为前缀 + 原编码"""
+    service = LabelService(db)
+    try:
+        result = service.copy_subtree(
+            label_code, request.new_parent_code, request.code_prefix,
+            with_items=request.with_items, with_rules=request.with_rules, active=request.active,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Label not found")
+    return ResponseModel(data=result)
+
+@router.delete("/{label_code}/subtree", response_model=ResponseModel)
+def delete_label_subtree(
+    label_code: str,
+    hard: bool = Query(True, description="为真时删除标签子树及其下的实体、同义词和规则，否则只停用其下的实体和规则"),
+    db: Session = Depends(get_db)
+):
+    """删除标签子树（或停用其下的实体和规则）"""
+    service = LabelService(db)
+    try:
+        result = service.delete_subtree(label_code, hard)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Label not found")
+    return ResponseModel(data=result)
@@ -0,0 +1,36 @@
+"""
+搜索API
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from backend.app.core.database import get_db
+from backend.app.core.schemas import ResponseModel
+from backend.app.services.search_index import KIND_NAMES, search_index
+
+router = APIRouter()
+
+@router.get("/", response_model=ResponseModel)
+def search(
+    q: str = Query(..., min_length=1, description="查询文本"),
+    kinds: Optional[str] = Query(None, description="逗号分隔的类型: item,synonym,label,rule"),
+    system_code: Optional[str] = Query(None, description="限定体系编码"),
+    label_code: Optional[str] = Query(None, description="限定标签编码"),
+    active_only: bool = Query(False, description="仅返回可用的实体/规则"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    db: Session = Depends(get_db)
+):
+    """在实体名称、同义词、标签名称和规则内容中模糊搜索"""
+    kind_list = None
+    if kinds:
+        kind_list = [k.strip() for k in kinds.split(",") if k.strip()]
+        invalid = [k for k in kind_list if k not in KIND_NAMES]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid kinds: {', '.join(invalid)}. Must be one of {', '.join(KIND_NAMES)}.")
+
+    index = search_index.get(db)
+    results = index.search(
+        q, limit=limit, kinds=kind_list, system_code=system_code,
+        label_code=label_code, active_only=active_only
+    )
+    return ResponseModel(data=results)
@@ -0,0 +1,49 @@
+"""
+识别快照API: 草稿发布、回滚和快照查询
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+from backend.app.core.database import get_db
+from backend.app.core.schemas import RecognitionSnapshotResponse, ResponseModel, SnapshotPublishRequest
+from backend.app.services.recognition_bundle import SnapshotError
+from backend.app.services.snapshot_service import SnapshotService
+
+router = APIRouter()
+
+@router.get("/", response_model=List[RecognitionSnapshotResponse])
+def get_snapshots(
+    include_expired: bool = Query(False, description="是否包含已过期（不可回滚）的快照"),
+    db: Session = Depends(get_db)
+):
+    """已发布的快照列表，按发布时间倒序"""
+    service = SnapshotService(db)
+    return [service.to_dict(snapshot) for snapshot in service.get_all(include_expired)]
+
+@router.get("/current", response_model=RecognitionSnapshotResponse)
+def get_current_snapshot(db: Session = Depends(get_db)):
+    service = SnapshotService(db)
+    snapshot = service.get_current()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No snapshot has been published")
+    return service.to_dict(snapshot)
+
+@router.get("/draft", response_model=ResponseModel)
+def get_draft_status(db: Session = Depends(get_db)):
+    """草稿是否有未发布的修改"""
+    return ResponseModel(data=SnapshotService(db).draft_status())
+
+@router.post("/publish", response_model=RecognitionSnapshotResponse)
+def publish_snapshot(request: SnapshotPublishRequest, db: Session = Depends(get_db)):
+    """把当前草稿编译为新快照并原子切换，识别立即使用新快照"""
+    service = SnapshotService(db)
+    return service.to_dict(service.publish(request.note))
+
+@router.post("/{version}/rollback", response_model=RecognitionSnapshotResponse)
+def rollback_snapshot(version: str, db: Session = Depends(get_db)):
+    """切换回保留中的历史快照（草稿不变）"""
+    service = SnapshotService(db)
+    try:
+        return service.to_dict(service.rollback(version))
+    except SnapshotError as e:
+        raise HTTPException(status_code=404, detail=str(e))
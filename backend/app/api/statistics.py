@@ -0,0 +1,73 @@
+"""
+统计和分析API
+"""
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from backend.app.core.admission import admission_controller
+from backend.app.core.database import get_db
+from backend.app.core.schemas import ResponseModel
+from backend.app.services.recognition_coalescing import recognition_flight
+from backend.app.services.recognition_log import recognition_log
+from backend.app.services.regex_rules import regex_stats
+from backend.app.services.session_context import session_store
+from backend.app.services.statistics_service import StatisticsService
+
+router = APIRouter()
+
+@router.get("/labels", response_model=ResponseModel)
+def get_label_statistics(
+    system_code: Optional[str] = Query(None, description="限定体系编码"),
+    since: Optional[datetime] = Query(None, description="起始时间 (含)"),
+    until: Optional[datetime] = Query(None, description="结束时间 (不含)"),
+    db: Session = Depends(get_db)
+):
+    """标签统计: 各标签的规则数、实体数和识别命中次数"""
+    return ResponseModel(data=StatisticsService(db).label_stats(system_code, since, until))
+
+@router.get("/rules", response_model=ResponseModel)
+def get_rule_statistics(
+    label_code: Optional[str] = Query(None, description="限定意图标签编码"),
+    unused_only: bool = Query(False, description="只返回统计区间内未命中过的可用规则"),
+    since: Optional[datetime] = Query(None, description="起始时间 (含)"),
+    until: Optional[datetime] = Query(None, description="结束时间 (不含)"),
+    db: Session = Depends(get_db)
+):
+    """规则统计: 各规则的命中次数，便于找出从未命中的规则"""
+    return ResponseModel(data=StatisticsService(db).rule_stats(label_code, unused_only, since, until))
+
+@router.get("/intent-recognition", response_model=ResponseModel)
+def get_recognition_statistics(
+    since: Optional[datetime] = Query(None, description="起始时间 (含)"),
+    until: Optional[datetime] = Query(None, description="结束时间 (不含)"),
+    top_unrecognized: int = Query(20, ge=0, le=200, description="返回的高频未识别文本数量"),
+    db: Session = Depends(get_db)
+):
+    """意图识别统计: 识别量、识别率、耗时分布和高频未识别文本"""
+    return ResponseModel(data=StatisticsService(db).recognition_stats(since, until, top_unrecognized))
+
+@router.get("/recognition-log", response_model=ResponseModel)
+def get_recognition_log_statistics():
+    """识别请求日志的队列深度和写入、采样、丢弃计数（当前 worker）"""
+    return ResponseModel(data=recognition_log.stats())
+
+@router.get("/session-context", response_model=ResponseModel)
+def get_session_context_statistics():
+    """多轮会话上下文存储的会话数、估算内存和淘汰次数（进程内后端为当前 worker）"""
+    return ResponseModel(data=session_store.stats() if session_store is not None else {"backend": None})
+
+@router.get("/coalescing", response_model=ResponseModel)
+def get_coalescing_statistics():
+    """相同识别请求合并的 leader 数、被合并的请求数和等待超时次数（当前 worker）"""
+    return ResponseModel(data=recognition_flight.stats())
+
+@router.get("/regex-rules", response_model=ResponseModel)
+def get_regex_rule_statistics():
+    """正则规则的匹配引擎、扫描次数、超出时间预算的次数和编译缓存（当前 worker）"""
+    return ResponseModel(data=regex_stats.stats())
+
+@router.get("/admission", response_model=ResponseModel)
+def get_admission_statistics():
+    """准入控制各类请求的并发数、排队深度、放行和拒绝计数、排队耗时（当前 worker，本接口不受准入控制）"""
+    return ResponseModel(data=admission_controller.stats())
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
+from backend.app.core.config import settings
 from backend.app.core.database import get_db
+from backend.app.core.etag import ConditionalGet
+from backend.app.core.fast_json import envelope, fast_json_response
 from backend.app.services.tag_system_service import TagSystemService
-from backend.app.core.schemas import TagSystemCreate, TagSystemUpdate, TagSystemResponse
+from backend.app.core.schemas import ResponseModel, TagSystemCloneRequest, TagSystemCreate, TagSystemUpdate, TagSystemResponse
 
 router = APIRouter()
 
@@ -15,11 +18,37 @@ def create_tag_system(system: TagSystemCreate, db: Session = Depends(get_db)):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/", response_model=List[TagSystemResponse])
-def get_all_tag_systems(db: Session = Depends(get_db)):
+@router.get("/", response_model=List[TagSystemResponse], dependencies=[Depends(ConditionalGet("tag_systems"))])
+def get_all_tag_systems(response: Response, db: Session = Depends(get_db)):
     service = TagSystemService(db)
+    if settings.FAST_RESPONSE_ENABLED:
+        return fast_json_response(service.get_all(), response)
     return service.get_all()
 
+@router.get(
+    "/{system_code}/export",
+    dependencies=[Depends(ConditionalGet("tag_systems", "labels", "items", "intent_rules"))],
+)
+def export_tag_system(system_code: str, response: Response, db: Session = Depends(get_db)):
+    """导出整个体系的数据（始终走快速序列化路径）"""
+    service = TagSystemService(db)
+    data = service.export_rows(system_code)
+    if data is None:
+        raise HTTPException(status_code=404, detail="TagSystem not found")
+    return fast_json_response(envelope(data), response)
+
+@router.post("/{system_code}/clone", response_model=ResponseModel)
+def clone_tag_system(system_code: str, request: TagSystemCloneRequest, db: Session = Depends(get_db)):
+    """克隆整个体系（标签、实体、同义词、意图规则）到新的体系编码下"""
+    service = TagSystemService(db)
+    try:
+        result = service.clone(system_code, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="TagSystem not found")
+    return ResponseModel(data=result)
+
 @router.get("/{system_code}", response_model=TagSystemResponse)
 def get_tag_system(system_code: str, db: Session = Depends(get_db)):
     service = TagSystemService(db)
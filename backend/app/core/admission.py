@@ -0,0 +1,222 @@
+"""
+准入控制 (admission control) 与过载降级
+
+请求按路径分为三类，各自有独立的并发上限和有界等待队列:
+- recognition: 意图识别接口 (/api/v1/intent-recognition)
+- interactive: 随输入调用的只读查询（实体前缀补全、搜索），排队时间很短
+- admin: 其他 /api/ 接口（体系、标签、实体、规则的增删改查，子树复制/删除、导入，统计等）
+健康检查、就绪检查、调试接口、静态文件、准入统计接口本身和变更推送 (SSE) 长连接不受限制。
+
+并发已满时请求进入 FIFO 队列等待；队列已满、或排队时间超过该类的截止时间时，立即返回 503 并带上 Retry-After，
+而不是让请求在线程池中无限排队、拖慢所有人。各类互不占用名额，管理端的批量任务不会挤占识别和补全流量。
+各类的并发上限之和应不超过线程池大小（应用启动时会把线程池扩大到至少该值）。
+
+统计（当前 worker）: 进行中/排队中的请求数、排队峰值、放行数、两种拒绝的次数和排队耗时。
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from backend.app.core.config import settings
+
+RECOGNITION_PREFIX = "/api/v1/intent-recognition"
+
+# 随输入调用的只读查询
+INTERACTIVE_PATHS = ("/api/v1/items/autocomplete", "/api/v1/search")
+
+# 不受准入控制的接口（过载时仍需可用；长连接的变更推送不占用并发名额）
+EXEMPT_PATHS = ("/api/v1/statistics/admission", "/api/v1/changes/stream")
+
+
+class AdmissionRejected(Exception):
+    """请求未被放行"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class AdmissionGate:
+    """
+    一类请求的并发上限 + 有界 FIFO 等待队列 + 排队截止时间。
+    只在事件循环线程中使用，不需要加锁；释放名额时直接移交给队首的等待者。
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = max(1, math.ceil(queue_timeout))
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.peak_queued = 0
+        self.admitted = 0
+        self.admitted_after_wait = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """取得名额，返回排队时间（秒）；未被放行时抛出 AdmissionRejected"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queued = max(self.peak_queued, len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._abandon(waiter)
+                self.rejected_timeout += 1
+                raise AdmissionRejected("queue_timeout")
+        except asyncio.CancelledError:
+            # 客户端在排队期间断开: 已被移交的名额要还回去
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._abandon(waiter)
+            raise
+        waited = time.perf_counter() - started
+        self.admitted += 1
+        self.admitted_after_wait += 1
+        self.wait_ms_total += waited * 1000
+        self.wait_ms_max = max(self.wait_ms_max, waited * 1000)
+        return waited
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """归还名额: 有等待者时直接移交给队首，否则减少进行中的计数"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        admitted_after_wait = self.admitted_after_wait
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "admitted_after_wait": admitted_after_wait,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": round(self.wait_ms_total / admitted_after_wait, 2) if admitted_after_wait else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 2),
+        }
+
+
+def classify(path: str) -> Optional[str]:
+    """请求类别，不受限制的请求返回 None"""
+    if not path.startswith("/api/") or path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(RECOGNITION_PREFIX):
+        return "recognition"
+    if path.startswith(INTERACTIVE_PATHS):
+        return "interactive"
+    return "admin"
+
+
+class AdmissionController:
+    """各类请求的准入闸门"""
+
+    def __init__(self):
+        self.gates: Dict[str, AdmissionGate] = {
+            "recognition": AdmissionGate(
+                "recognition", settings.ADMISSION_RECOGNITION_CONCURRENCY,
+                settings.ADMISSION_RECOGNITION_QUEUE, settings.ADMISSION_RECOGNITION_QUEUE_TIMEOUT,
+            ),
+            "interactive": AdmissionGate(
+                "interactive", settings.ADMISSION_INTERACTIVE_CONCURRENCY,
+                settings.ADMISSION_INTERACTIVE_QUEUE, settings.ADMISSION_INTERACTIVE_QUEUE_TIMEOUT,
+            ),
+            "admin": AdmissionGate(
+                "admin", settings.ADMISSION_ADMIN_CONCURRENCY,
+                settings.ADMISSION_ADMIN_QUEUE, settings.ADMISSION_ADMIN_QUEUE_TIMEOUT,
+            ),
+        }
+
+    @property
+    def total_limit(self) -> int:
+        return sum(gate.limit for gate in self.gates.values())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.ADMISSION_CONTROL_ENABLED,
+            "gates": {name: gate.stats() for name, gate in self.gates.items()},
+        }
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """ASGI 中间件: 请求处理完（含流式响应的全部内容）后才归还名额"""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        gate = self.controller.gates.get(classify(scope["path"]))
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await gate.acquire()
+        except AdmissionRejected as e:
+            await self._reject(send, gate, e.reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    @staticmethod
+    async def _reject(send, gate: AdmissionGate, reason: str) -> None:
+        body = json.dumps({
+            "detail": "服务繁忙，请稍后重试",
+            "reason": reason,
+            "traffic_class": gate.name,
+        }, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(gate.retry_after).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,317 @@
+"""
+跨进程共享缓存
+
+读多写少的服务结果（标签树、体系列表、标签查询等）通过 ``cache.get_or_load`` 缓存。
+缓存键中带有命名空间版本号，写操作调用 ``cache.invalidate`` 递增版本号即可让旧数据全部失效，
+无需逐个删除键。未命中时使用加锁加载（进程内 + 跨进程）避免缓存击穿。
+
+后端:
+- ``memory``: 进程内缓存，适用于测试和单节点部署
+- ``redis``: 使用 ``settings.REDIS_URL``，多个 worker 共享
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from backend.app.core.config import settings
+from backend.app.utils.memory import deep_sizeof
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheError(Exception):
+    """缓存后端不可用"""
+
+
+class MemoryCacheBackend:
+    """进程内缓存后端 (LRU + TTL)，版本计数器单独存放，不参与淘汰"""
+
+    # 版本号只在本进程内递增，其他 worker 的写操作不可见
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        # 计数器被淘汰后重新以时间戳初始化可能回退，因此不放入 LRU
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str, now: float) -> bool:
+        entry = self._data.get(key)
+        if entry is None:
+            return False
+        expires_at = entry[1]
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return False
+        return True
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if not self._alive(key, time.monotonic()):
+                return _MISSING
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._store(key, value, expires_at)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """仅在键不存在时写入，返回是否写入成功"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if self._alive(key, time.monotonic()):
+                return False
+            self._store(key, value, expires_at)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_counters(self, keys: Iterable[str]) -> List[Optional[int]]:
+        with self._lock:
+            return [self._counters.get(key) for key in keys]
+
+    def init_counter(self, key: str, value: int) -> None:
+        with self._lock:
+            self._counters.setdefault(key, value)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+    def clear(self, prefix: str) -> None:
+        """清除 prefix 下缓存的值；版本计数器保留，保证版本号不回退"""
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(f"{prefix}:")]:
+                del self._data[key]
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "counters": len(self._counters),
+                "bytes": deep_sizeof(self._data) + deep_sizeof(self._counters),
+            }
+
+
+class RedisCacheBackend:
+    """Redis 缓存后端，值使用 pickle 序列化"""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise CacheError("redis package is not installed") from e
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url)
+
+    def _call(self, method: str, *args, **kwargs):
+        try:
+            return getattr(self._client, method)(*args, **kwargs)
+        except self._redis_errors as e:
+            raise CacheError(str(e)) from e
+
+    @staticmethod
+    def _loads(raw: Optional[bytes]) -> Any:
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    @staticmethod
+    def _ttl_ms(ttl: Optional[float]) -> Optional[int]:
+        return int(ttl * 1000) if ttl else None
+
+    def get(self, key: str) -> Any:
+        return self._loads(self._call("get", key))
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._call("set", key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=self._ttl_ms(ttl))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return bool(self._call("set", key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=self._ttl_ms(ttl), nx=True))
+
+    def delete(self, key: str) -> None:
+        self._call("delete", key)
+
+    # 计数器以整数文本存储（不经 pickle），以便直接使用 INCR
+    def get_counters(self, keys: Iterable[str]) -> List[Optional[int]]:
+        return [int(raw) if raw is not None else None for raw in self._call("mget", list(keys))]
+
+    def init_counter(self, key: str, value: int) -> None:
+        self._call("set", key, value, nx=True)
+
+    def incr(self, key: str) -> int:
+        return int(self._call("incr", key))
+
+    def clear(self, prefix: str) -> None:
+        """删除 prefix 下缓存的值（SCAN + UNLINK），不影响同一 Redis 库中的其他键；版本计数器保留"""
+        version_marker = f"{prefix}:ver:".encode("utf-8")
+        cursor = 0
+        while True:
+            cursor, keys = self._call("scan", cursor, match=f"{prefix}:*", count=1000)
+            keys = [key for key in keys if not key.startswith(version_marker)]
+            if keys:
+                self._call("unlink", *keys)
+            if not cursor:
+                break
+
+
+class Cache:
+    """带版本失效与防击穿的缓存"""
+
+    def __init__(self, backend, prefix: str = "cache", default_ttl: Optional[float] = None,
+                 lock_timeout: float = 10.0, poll_interval: float = 0.05):
+        self.backend = backend
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._local_locks: Dict[str, list] = {}
+        self._local_locks_guard = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # 版本号
+    # ---------------------------------------------------------------
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:ver:{namespace}"
+
+    def versions(self, *namespaces: str) -> Tuple[int, ...]:
+        """读取多个命名空间的当前版本号"""
+        keys = [self._version_key(ns) for ns in namespaces]
+        values = self.backend.get_counters(keys)
+        if None in values:
+            # 首次使用时以毫秒时间戳初始化，避免缓存被清空后版本号回退而与旧数据重复
+            for key, value in zip(keys, values):
+                if value is None:
+                    self.backend.init_counter(key, int(time.time() * 1000))
+            values = self.backend.get_counters(keys)
+        return tuple(values)
+
+    def version(self, namespace: str) -> int:
+        return self.versions(namespace)[0]
+
+    def invalidate(self, *namespaces: str) -> None:
+        """递增命名空间版本号，使该命名空间下所有缓存失效"""
+        for namespace in namespaces:
+            try:
+                self.versions(namespace)
+                self.backend.incr(self._version_key(namespace))
+            except CacheError as e:
+                logger.warning("cache invalidate failed for %s: %s", namespace, e)
+
+    # ---------------------------------------------------------------
+    # 读写
+    # ---------------------------------------------------------------
+    def _data_key(self, namespaces: Tuple[str, ...], key: str) -> str:
+        versions = self.versions(*namespaces)
+        tag = ",".join(f"{ns}@{v}" for ns, v in zip(namespaces, versions))
+        return f"{self.prefix}:{tag}:{key}"
+
+    def _acquire_local(self, key: str) -> threading.Lock:
+        with self._local_locks_guard:
+            entry = self._local_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        return entry[0]
+
+    def _release_local(self, key: str) -> None:
+        with self._local_locks_guard:
+            entry = self._local_locks[key]
+            entry[0].release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._local_locks[key]
+
+    def get_or_load(self, namespaces: Union[str, Tuple[str, ...]], key: str,
+                    loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并写回。
+
+        namespaces 为结果所依赖的数据命名空间，任一命名空间被 invalidate 后缓存即失效。
+        缓存值应视为只读，调用方不要修改返回的对象。
+        """
+        if isinstance(namespaces, str):
+            namespaces = (namespaces,)
+        ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            data_key = self._data_key(namespaces, key)
+            value = self.backend.get(data_key)
+            if value is not _MISSING:
+                return value
+
+            # 进程内同一个键只允许一个线程加载
+            self._acquire_local(data_key)
+            try:
+                value = self.backend.get(data_key)
+                if value is not _MISSING:
+                    return value
+                return self._load_with_lock(data_key, loader, ttl)
+            finally:
+                self._release_local(data_key)
+        except CacheError as e:
+            logger.warning("cache unavailable, loading %s directly: %s", key, e)
+            return loader()
+
+    def _load_with_lock(self, data_key: str, loader: Callable[[], Any], ttl: Optional[float]) -> Any:
+        lock_key = f"{data_key}:lock"
+        if self.backend.add(lock_key, 1, ttl=self.lock_timeout):
+            try:
+                value = loader()
+                self.backend.set(data_key, value, ttl)
+                return value
+            finally:
+                self.backend.delete(lock_key)
+
+        # 其他 worker 正在加载，等待其写入结果
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.backend.get(data_key)
+            if value is not _MISSING:
+                return value
+        return loader()
+
+    def clear(self) -> None:
+        """清除本实例（KEY_PREFIX 下）缓存的值"""
+        self.backend.clear(self.prefix)
+
+
+def create_cache(backend_name: Optional[str] = None) -> Cache:
+    """根据配置创建缓存实例，Redis 不可用时退回进程内缓存"""
+    backend_name = backend_name or settings.CACHE_BACKEND
+    if backend_name == "redis":
+        try:
+            backend = RedisCacheBackend(settings.REDIS_URL)
+        except CacheError as e:
+            logger.warning("redis cache unavailable, falling back to memory: %s", e)
+            backend = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    elif backend_name == "memory":
+        backend = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend_name}")
+    return Cache(
+        backend,
+        prefix=settings.CACHE_KEY_PREFIX,
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+    )
+
+
+# 全局缓存实例
+cache = create_cache()
@@ -16,10 +16,39 @@ class Settings(BaseSettings):
     APP_NAME: str = "标签体系管理系统"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    # 是否开放 /debug 下的诊断接口 (如 /debug/memory)，接口无鉴权，仅在 DEBUG 同时开启时生效
+    DEBUG_ENDPOINTS_ENABLED: bool = False
     
     # 服务器配置
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WARMUP_ON_STARTUP: bool = True
+    # 预热阶段失败后的重试间隔（秒，指数退避）
+    WARMUP_RETRY_INITIAL_DELAY: float = 1.0
+    WARMUP_RETRY_MAX_DELAY: float = 60.0
+    
+    # 多 worker 生产模式 (WORKERS > 1 时主进程预加载后 fork，见 core/prefork.py；要求 CACHE_BACKEND 和 SESSION_CONTEXT_BACKEND 为 redis)
+    WORKERS: int = 1
+    WORKER_PRELOAD: bool = True
+    # 每个 worker 处理多少请求后优雅退出并由主进程补齐 (0: 不回收)，加上 0~JITTER 的随机抖动避免同时重启
+    WORKER_MAX_REQUESTS: int = 0
+    WORKER_MAX_REQUESTS_JITTER: int = 0
+    WORKER_GRACEFUL_TIMEOUT: float = 30.0
+    # worker 异常退出后补齐的最长退避间隔（秒），以及连续崩溃多少次后主进程停止
+    WORKER_RESPAWN_MAX_DELAY: float = 30.0
+    WORKER_CRASH_LIMIT: int = 5
+    
+    # 准入控制 (识别、补全/搜索与管理接口各自的并发上限、等待队列长度和排队截止时间，超出时返回 503 + Retry-After)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_RECOGNITION_CONCURRENCY: int = 32
+    ADMISSION_RECOGNITION_QUEUE: int = 256
+    ADMISSION_RECOGNITION_QUEUE_TIMEOUT: float = 0.5
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = 8
+    ADMISSION_INTERACTIVE_QUEUE: int = 64
+    ADMISSION_INTERACTIVE_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_ADMIN_CONCURRENCY: int = 4
+    ADMISSION_ADMIN_QUEUE: int = 64
+    ADMISSION_ADMIN_QUEUE_TIMEOUT: float = 10.0
     
     # 数据库配置
     DATABASE_URL: str = f"sqlite:///{PROJECT_ROOT / 'label_system.db'}"
@@ -28,6 +57,13 @@ class Settings(BaseSettings):
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # 缓存配置 (memory: 进程内; redis: 使用 REDIS_URL 跨 worker 共享)
+    CACHE_BACKEND: str = "memory"
+    CACHE_KEY_PREFIX: str = "label_system"
+    CACHE_DEFAULT_TTL: int = 300
+    CACHE_LOCK_TIMEOUT: float = 10.0
+    CACHE_MAX_ENTRIES: int = 10000
+    
     # JWT配置
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
@@ -48,9 +84,77 @@ class Settings(BaseSettings):
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
     
+    # 列表/树形接口快速序列化路径 (行元组 + orjson，跳过 response_model 校验)
+    FAST_RESPONSE_ENABLED: bool = False
+    
     # 意图识别配置
     INTENT_RECOGNITION_THRESHOLD: float = 0.7
     MAX_INTENT_CANDIDATES: int = 5
+    # 相同的并发识别请求只执行一次 (single-flight)，follower 等待超时后自行识别
+    RECOGNITION_COALESCING_ENABLED: bool = True
+    RECOGNITION_COALESCE_WAIT_TIMEOUT: float = 5.0
+    # 正则规则 (每个标签按 GROUP_SIZE 条合并为一个交替模式；一次识别中正则匹配的总耗时预算，超出后跳过剩余规则)
+    RECOGNITION_REGEX_GROUP_SIZE: int = 32
+    RECOGNITION_REGEX_BUDGET_MS: float = 20.0
+    RECOGNITION_REGEX_MAX_LENGTH: int = 500
+    # 批量识别接口单次最多的文本数
+    RECOGNITION_BATCH_MAX_TEXTS: int = 100
+    
+    # 识别数据包配置 (编译后的规则/实体快照，由各 worker mmap 共享)
+    RECOGNITION_BUNDLE_DIR: str = str(PROJECT_ROOT / "bundles")
+    RECOGNITION_BUNDLE_KEEP: int = 5
+    # 发布模式 (auto: 修改后在后台重新编译，编译完成即生效，用于开发/测试;
+    #          manual: 修改进入草稿，调用 POST /api/v1/snapshots/publish 发布快照后才对识别生效，生产环境使用)
+    RECOGNITION_PUBLISH_MODE: str = "auto"
+    # 各 worker 到数据库确认当前快照/草稿修订号的最长间隔（秒），其他进程的发布、回滚和修改在此时间内生效
+    RECOGNITION_VERSION_CHECK_INTERVAL: float = 1.0
+    # 保留的已发布快照数量（可回滚的范围）
+    RECOGNITION_SNAPSHOT_KEEP: int = 5
+    
+    # 长文档识别 (按句子/段落切成重叠窗口，窗口数不少于 DOCUMENT_PARALLEL_MIN_WINDOWS 时在进程池中并行扫描)
+    DOCUMENT_WINDOW_CHARS: int = 2000
+    DOCUMENT_OVERLAP_CHARS: int = 200
+    DOCUMENT_MAX_CHARS: int = 2 * 1024 * 1024
+    # 扫描进程数 (0: 在请求线程中顺序扫描)
+    DOCUMENT_POOL_WORKERS: int = 2
+    DOCUMENT_PARALLEL_MIN_WINDOWS: int = 4
+    
+    # 变更日志 (供下游镜像增量同步: GET /api/v1/changes 分页拉取，/api/v1/changes/stream 以 SSE 推送)
+    # CHANGE_FEED_ENABLED 只控制是否开放同步接口，变更日志总是记录（其序号同时是识别草稿的修订号）
+    CHANGE_FEED_ENABLED: bool = True
+    CHANGE_LOG_MAX_ENTRIES: int = 100000
+    CHANGE_FEED_PAGE_SIZE: int = 500
+    # SSE 流轮询数据库的间隔（捕获其他 worker 的写入；本 worker 的写入立即推送）和心跳间隔（秒）
+    CHANGE_FEED_POLL_INTERVAL: float = 1.0
+    CHANGE_FEED_HEARTBEAT_INTERVAL: float = 15.0
+    CHANGE_FEED_MAX_STREAMS: int = 100
+    
+    # 识别统计配置 (内存计数，定期按时间桶批量写入 recognition_stats；补全热度随同刷新，关闭时不再累加)
+    STATS_ENABLED: bool = True
+    STATS_FLUSH_INTERVAL: float = 10.0
+    STATS_BUCKET_SECONDS: int = 300
+    STATS_MAX_UNRECOGNIZED_TEXTS: int = 1000
+    # 汇总表保留的天数，更早的时间桶定期删除 (0: 不删除)
+    STATS_RETENTION_DAYS: int = 90
+    
+    # 识别请求日志 (jsonl: 按天和大小轮转的 JSONL 文件; sqlite: 独立的 SQLite 文件; none: 关闭)
+    RECOGNITION_LOG_BACKEND: str = "jsonl"
+    RECOGNITION_LOG_DIR: str = "logs/recognition"
+    RECOGNITION_LOG_MAX_BYTES: int = 100 * 1024 * 1024
+    RECOGNITION_LOG_QUEUE_SIZE: int = 10000
+    RECOGNITION_LOG_BATCH_SIZE: int = 500
+    RECOGNITION_LOG_FLUSH_INTERVAL: float = 1.0
+    # 队列满时的策略 (drop: 直接丢弃; block: 最多等待 RECOGNITION_LOG_BLOCK_TIMEOUT 秒后丢弃)
+    RECOGNITION_LOG_POLICY: str = "drop"
+    RECOGNITION_LOG_BLOCK_TIMEOUT: float = 0.05
+    RECOGNITION_LOG_SAMPLE_RATE: float = 1.0
+    
+    # 多轮会话上下文 (按 context.session_id 保存上一轮的意图和实体; memory: 进程内; redis: 使用 REDIS_URL)
+    SESSION_CONTEXT_ENABLED: bool = True
+    SESSION_CONTEXT_BACKEND: str = "memory"
+    SESSION_CONTEXT_TTL: int = 1800
+    SESSION_CONTEXT_MAX_SESSIONS: int = 100000
+    SESSION_CONTEXT_MAX_BYTES: int = 64 * 1024 * 1024
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,64 @@
+"""
+条件请求 (ETag / If-None-Match) 支持
+
+ETag 由变更序号生成（change_sequence.last_seq，与每次写操作在同一事务中递增，见 services.change_log），
+各 worker、各缓存后端看到的都是同一个值，判断是否变更只需一次主键查询，无需执行主查询。
+客户端携带匹配的 If-None-Match 时直接返回 304。
+
+缓存版本号在各 worker 间共享（CACHE_BACKEND=redis）时作为快速路径: 接口所依赖命名空间的版本号
+与上次读取序号时相同，说明数据未变，直接沿用上次的序号，不查数据库。
+"""
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import CacheError, cache
+from backend.app.core.database import get_db
+from backend.app.services.change_log import change_log
+
+
+def _parse_if_none_match(value: str) -> Tuple[str, ...]:
+    return tuple(tag.strip() for tag in value.split(",") if tag.strip())
+
+
+class ConditionalGet:
+    """
+    路由依赖: 为响应加上 ETag，并在 If-None-Match 命中时以 304 提前结束请求。
+
+    用法: ``@router.get("/", dependencies=[Depends(ConditionalGet("labels"))])``
+    """
+
+    def __init__(self, *namespaces: str):
+        self.namespaces = namespaces
+        # (共享的缓存版本号, 变更序号)，快速路径使用
+        self._memo: Optional[Tuple[Tuple[int, ...], int]] = None
+
+    def _versions(self) -> Optional[Tuple[int, ...]]:
+        if not cache.backend.shared:
+            return None
+        try:
+            return tuple(cache.versions(*self.namespaces))
+        except CacheError:
+            return None
+
+    def etag(self, db: Session) -> str:
+        """当前数据的 ETag"""
+        versions, memo = self._versions(), self._memo
+        if versions is not None and memo is not None and memo[0] == versions:
+            seq = memo[1]
+        else:
+            seq = change_log.latest_seq(db)
+            if versions is not None:
+                self._memo = (versions, seq)
+        token = ",".join(self.namespaces) + f"@{seq}"
+        return '"' + hashlib.sha1(token.encode("utf-8")).hexdigest()[:20] + '"'
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_db)) -> None:
+        etag = self.etag(db)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = _parse_if_none_match(request.headers.get("if-none-match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
@@ -0,0 +1,70 @@
+"""
+数据变更通知
+
+服务层的写操作分两步发布变更:
+1. 提交前调用 ``record_change``: 在同一事务中把变更记入变更日志（见 services/change_log.py），
+   变更日志与业务数据一起提交或一起回滚，已提交的修改不会漏记；删除记录时传 operation="delete"
+2. 提交后调用 ``publish_changes``: 对本事务记录过的命名空间递增缓存版本号，
+   再依次通知订阅了该命名空间的进程内监听器（如搜索索引的增量更新），并唤醒变更推送 (SSE)
+监听器签名为 ``listener(db, keys)``，keys 为本次变更记录的业务编码列表。
+
+批量变更（不带 keys，或 keys 超过 BULK_CHANGE_KEYS 个）只使缓存失效、不通知监听器，
+增量索引随后发现版本号跳变，整体重建比逐条更新更快。
+
+事务回滚时，已记录但尚未发布的变更随之丢弃。
+"""
+import logging
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ChangeListener = Callable[[Session, List[str]], None]
+
+_listeners: Dict[str, List[ChangeListener]] = {}
+
+BULK_CHANGE_KEYS = 1000
+
+# 会话 info 中待发布变更的键
+_PENDING_KEY = "pending_changes"
+
+
+def subscribe(namespace: str, listener: ChangeListener) -> None:
+    """订阅某个命名空间的变更"""
+    _listeners.setdefault(namespace, []).append(listener)
+
+
+def record_change(db: Session, namespace: str, *keys: str, operation: str = "upsert") -> None:
+    """在调用方的事务中记录一次变更，须在 commit 之前调用"""
+    from backend.app.services.change_log import change_log
+
+    change_log.record(db, namespace, keys, operation)
+    db.info.setdefault(_PENDING_KEY, []).append((namespace, keys))
+
+
+def publish_changes(db: Session) -> None:
+    """提交后发布本事务记录的变更: 使缓存失效并通知监听器，监听器异常不影响写操作本身"""
+    from backend.app.services.change_log import change_notifier
+
+    pending = db.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    cache.invalidate(*dict.fromkeys(namespace for namespace, _ in pending))
+    for namespace, keys in pending:
+        if not keys or len(keys) > BULK_CHANGE_KEYS:
+            continue
+        for listener in _listeners.get(namespace, []):
+            try:
+                listener(db, list(keys))
+            except Exception:
+                logger.exception("change listener %r failed for %s:%s", listener, namespace, keys[:10])
+    change_notifier.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
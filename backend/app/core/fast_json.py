@@ -0,0 +1,56 @@
+"""
+快速 JSON 响应
+
+大列表/树形接口的可选快速路径: 服务层直接返回由行元组构建的字典，
+路由以 ``FastJSONResponse`` 返回，跳过 response_model 的 pydantic 校验和 jsonable_encoder，
+安装了 orjson 时使用 orjson 编码，否则退回标准库 json。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """编码为 JSON 字节串，格式与 FastAPI 默认 JSONResponse 一致"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def envelope(data: Any, code: int = 200, message: str = "success") -> dict:
+    """与 ResponseModel 结构一致的响应包装"""
+    return {"code": code, "message": message, "data": data, "timestamp": datetime.now()}
+
+
+def fast_json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    构建快速响应。
+
+    直接返回 Response 时 FastAPI 不会合并依赖中设置的响应头（如 ETag），
+    因此需要传入路由注入的 response 以保留这些头。
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
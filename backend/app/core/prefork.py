@@ -0,0 +1,259 @@
+"""
+多 worker 预加载启动器 (prefork)
+
+主进程先导入应用并同步执行一轮预热（识别数据包、标签树缓存、搜索/补全/冲突索引），
+随后 gc.freeze() 把预热产生的对象移入永久代，再 fork 出 N 个 worker 共享监听 socket。
+worker 只读这些对象，垃圾回收也不会再扫描它们，内存页保持写时复制共享，
+字典和索引的内存不随 worker 数量倍增；识别数据包本身是 mmap 文件，由操作系统页缓存共享。
+主进程预热有阶段失败时照常 fork，各 worker 启动后在后台按退避继续重试失败的阶段（见 services/warmup.py）。
+
+worker 回收:
+- 处理 WORKER_MAX_REQUESTS (加随机抖动) 个请求后优雅退出，由主进程补齐
+- 主进程收到 SIGHUP 时逐个滚动重启全部 worker（先起新 worker，再优雅停止旧 worker）
+- 主进程收到 SIGTERM/SIGINT 时通知所有 worker 优雅退出，超过 WORKER_GRACEFUL_TIMEOUT 秒后强制结束
+- worker 异常退出后按指数退避补齐（最长间隔 WORKER_RESPAWN_MAX_DELAY 秒）；同一 worker 连续崩溃
+  超过 WORKER_CRASH_LIMIT 次（每次运行不足 HEALTHY_UPTIME 秒）时主进程停止全部 worker 并以非零状态退出
+
+进程内缓存 (CACHE_BACKEND=memory) 和会话上下文 (SESSION_CONTEXT_BACKEND=memory) 不跨 worker 共享:
+一个 worker 上的写操作不会使其他 worker 的缓存失效，会话的下一轮也可能落到另一个 worker 上。
+因此 WORKERS > 1 时两者必须使用 redis，否则拒绝启动。
+仅支持提供 os.fork 的平台，其他平台退回 uvicorn 自带的多进程模式（不共享预加载的数据）。
+"""
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# 主进程检查 worker 状态的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# worker 运行超过该时长（秒）后才退出的，不计入连续崩溃次数
+HEALTHY_UPTIME = 60.0
+
+# 多 worker 时必须跨进程共享的状态
+SHARED_STATE_SETTINGS = ("CACHE_BACKEND", "SESSION_CONTEXT_BACKEND")
+
+
+class PreforkServer:
+    """预加载应用后 fork 多个 uvicorn worker，并负责监控、回收和滚动重启"""
+
+    def __init__(self, app_path: str = "backend.app.main:app", host: Optional[str] = None,
+                 port: Optional[int] = None, workers: Optional[int] = None,
+                 max_requests: Optional[int] = None, max_requests_jitter: Optional[int] = None,
+                 graceful_timeout: Optional[float] = None, preload: Optional[bool] = None,
+                 log_level: str = "info"):
+        self.app_path = app_path
+        self.host = host or settings.HOST
+        self.port = port or settings.PORT
+        self.workers = max(workers or settings.WORKERS, 1)
+        self.max_requests = settings.WORKER_MAX_REQUESTS if max_requests is None else max_requests
+        self.max_requests_jitter = (settings.WORKER_MAX_REQUESTS_JITTER
+                                    if max_requests_jitter is None else max_requests_jitter)
+        self.graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT if graceful_timeout is None else graceful_timeout
+        self.preload = settings.WORKER_PRELOAD if preload is None else preload
+        self.log_level = log_level
+        self._children: Dict[int, int] = {}  # pid -> worker 序号
+        self._started: Dict[int, float] = {}  # pid -> 启动时间
+        self._crashes: Dict[int, int] = {}  # worker 序号 -> 连续崩溃次数
+        self._respawn_at: Dict[int, float] = {}  # worker 序号 -> 最早的补齐时间
+        self._stopping = False
+        self._reload = False
+        self._exit_code = 0
+
+    def run(self) -> int:
+        problem = self._check_shared_state()
+        if problem:
+            logger.error(problem)
+            return 1
+        if not hasattr(os, "fork"):
+            logger.warning("os.fork is not available, falling back to uvicorn workers without preload")
+            uvicorn.run(self.app_path, host=self.host, port=self.port, workers=self.workers, log_level=self.log_level)
+            return 0
+
+        # 在主进程中创建 Config: 配置日志，之后由 worker 继承
+        self.config = uvicorn.Config(
+            self.app_path, log_level=self.log_level, lifespan="on",
+            timeout_graceful_shutdown=int(self.graceful_timeout) or None,
+        )
+        self.config.app = import_from_string(self.app_path)
+        if self.preload:
+            self._preload()
+        self.sock = self._bind()
+        logger.info("Prefork master %s listening on http://%s:%s with %s workers",
+                    os.getpid(), self.host, self.port, self.workers)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._reload:
+                    self._reload = False
+                    self._rolling_restart()
+                now = time.monotonic()
+                for index in sorted(set(range(self.workers)) - set(self._children.values())):
+                    if not self._stopping and now >= self._respawn_at.get(index, 0.0):
+                        self._spawn(index)
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self._stop_all()
+            self.sock.close()
+        logger.info("Prefork master %s stopped", os.getpid())
+        return self._exit_code
+
+    def _check_shared_state(self) -> Optional[str]:
+        """多 worker 时缓存和会话上下文必须跨进程共享，返回不满足时的错误说明"""
+        if self.workers <= 1:
+            return None
+        local = [name for name in SHARED_STATE_SETTINGS if getattr(settings, name) == "memory"]
+        if not local:
+            return None
+        return (f"{'/'.join(local)}=memory is process-local and cannot be shared between {self.workers} workers; "
+                f"set {'/'.join(local)}=redis or run with WORKERS=1")
+
+    def _preload(self) -> None:
+        """主进程中同步预热，并冻结预热产生的对象，使其在 worker 间保持写时复制共享"""
+        from backend.app.core.database import engine
+        from backend.app.services.warmup import warmup_state
+
+        # 只执行一轮，失败的阶段由各 worker 在 lifespan 中继续重试
+        warmup_state.run_once()
+        report = warmup_state.report()
+        logger.info("Preloaded in %s ms: %s", report["total_ms"], report["status"])
+        # 连接不能跨 fork 共享，worker 各自建立
+        engine.dispose()
+        gc.collect()
+        gc.freeze()
+        logger.info("Froze %s objects before fork", gc.get_freeze_count())
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.config.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, index: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(index)
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self._children[pid] = index
+        self._started[pid] = time.monotonic()
+        logger.info("Started worker %s (#%s)", pid, index)
+        return pid
+
+    def _run_worker(self, index: int) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        random.seed()
+        if self.max_requests > 0:
+            self.config.limit_max_requests = self.max_requests + random.randint(0, max(self.max_requests_jitter, 0))
+        uvicorn.Server(self.config).run(sockets=[self.sock])
+
+    def _reap(self) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            index = self._children.pop(pid, None)
+            started = self._started.pop(pid, None)
+            if index is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info("Worker %s (#%s) exited with status %s", pid, index, code)
+            if code == 0 or self._stopping:
+                self._crashes.pop(index, None)
+                continue
+            self._record_crash(index, time.monotonic() - started if started is not None else 0.0)
+
+    def _record_crash(self, index: int, uptime: float) -> None:
+        """异常退出的 worker 按指数退避补齐，连续崩溃过多时停止主进程"""
+        crashes = 1 if uptime >= HEALTHY_UPTIME else self._crashes.get(index, 0) + 1
+        self._crashes[index] = crashes
+        if crashes > settings.WORKER_CRASH_LIMIT:
+            logger.error("Worker #%s crashed %s times in a row, stopping", index, crashes)
+            self._stopping = True
+            self._exit_code = 1
+            return
+        delay = min(2 ** (crashes - 1), settings.WORKER_RESPAWN_MAX_DELAY)
+        self._respawn_at[index] = time.monotonic() + delay
+        logger.warning("Worker #%s crashed (%s in a row), respawning in %ss", index, crashes, delay)
+
+    def _rolling_restart(self) -> None:
+        """逐个替换 worker: 新 worker 启动后再优雅停止对应的旧 worker，服务容量不下降"""
+        logger.info("Rolling restart of %s workers", len(self._children))
+        for old_pid, index in list(self._children.items()):
+            if self._stopping:
+                return
+            self._children.pop(old_pid)
+            self._started.pop(old_pid, None)
+            self._spawn(index)
+            self._terminate(old_pid)
+            self._wait(old_pid, self.graceful_timeout)
+
+    def _stop_all(self) -> None:
+        for pid in list(self._children):
+            self._terminate(pid)
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in list(self._children):
+            self._wait(pid, max(deadline - time.monotonic(), 0))
+            self._children.pop(pid, None)
+
+    @staticmethod
+    def _terminate(pid: int) -> None:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _wait(pid: int, timeout: float) -> None:
+        """等待 worker 退出，超时后强制结束"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if done:
+                return
+            if time.monotonic() >= deadline:
+                logger.warning("Worker %s did not exit in %ss, killing", pid, timeout)
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return
+            time.sleep(0.1)
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self._reload = True
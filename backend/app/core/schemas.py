@@ -29,6 +29,13 @@ class TagSystemResponse(TagSystemBase):
     updated_at: datetime
     class Config: from_attributes = True
 
+class TagSystemCloneRequest(BaseModel):
+    system_code: str = Field(..., description="新体系编码")
+    system_name: Optional[str] = Field(None, description="新体系名称，为空时为 \"原名称 (新体系编码)\"")
+    description: Optional[str] = Field(None, description="新体系描述，为空时沿用原体系")
+    code_prefix: Optional[str] = Field(None, description="副本编码前缀 (新编码 = 前缀 + 原编码)，为空时为 \"新体系编码_\"")
+    active: bool = Field(False, description="副本实体和规则是否启用")
+
 # ===================================================================
 # 2. Label Schemas
 # ===================================================================
@@ -54,6 +61,17 @@ class LabelResponse(LabelBase):
     updated_at: datetime
     class Config: from_attributes = True
 
+class SubtreeMoveRequest(BaseModel):
+    """子树移动请求（标签和实体通用）"""
+    new_parent_code: Optional[str] = Field(None, description="新的父级编码，为空表示移到顶层")
+
+class LabelSubtreeCopyRequest(BaseModel):
+    new_parent_code: Optional[str] = Field(None, description="副本的父标签编码，为空表示作为根标签")
+    code_prefix: str = Field(..., min_length=1, description="副本编码前缀 (新编码 = 前缀 + 原编码)")
+    with_items: bool = Field(True, description="是否复制标签下的实体和同义词")
+    with_rules: bool = Field(True, description="是否复制标签下的意图规则")
+    active: bool = Field(False, description="副本实体和规则是否启用")
+
 # ===================================================================
 # 3. Item Schemas
 # ===================================================================
@@ -92,6 +110,11 @@ class ItemResponse(ItemBase):
     synonyms: List[ItemSynonymResponse] = []
     class Config: from_attributes = True
 
+class ItemSubtreeCopyRequest(BaseModel):
+    new_parent_code: Optional[str] = Field(None, description="副本的父实体编码，为空表示作为顶层实体")
+    code_prefix: str = Field(..., min_length=1, description="副本编码前缀 (新编码 = 前缀 + 原编码)")
+    active: bool = Field(False, description="副本是否启用")
+
 # ===================================================================
 # 4. IntentRule Schemas
 # ===================================================================
@@ -125,12 +148,39 @@ class IntentRecognitionRequest(BaseModel):
     text: str = Field(..., description="输入文本")
     context: Optional[Dict[str, Any]] = Field(None, description="上下文信息")
 
+class IntentRecognitionBatchRequest(BaseModel):
+    """批量意图识别请求模式"""
+    texts: List[str] = Field(..., min_length=1, description="输入文本列表")
+    context: Optional[Dict[str, Any]] = Field(None, description="上下文信息，对每条文本生效")
+
+class DocumentRecognitionRequest(BaseModel):
+    """长文档识别请求模式"""
+    text: str = Field(..., description="文档全文")
+    mode: str = Field("sentence", pattern="^(sentence|paragraph)$", description="窗口边界: sentence 按句子, paragraph 按段落")
+    window_chars: Optional[int] = Field(None, ge=100, description="窗口最大字符数，为空时使用 DOCUMENT_WINDOW_CHARS")
+    overlap_chars: Optional[int] = Field(None, ge=0, description="相邻窗口重叠字符数，为空时使用 DOCUMENT_OVERLAP_CHARS")
+
+class LinkedItem(BaseModel):
+    """实体路径上的实体"""
+    item_code: str = Field(..., description="实体编码")
+    item_name: str = Field(..., description="实体名称")
+
+class LinkedLabel(BaseModel):
+    """标签路径上的标签"""
+    label_code: str = Field(..., description="标签编码")
+    label_name: str = Field(..., description="标签名称")
+
 class ExtractedEntity(BaseModel):
     """提取的实体"""
     entity_type: str = Field(..., description="实体类型")
     entity_value: str = Field(..., description="实体值")
     start_pos: int = Field(..., description="开始位置")
     end_pos: int = Field(..., description="结束位置")
+    item_code: Optional[str] = Field(None, description="链接到的实体编码 (命中同义词时为其所属实体)")
+    item_name: Optional[str] = Field(None, description="链接到的实体名称")
+    item_path: List[LinkedItem] = Field(default_factory=list, description="由根到父节点的祖先实体")
+    label_path: List[LinkedLabel] = Field(default_factory=list, description="由根到实体类型的标签路径")
+    from_context: bool = Field(False, description="是否由会话上下文补全 (此时位置为上一轮文本中的位置)")
 
 class MatchedRule(BaseModel):
     """匹配的规则"""
@@ -147,9 +197,28 @@ class IntentRecognitionResponse(BaseModel):
     matched_rules: List[MatchedRule] = Field(..., description="匹配的规则")
     extracted_entities: List[ExtractedEntity] = Field(..., description="提取的实体")
     suggested_actions: List[str] = Field(..., description="建议的操作")
+    intent_from_context: bool = Field(False, description="本轮未匹配规则，意图沿用会话上一轮")
+    snapshot_version: Optional[str] = Field(None, description="识别所用的规则/实体快照版本")
+
+# ===================================================================
+# 6. Recognition Snapshot Schemas
+# ===================================================================
+class SnapshotPublishRequest(BaseModel):
+    """发布快照请求"""
+    note: Optional[str] = Field(None, max_length=500, description="发布说明")
+
+class RecognitionSnapshotResponse(BaseModel):
+    version: str = Field(..., description="快照版本号")
+    fingerprint: str = Field(..., description="发布时草稿数据的版本（变更序号），用于判断是否有未发布的修改")
+    counts: Optional[Dict[str, int]] = Field(None, description="规则/实体/标签数量")
+    note: Optional[str] = Field(None, description="发布说明")
+    status: str = Field(..., description="状态 (active: 可回滚; expired: 已过期)")
+    is_current: bool = Field(..., description="是否为当前快照")
+    created_at: Optional[datetime] = None
+    activated_at: Optional[datetime] = None
 
 # ===================================================================
-# 6. Utility Schemas
+# 7. Utility Schemas
 # ===================================================================
 class ResponseModel(BaseModel):
     """通用响应模式"""
@@ -1,13 +1,44 @@
 """
 标签体系管理系统 - 主应用入口
 """
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
+from backend.app.core.admission import AdmissionControlMiddleware, admission_controller
 from backend.app.core.config import settings
-from backend.app.api import intent_recognition, tag_systems, labels, items, intent_rules
+from backend.app.api import (
+    changes, intent_recognition, tag_systems, labels, items, intent_rules, search, statistics, snapshots, debug
+)
+from backend.app.services.document_recognition import document_pool
+from backend.app.services.recognition_log import recognition_log
+from backend.app.services.recognition_stats import recognition_stats
+from backend.app.services.warmup import warmup_state
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期: 启动时在后台预热识别数据和缓存，启动识别统计和请求日志的后台写入，以及长文档扫描进程池"""
+    # 同步接口在线程池中执行，线程数不少于准入控制放行的并发数
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, admission_controller.total_limit)
+    if settings.WARMUP_ON_STARTUP:
+        warmup_state.start()
+    elif not warmup_state.finished:
+        warmup_state.mark_skipped()
+    recognition_stats.start()
+    recognition_log.start()
+    document_pool.start()
+    yield
+    warmup_state.stop()
+    recognition_log.stop()
+    recognition_stats.stop()
+    document_pool.shutdown()
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -15,9 +46,14 @@ app = FastAPI(
     description="基于意图识别的智能标签体系管理平台",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# 准入控制 (在 CORS 之内，503 响应同样带 CORS 头)
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # 配置CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +61,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # 静态文件服务
@@ -36,6 +73,13 @@ app.include_router(labels.router, prefix="/api/v1/labels", tags=["标签定义"]
 app.include_router(items.router, prefix="/api/v1/items", tags=["实体数据"])
 app.include_router(intent_rules.router, prefix="/api/v1/intent-rules", tags=["意图规则"])
 app.include_router(intent_recognition.router, prefix="/api/v1/intent-recognition", tags=["意图识别"])
+app.include_router(snapshots.router, prefix="/api/v1/snapshots", tags=["识别快照"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["搜索"])
+app.include_router(statistics.router, prefix="/api/v1/statistics", tags=["统计分析"])
+if settings.CHANGE_FEED_ENABLED:
+    app.include_router(changes.router, prefix="/api/v1/changes", tags=["变更同步"])
+if settings.DEBUG and settings.DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug.router, prefix="/debug", tags=["调试"])
 
 @app.get("/")
 async def root():
@@ -52,7 +96,19 @@ async def health_check():
     """健康检查接口"""
     return {"status": "healthy", "message": "服务运行正常"}
 
+@app.get("/ready")
+async def readiness_check():
+    """就绪检查接口，预热完成前返回 503"""
+    report = warmup_state.report()
+    return JSONResponse(
+        status_code=200 if warmup_state.ready else 503,
+        content=jsonable_encoder(report)
+    )
+
 if __name__ == "__main__":
+    if settings.WORKERS > 1:
+        from backend.app.core.prefork import PreforkServer
+        raise SystemExit(PreforkServer("backend.app.main:app").run())
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
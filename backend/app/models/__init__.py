@@ -3,3 +3,6 @@ from .label import Label
 from .item import Item
 from .item_synonym import ItemSynonym
 from .intent_rule import IntentRule
+from .recognition_stat import RecognitionStat
+from .recognition_snapshot import RecognitionSnapshot
+from .change_log import ChangeLogEntry, ChangeSequence
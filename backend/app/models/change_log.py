@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DDL, String, DateTime, Integer, event
+from sqlalchemy.sql import func
+from backend.app.core.database import Base
+
+class ChangeLogEntry(Base):
+    """数据变更日志，seq 为单调递增的序号（按提交顺序分配），供下游镜像增量同步"""
+    __tablename__ = "change_log"
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    namespace = Column(String(50), nullable=False)
+    entity_key = Column(String(100))
+    operation = Column(String(10), nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+class ChangeSequence(Base):
+    """变更序号计数器（单行）；写变更日志时先更新该行，行锁保证序号顺序与提交顺序一致"""
+    __tablename__ = "change_sequence"
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+
+# 建表时写入计数器的唯一一行（与 database_schema_v2.sql 一致）
+event.listen(
+    ChangeSequence.__table__, "after_create",
+    DDL("INSERT INTO change_sequence (id, last_seq) VALUES (1, 0)"),
+)
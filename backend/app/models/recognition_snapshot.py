@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, BOOLEAN
+from sqlalchemy.sql import func
+from backend.app.core.database import Base
+
+class RecognitionSnapshot(Base):
+    """已发布的识别快照，每行对应一个不可变的识别数据包文件"""
+    __tablename__ = "recognition_snapshots"
+    id = Column(Integer, primary_key=True)
+    version = Column(String(50), nullable=False, unique=True)
+    fingerprint = Column(String(64), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    counts = Column(Text)
+    note = Column(String(500))
+    status = Column(String(20), nullable=False, default="active")
+    is_current = Column(BOOLEAN, nullable=False, default=False)
+    created_at = Column(DateTime, default=func.now())
+    activated_at = Column(DateTime)
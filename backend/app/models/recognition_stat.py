@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime, Integer, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from backend.app.core.database import Base
+
+class RecognitionStat(Base):
+    """意图识别统计汇总，每个 (时间桶, 维度, 键) 一行，每次刷新原地累加增量"""
+    __tablename__ = "recognition_stats"
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False)
+    dimension = Column(String(20), nullable=False)
+    stat_key = Column(String(200), nullable=False, default="")
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=func.now())
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "dimension", "stat_key", name="uq_recognition_stats_key"),
+        Index("ix_recognition_stats_dimension_bucket", "dimension", "bucket_start"),
+    )
@@ -0,0 +1,383 @@
+"""
+实体名称/同义词前缀补全
+
+所有实体名称和同义词按规范化文本排序存放在静态数组中，前缀对应其中一段连续区间，
+用二分查找定位；区间内按得分取 top-N 借助按位置建立的区间最大值线段树，
+每取出一个结果只需两次 O(log n) 查询，与区间大小无关。另为每个标签单独建表，支持按标签限定。
+
+得分 = 该文本在线上识别请求中被提取的次数 + 实体最近更新时间的小数部分，即先按热度、再按新近排序。
+提取次数由识别接口记入 recognition_stats，随其后台刷新批量累加到索引，不在识别路径上更新索引；
+离线评估、流量回放和长文档识别不计入。
+写操作后的新文本先进入一个小的增量区（查询时线性扫描），旧文本打删除标记；
+增量区或删除标记过多时由 IncrementalIndexManager 在后台整体重建。
+"""
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import cache
+from backend.app.core.events import subscribe
+from backend.app.models import Item, ItemSynonym
+from backend.app.services.incremental_index import IncrementalIndexManager
+from backend.app.services.recognition_stats import recognition_stats
+from backend.app.utils.memory import attribute_sizes
+
+# 索引依赖的缓存命名空间
+AUTOCOMPLETE_NAMESPACES = ("items",)
+
+# 文本类型
+KIND_NAME, KIND_SYNONYM = 0, 1
+KIND_NAMES = ("name", "synonym")
+
+# 增量区超过该条数、或删除标记超过该比例时重建
+DELTA_LIMIT = 2000
+COMPACT_RATIO = 0.3
+
+_NEG_INF = float("-inf")
+_MAX_CHAR = "\U0010ffff"
+
+# 规范化文本 -> 在线上识别请求中被提取的次数；跨重建保留，仅在当前进程内统计
+popularity: Dict[str, int] = {}
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def recency(updated_at: Optional[datetime]) -> float:
+    """把更新时间映射到 [0, 1)，作为同热度时的次级排序"""
+    return updated_at.timestamp() / 1e10 if updated_at is not None else 0.0
+
+
+class _PrefixTable:
+    """按规范化文本排序的静态表，线段树节点存放区间内得分最高的位置"""
+
+    __slots__ = ("keys", "entries", "scores", "tree", "n")
+
+    def __init__(self, keys: List[str], entries: array, scores: array):
+        self.keys = keys
+        self.entries = entries
+        self.scores = scores
+        n = self.n = len(keys)
+        tree = self.tree = array("i", bytes(8 * n))
+        for pos in range(n):
+            tree[n + pos] = pos
+        for node in range(n - 1, 0, -1):
+            a, b = tree[2 * node], tree[2 * node + 1]
+            tree[node] = a if scores[a] > scores[b] or (scores[a] == scores[b] and a < b) else b
+
+    def set_score(self, pos: int, score: float) -> None:
+        scores, tree = self.scores, self.tree
+        scores[pos] = score
+        node = (pos + self.n) >> 1
+        while node:
+            a, b = tree[2 * node], tree[2 * node + 1]
+            tree[node] = a if scores[a] > scores[b] or (scores[a] == scores[b] and a < b) else b
+            node >>= 1
+
+    def argmax(self, lo: int, hi: int) -> int:
+        """[lo, hi) 内得分最高（同分取靠前）的位置，全部已删除时返回 -1"""
+        scores, tree = self.scores, self.tree
+        best, best_score = -1, _NEG_INF
+        lo += self.n
+        hi += self.n
+        while lo < hi:
+            if lo & 1:
+                pos = tree[lo]
+                if scores[pos] > best_score or (scores[pos] == best_score and pos < best):
+                    best, best_score = pos, scores[pos]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                pos = tree[hi]
+                if scores[pos] > best_score or (scores[pos] == best_score and pos < best):
+                    best, best_score = pos, scores[pos]
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def find(self, key: str) -> Tuple[int, int]:
+        return bisect_left(self.keys, key), bisect_right(self.keys, key)
+
+    def iter_top(self, prefix: str) -> Iterator[Tuple[float, int]]:
+        """按得分从高到低逐个产出前缀区间内的 (得分, 条目编号)"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _MAX_CHAR, lo)
+        heap = []
+
+        def push(l: int, h: int) -> None:
+            if l < h:
+                pos = self.argmax(l, h)
+                if pos >= 0:
+                    heapq.heappush(heap, (-self.scores[pos], pos, l, h))
+
+        push(lo, hi)
+        while heap:
+            neg_score, pos, l, h = heapq.heappop(heap)
+            yield -neg_score, self.entries[pos]
+            push(l, pos)
+            push(pos + 1, h)
+
+
+class AutocompleteIndex:
+    """实体名称和同义词的前缀补全索引，条目属性存放在按编号索引的紧凑数组中"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.texts: List[str] = []
+        self.kinds = array("b")
+        self.item_ids = array("i")
+        self.label_ids = array("i")
+        self.scores = array("d")
+        self.active = bytearray()
+        self.alive = bytearray()
+        # 条目在全局表、标签表中的位置，尚在增量区时为 -1
+        self.table_pos = array("i")
+        self.label_table_pos = array("i")
+        # 实体编码与标签编码驻留
+        self.item_code_ids: Dict[str, int] = {}
+        self.item_codes: List[str] = []
+        self.item_names: List[str] = []
+        self.label_code_ids: Dict[str, int] = {}
+        self.label_codes: List[str] = []
+        # 实体编码 -> 条目编号区间（同一实体的条目总是一次连续追加）
+        self.item_entries: Dict[str, range] = {}
+        self.table: Optional[_PrefixTable] = None
+        self.label_tables: Dict[int, _PrefixTable] = {}
+        self.delta: List[int] = []
+        # 增量区中规范化文本 -> 条目编号，累加热度时直接查找
+        self.delta_keys: Dict[str, List[int]] = {}
+        self.dead = 0
+        self.versions: Tuple[int, ...] = ()
+        # 写入互斥；查询不加锁，只读取已追加的数据
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.keys) - self.dead
+
+    def needs_compaction(self) -> bool:
+        return len(self.delta) > DELTA_LIMIT or self.dead > len(self.keys) * COMPACT_RATIO
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            return attribute_sizes(self)
+
+    def _intern(self, codes: Dict[str, int], values: List[str], code: str) -> int:
+        code_id = codes.get(code)
+        if code_id is None:
+            code_id = codes[code] = len(values)
+            values.append(code)
+        return code_id
+
+    # ---------------------------------------------------------------
+    # 写入
+    # ---------------------------------------------------------------
+    def put_item(self, item_code: str, item_name: str, label_code: str, is_active: bool,
+                 updated_at: Optional[datetime], synonyms: Iterable[str]) -> None:
+        with self._lock:
+            self.remove_item(item_code)
+            item_id = self._intern(self.item_code_ids, self.item_codes, item_code)
+            if item_id == len(self.item_names):
+                self.item_names.append(item_name)
+            else:
+                self.item_names[item_id] = item_name
+            label_id = self._intern(self.label_code_ids, self.label_codes, label_code)
+            start = len(self.keys)
+            bonus = recency(updated_at)
+            for kind, text in [(KIND_NAME, item_name)] + [(KIND_SYNONYM, s) for s in synonyms]:
+                key = normalize(text)
+                if not key:
+                    continue
+                entry = len(self.keys)
+                self.keys.append(key)
+                self.texts.append(text)
+                self.kinds.append(kind)
+                self.item_ids.append(item_id)
+                self.label_ids.append(label_id)
+                self.scores.append(popularity.get(key, 0) + bonus)
+                self.active.append(1 if is_active else 0)
+                self.alive.append(1)
+                self.table_pos.append(-1)
+                self.label_table_pos.append(-1)
+                self.delta.append(entry)
+                self.delta_keys.setdefault(key, []).append(entry)
+            self.item_entries[item_code] = range(start, len(self.keys))
+
+    def remove_item(self, item_code: str) -> None:
+        with self._lock:
+            for entry in self.item_entries.pop(item_code, ()):
+                self.alive[entry] = 0
+                self.dead += 1
+                self._set_score(entry, _NEG_INF)
+
+    def _set_score(self, entry: int, score: float) -> None:
+        self.scores[entry] = score
+        if self.table_pos[entry] >= 0:
+            self.table.set_score(self.table_pos[entry], score)
+            self.label_tables[self.label_ids[entry]].set_score(self.label_table_pos[entry], score)
+
+    def seal(self) -> None:
+        """把增量区并入静态表，仅在构建阶段（索引发布前）调用"""
+        with self._lock:
+            order = sorted((e for e in range(len(self.keys)) if self.alive[e]), key=self.keys.__getitem__)
+            by_label: Dict[int, List[int]] = {}
+            for pos, entry in enumerate(order):
+                self.table_pos[entry] = pos
+                group = by_label.setdefault(self.label_ids[entry], [])
+                self.label_table_pos[entry] = len(group)
+                group.append(entry)
+            self.table = self._make_table(order)
+            self.label_tables = {label_id: self._make_table(group) for label_id, group in by_label.items()}
+            self.delta = []
+            self.delta_keys = {}
+
+    def _make_table(self, entries: List[int]) -> _PrefixTable:
+        return _PrefixTable(
+            [self.keys[e] for e in entries],
+            array("i", entries),
+            array("d", [self.scores[e] for e in entries]),
+        )
+
+    def record_hits(self, hits: Dict[str, int]) -> None:
+        """累加文本的热度: hits 为规范化文本 -> 新增的提取次数"""
+        with self._lock:
+            for key, count in hits.items():
+                entries = list(self.delta_keys.get(key, ()))
+                if self.table is not None:
+                    lo, hi = self.table.find(key)
+                    entries.extend(self.table.entries[lo:hi])
+                for entry in entries:
+                    if self.alive[entry]:
+                        self._set_score(entry, self.scores[entry] + count)
+
+    # ---------------------------------------------------------------
+    # 查询
+    # ---------------------------------------------------------------
+    def complete(self, prefix: str, limit: int = 10, label_code: Optional[str] = None,
+                 active_only: bool = False) -> List[dict]:
+        key = normalize(prefix)
+        if not key:
+            return []
+        if label_code is None:
+            label_id, table = None, self.table
+        else:
+            label_id = self.label_code_ids.get(label_code)
+            if label_id is None:
+                return []
+            table = self.label_tables.get(label_id)
+
+        seen = set()
+        results: List[Tuple[float, int]] = []
+
+        def accept(entry: int) -> bool:
+            if not self.alive[entry] or (active_only and not self.active[entry]):
+                return False
+            # 同一实体的名称和同义词规范化后相同时只保留一条
+            marker = (self.keys[entry], self.item_ids[entry])
+            if marker in seen:
+                return False
+            seen.add(marker)
+            return True
+
+        # 增量区条目很少，直接扫描
+        delta_hits = sorted(
+            ((self.scores[e], -e) for e in list(self.delta)
+             if self.keys[e].startswith(key) and (label_id is None or self.label_ids[e] == label_id)),
+            reverse=True,
+        )
+        for score, neg_entry in delta_hits:
+            if len(results) >= limit:
+                break
+            if accept(-neg_entry):
+                results.append((score, neg_entry))
+
+        if table is not None:
+            taken = 0
+            for score, entry in table.iter_top(key):
+                if score == _NEG_INF or taken >= limit:
+                    break
+                if accept(entry):
+                    results.append((score, -entry))
+                    taken += 1
+
+        return [self._entry_dict(-neg_entry, score) for score, neg_entry in heapq.nlargest(limit, results)]
+
+    def _entry_dict(self, entry: int, score: float) -> dict:
+        item_id = self.item_ids[entry]
+        return {
+            "text": self.texts[entry],
+            "kind": KIND_NAMES[self.kinds[entry]],
+            "item_code": self.item_codes[item_id],
+            "item_name": self.item_names[item_id],
+            "label_code": self.label_codes[self.label_ids[entry]],
+            "is_active": bool(self.active[entry]),
+            "hits": int(score),
+        }
+
+
+def build_autocomplete_index(db: Session) -> AutocompleteIndex:
+    """从数据库全量构建补全索引"""
+    index = AutocompleteIndex()
+    index.versions = cache.versions(*AUTOCOMPLETE_NAMESPACES)
+    synonyms_by_item: Dict[str, List[str]] = {}
+    for item_code, synonym in db.execute(
+        select(ItemSynonym.item_code, ItemSynonym.synonym).order_by(ItemSynonym.id)
+    ):
+        synonyms_by_item.setdefault(item_code, []).append(synonym)
+    for item_code, item_name, label_code, is_active, updated_at in db.execute(
+        select(Item.item_code, Item.item_name, Item.label_code, Item.is_active, Item.updated_at).order_by(Item.id)
+    ):
+        index.put_item(item_code, item_name, label_code, is_active, updated_at, synonyms_by_item.get(item_code, []))
+    index.seal()
+    return index
+
+
+class AutocompleteIndexManager(IncrementalIndexManager[AutocompleteIndex]):
+    """维护当前进程的补全索引，实体写操作后增量更新"""
+
+    def __init__(self):
+        super().__init__("autocomplete-index", AUTOCOMPLETE_NAMESPACES, build_autocomplete_index)
+
+    def items_changed(self, db: Session, item_codes: List[str]) -> None:
+        rows = dict((r[0], r[1:]) for r in db.execute(
+            select(Item.item_code, Item.item_name, Item.label_code, Item.is_active, Item.updated_at)
+            .where(Item.item_code.in_(item_codes))
+        ))
+        synonyms: Dict[str, List[str]] = {}
+        for item_code, synonym in db.execute(
+            select(ItemSynonym.item_code, ItemSynonym.synonym)
+            .where(ItemSynonym.item_code.in_(item_codes)).order_by(ItemSynonym.id)
+        ):
+            synonyms.setdefault(item_code, []).append(synonym)
+
+        def update(index: AutocompleteIndex):
+            for item_code in item_codes:
+                if item_code in rows:
+                    index.put_item(item_code, *rows[item_code], synonyms.get(item_code, []))
+                else:
+                    index.remove_item(item_code)
+        self.apply("items", update)
+
+    def record_hits(self, texts: Dict[str, int]) -> None:
+        """累加一批文本的提取次数（由 recognition_stats 的后台刷新调用）"""
+        hits: Dict[str, int] = {}
+        for text, count in texts.items():
+            key = normalize(text)
+            if key:
+                hits[key] = hits.get(key, 0) + count
+        for key, count in hits.items():
+            popularity[key] = popularity.get(key, 0) + count
+        index = self.index
+        if index is not None:
+            index.record_hits(hits)
+
+
+autocomplete_index = AutocompleteIndexManager()
+subscribe("items", autocomplete_index.items_changed)
+recognition_stats.on_entity_hits(autocomplete_index.record_hits)
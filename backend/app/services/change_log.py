@@ -0,0 +1,139 @@
+"""
+数据变更日志 (change feed)
+
+标签体系、标签、实体、意图规则的每次写操作在提交前由 record_change 把变更记入 change_log 表，
+每条记录带单调递增的序号 seq，下游服务和边缘节点据此增量同步，而不必整体重新下载:
+- GET /api/v1/changes?since=<seq> 分页拉取 seq 之后的变更
+- GET /api/v1/changes/stream 以 Server-Sent Events 实时推送（断线后浏览器带 Last-Event-ID 续传）
+
+记录内容为 (seq, 命名空间, 业务编码, 操作)，操作为:
+- upsert: 新建或修改（实体的删除是停用，同样记为 upsert；物理删除实体子树时记为 delete），镜像按编码重新获取该记录
+- delete: 记录已删除
+- bulk: 批量变更（不带编码，或编码超过 BULK_CHANGE_KEYS 个），镜像应整体重新同步该命名空间
+
+变更日志与业务数据写在同一事务中，一起提交或一起回滚，已提交的修改不会漏记，回滚的修改也不会留下记录。
+序号由单行计数器 change_sequence 分配（表和初始行见 database_schema_v2.sql）: 计数器的行锁持有到事务提交，
+各 worker 按提交顺序取号，读取方按 seq > since 拉取不会漏掉较晚提交的小序号。
+日志只保留最近 CHANGE_LOG_MAX_ENTRIES 条，since 早于保留范围时返回 reset_required，镜像需整体重新同步后从 latest_seq 继续。
+"""
+import asyncio
+import threading
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.core.events import BULK_CHANGE_KEYS
+from backend.app.models import ChangeLogEntry, ChangeSequence
+
+# 记录变更的命名空间（与服务层 record_change 使用的命名空间一致）
+CHANGE_FEED_NAMESPACES = ("tag_systems", "labels", "items", "intent_rules")
+
+OPERATIONS = ("upsert", "delete", "bulk")
+
+# 每写入这么多条检查一次保留数量
+_PRUNE_EVERY = 1000
+
+
+class ChangeNotifier:
+    """进程内的新变更通知: 写入线程调用 notify，SSE 流在事件循环中等待"""
+
+    def __init__(self):
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[asyncio.Event]:
+        """注册一个订阅；已有 limit 个订阅时不注册并返回 None（检查和注册在同一把锁内完成）"""
+        event = asyncio.Event()
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, event: asyncio.Event) -> None:
+        with self._lock:
+            self._subscribers = {(loop, e) for loop, e in self._subscribers if e is not event}
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def notify(self) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(event)
+
+
+change_notifier = ChangeNotifier()
+
+
+class ChangeLog:
+    """变更日志的写入和读取"""
+
+    def record(self, db: Session, namespace: str, keys: Iterable[str], operation: str = "upsert") -> Optional[int]:
+        """
+        在调用方的事务中记录一次变更（不提交），返回最后一条记录的序号；不记录的命名空间返回 None
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown change operation {operation}.")
+        if namespace not in CHANGE_FEED_NAMESPACES:
+            return None
+        keys = list(dict.fromkeys(keys))
+        if not keys or len(keys) > BULK_CHANGE_KEYS:
+            rows = [(None, "bulk")]
+        else:
+            rows = [(key, operation) for key in keys]
+
+        result = db.execute(
+            update(ChangeSequence).where(ChangeSequence.id == 1)
+            .values(last_seq=ChangeSequence.last_seq + len(rows))
+        )
+        if result.rowcount != 1:
+            raise RuntimeError("change_sequence is not initialized, apply database_schema_v2.sql or run init_db.py.")
+        last_seq = db.scalar(select(ChangeSequence.last_seq).where(ChangeSequence.id == 1))
+        first_seq = last_seq - len(rows) + 1
+        db.execute(insert(ChangeLogEntry), [
+            {"seq": first_seq + i, "namespace": namespace, "entity_key": key, "operation": op}
+            for i, (key, op) in enumerate(rows)
+        ])
+        if (first_seq - 1) // _PRUNE_EVERY != last_seq // _PRUNE_EVERY:
+            db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.seq <= last_seq - settings.CHANGE_LOG_MAX_ENTRIES))
+        return last_seq
+
+    def latest_seq(self, db: Session) -> int:
+        return db.scalar(select(ChangeSequence.last_seq).where(ChangeSequence.id == 1)) or 0
+
+    def changes_since(self, db: Session, since: int, limit: int) -> dict:
+        """seq 大于 since 的变更，按序号升序，最多 limit 条"""
+        latest = self.latest_seq(db)
+        oldest = db.scalar(select(func.min(ChangeLogEntry.seq)))
+        # 所需的记录已被清理，或 since 超过了当前序号（如数据库被重建）
+        reset_required = since > latest or (since < latest and (oldest is None or since < oldest - 1))
+        rows = [] if reset_required else db.execute(
+            select(ChangeLogEntry.seq, ChangeLogEntry.namespace, ChangeLogEntry.entity_key,
+                   ChangeLogEntry.operation, ChangeLogEntry.created_at)
+            .where(ChangeLogEntry.seq > since).order_by(ChangeLogEntry.seq).limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        changes: List[dict] = [
+            {"seq": seq, "namespace": namespace, "key": key, "operation": operation, "created_at": created_at}
+            for seq, namespace, key, operation, created_at in rows[:limit]
+        ]
+        return {
+            "changes": changes,
+            "since": since,
+            "next_since": changes[-1]["seq"] if changes else (latest if reset_required else since),
+            "has_more": has_more,
+            "latest_seq": latest,
+            "reset_required": reset_required,
+        }
+
+
+change_log = ChangeLog()
@@ -0,0 +1,252 @@
+"""
+长文档识别
+
+手册、工单往来、聊天记录等长文本按句子或段落切成互相重叠的窗口，在进程池中并行扫描
+（规则匹配 + 实体提取），实体位置换算回全文偏移后按窗口去重，每个窗口给出自己的意图。
+结果按窗口完成的先后逐个产出，由接口以 NDJSON 流式返回。
+
+窗口 k 覆盖 [start, end)，其中 [start, own_start) 与上一个窗口重叠 (own_start 即上一个窗口的 end)。
+落在重叠区内且完整包含在上一个窗口中的实体由上一个窗口报告，当前窗口丢弃，因此跨窗口不会重复；
+跨越上一个窗口末尾的实体只有当前窗口能完整看到，由当前窗口报告。重叠长度应不小于最长的实体/规则文本。
+与短文本识别一致，同一窗口内同一个表面形式只报告首次出现的位置: 首次出现在重叠区内被丢弃时，
+从该处之后继续查找，报告它在当前窗口自己范围内的首次出现。
+
+进程池中的 worker 以只读方式 mmap 同一个识别数据包文件，只传递窗口文本，不传递规则和实体数据。
+窗口数较少、进程池被关闭 (DOCUMENT_POOL_WORKERS=0) 或数据包文件已被清理时在当前线程中扫描。
+"""
+import bisect
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.app.core.config import settings
+from backend.app.services.recognition_bundle import RecognitionBundle
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"[。！？!?；;…]+[”’\"')）]*|\n+")
+_PARAGRAPH_END = re.compile(r"\n\s*\n")
+
+# 进程池 worker 中按文件路径缓存已打开的数据包
+_worker_bundles: Dict[str, RecognitionBundle] = {}
+
+
+def unit_boundaries(text: str, mode: str = "sentence") -> List[int]:
+    """句子/段落的切分位置（升序，含 0 和 len(text)）"""
+    pattern = _PARAGRAPH_END if mode == "paragraph" else _SENTENCE_END
+    bounds = [0]
+    bounds.extend(match.end() for match in pattern.finditer(text) if 0 < match.end() < len(text))
+    bounds.append(len(text))
+    return bounds
+
+
+def split_windows(text: str, window_chars: int, overlap_chars: int,
+                  mode: str = "sentence") -> List[Tuple[int, int, int]]:
+    """
+    把文本切成 (start, own_start, end) 窗口: 窗口尽量在句子/段落边界处结束，长度不超过 window_chars；
+    下一个窗口从上一个窗口末尾往前至多 overlap_chars 处的边界开始。单个句子超长时按字符硬切。
+    """
+    if window_chars <= overlap_chars:
+        raise ValueError("window_chars must be greater than overlap_chars.")
+    n = len(text)
+    bounds = unit_boundaries(text, mode)
+    windows = []
+    own_start = 0
+    while own_start < n:
+        if own_start == 0:
+            start = 0
+        else:
+            # 重叠区内最靠前的边界，没有则按字符回退
+            i = bisect.bisect_left(bounds, own_start - overlap_chars)
+            start = bounds[i] if bounds[i] < own_start else max(own_start - overlap_chars, 0)
+        limit = min(start + window_chars, n)
+        # 不超过 limit 的最后一个边界，且必须越过 own_start
+        j = bisect.bisect_right(bounds, limit) - 1
+        end = bounds[j] if bounds[j] > own_start else limit
+        windows.append((start, own_start, end))
+        own_start = end
+    return windows
+
+
+def scan_window(bundle: RecognitionBundle, start: int, own_start: int, text: str) -> dict:
+    """扫描一个窗口: 规则匹配和实体提取，实体位置换算为全文偏移并丢弃应由上一个窗口报告的实体"""
+    entities = []
+    pending = None  # 首次出现在重叠区内、需要继续查找的表面形式
+    offset = 0
+    while True:
+        dropped = {}
+        for entity in bundle.extract_entities(text[offset:]):
+            if pending is not None and entity["entity_value"] not in pending:
+                continue
+            entity_start, entity_end = entity["start_pos"] + offset + start, entity["end_pos"] + offset + start
+            if entity_start < own_start and entity_end <= own_start:
+                dropped[entity["entity_value"]] = entity_end - start
+                continue
+            entity["start_pos"], entity["end_pos"] = entity_start, entity_end
+            entities.append(entity)
+        if not dropped:
+            break
+        # 被丢弃的都完整位于重叠区内，offset 严格递增，至多扫描到 own_start
+        pending, offset = set(dropped), max(dropped.values())
+    entities.sort(key=lambda e: (e["start_pos"], e["end_pos"]))
+    return {"matched_rules": bundle.match_rules(text), "entities": entities}
+
+
+def _scan_in_worker(path: str, start: int, own_start: int, text: str) -> dict:
+    """进程池 worker 的入口: 按路径打开（并缓存）数据包后扫描"""
+    bundle = _worker_bundles.get(path)
+    if bundle is None:
+        if len(_worker_bundles) >= 2:
+            _worker_bundles.clear()
+        bundle = _worker_bundles[path] = RecognitionBundle.open(Path(path))
+    return scan_window(bundle, start, own_start, text)
+
+
+def _noop() -> None:
+    pass
+
+
+class DocumentScanPool:
+    """懒创建的扫描进程池 (forkserver/spawn 启动，不继承 web worker 的线程和连接)"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def start(self) -> None:
+        """启动进程池并让每个进程完成导入，首个长文档请求不必等待进程启动"""
+        executor = self.executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(_noop)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+document_pool = DocumentScanPool(settings.DOCUMENT_POOL_WORKERS)
+
+
+class DocumentRecognizer:
+    """长文档识别，逐个产出窗口结果，最后产出汇总"""
+
+    def __init__(self, bundle: RecognitionBundle, window_chars: Optional[int] = None,
+                 overlap_chars: Optional[int] = None, mode: str = "sentence"):
+        self.bundle = bundle
+        self.window_chars = window_chars or settings.DOCUMENT_WINDOW_CHARS
+        self.overlap_chars = settings.DOCUMENT_OVERLAP_CHARS if overlap_chars is None else overlap_chars
+        self.mode = mode
+
+    def recognize(self, text: str) -> Iterator[dict]:
+        started = time.perf_counter()
+        windows = split_windows(text, self.window_chars, self.overlap_chars, self.mode)
+        executor = document_pool.executor() if len(windows) >= settings.DOCUMENT_PARALLEL_MIN_WINDOWS else None
+        path = str(self.bundle.path) if self.bundle.path is not None else None
+
+        intents: Dict[str, dict] = {}
+        entity_count = 0
+        if executor is None or path is None:
+            results = ((index, scan_window(self.bundle, start, own, text[start:end]))
+                       for index, (start, own, end) in enumerate(windows))
+        else:
+            results = self._scan_parallel(executor, path, text, windows)
+        for index, result in results:
+            segment = self._segment(index, windows[index], result)
+            entity_count += len(segment["entities"])
+            if segment["label_code"] is not None:
+                summary = intents.setdefault(segment["label_code"], {
+                    "label_code": segment["label_code"], "intent": segment["intent"], "segments": [], "confidence": 0.0,
+                })
+                summary["segments"].append(index)
+                summary["confidence"] = max(summary["confidence"], segment["confidence"])
+            yield segment
+
+        for summary in intents.values():
+            summary["segments"].sort()
+        yield {
+            "type": "summary",
+            "segments": len(windows),
+            "characters": len(text),
+            "intents": sorted(intents.values(), key=lambda s: (-len(s["segments"]), -s["confidence"])),
+            "entity_count": entity_count,
+            "snapshot_version": self.bundle.version,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _scan_parallel(self, executor: ProcessPoolExecutor, path: str, text: str,
+                       windows: List[Tuple[int, int, int]]) -> Iterator[Tuple[int, dict]]:
+        """窗口并行扫描，按完成顺序产出；同时在途的窗口数有上限，避免一次性复制整篇文档到队列"""
+        in_flight: Dict[Future, int] = {}
+        limit = max(document_pool.workers * 4, 1)
+        next_index = 0
+        try:
+            while next_index < len(windows) or in_flight:
+                while next_index < len(windows) and len(in_flight) < limit:
+                    start, own, end = windows[next_index]
+                    try:
+                        future = executor.submit(_scan_in_worker, path, start, own, text[start:end])
+                    except BrokenProcessPool as e:
+                        # 进程池已损坏（如子进程被杀）: 丢弃，下次请求重新创建；本次剩余窗口在当前线程扫描
+                        logger.warning("document scan pool broken, scanning inline: %s", e)
+                        document_pool.shutdown()
+                        for index in range(next_index, len(windows)):
+                            start, own, end = windows[index]
+                            yield index, scan_window(self.bundle, start, own, text[start:end])
+                        next_index = len(windows)
+                        break
+                    in_flight[future] = next_index
+                    next_index += 1
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # 数据包文件已被清理、进程池异常等: 退回当前线程扫描
+                        logger.warning("document window %s scanned inline: %s", index, e)
+                        start, own, end = windows[index]
+                        result = scan_window(self.bundle, start, own, text[start:end])
+                    yield index, result
+        finally:
+            # 客户端断开时取消尚未开始的窗口
+            for future in in_flight:
+                future.cancel()
+
+    def _segment(self, index: int, window: Tuple[int, int, int], result: dict) -> dict:
+        start, own_start, end = window
+        rules = result["matched_rules"]
+        label_code = rules[0]["label_code"] if rules else None
+        return {
+            "type": "segment",
+            "index": index,
+            "start": start,
+            "own_start": own_start,
+            "end": end,
+            "label_code": label_code,
+            "intent": (self.bundle.label_name(label_code) or "未知意图") if label_code else "未识别",
+            "confidence": rules[0]["confidence"] if rules else 0.0,
+            "matched_rules": rules,
+            "entities": result["entities"],
+        }
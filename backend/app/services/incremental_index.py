@@ -0,0 +1,100 @@
+"""
+进程内索引的维护
+
+搜索索引、自动补全索引等内存索引共用的维护逻辑: 首次使用时全量构建；
+本进程的写操作通过 core.events 的监听器增量更新；若发现其他 worker 的写入（缓存版本号跳变）
+或索引需要压缩，则在后台重建，重建期间继续使用旧索引。
+
+被维护的索引对象需要提供 ``versions`` 属性（构建时各命名空间的缓存版本号）
+和 ``needs_compaction()`` 方法。
+"""
+import logging
+import threading
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import cache
+from backend.app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+IndexT = TypeVar("IndexT")
+
+
+class IncrementalIndexManager(Generic[IndexT]):
+    """维护当前进程的某个内存索引"""
+
+    def __init__(self, name: str, namespaces: Tuple[str, ...], build: Callable[[Session], IndexT]):
+        self.name = name
+        self.namespaces = namespaces
+        self.build = build
+        self.index: Optional[IndexT] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def get(self, db: Optional[Session] = None) -> IndexT:
+        index = self.index
+        if index is None:
+            with self._lock:
+                if self.index is None:
+                    self.index = self._build(db)
+                return self.index
+        if index.versions != cache.versions(*self.namespaces) or index.needs_compaction():
+            self.rebuild_in_background()
+        return index
+
+    def get_current(self, db: Session) -> IndexT:
+        """返回与数据库一致的索引；版本落后（其他 worker 写入过）时同步重建，供写操作前的校验使用"""
+        index = self.get(db)
+        if index.versions != cache.versions(*self.namespaces):
+            index = self._build(db)
+            with self._lock:
+                self.index = index
+        return index
+
+    def _build(self, db: Optional[Session]) -> IndexT:
+        if db is not None:
+            return self.build(db)
+        session = SessionLocal()
+        try:
+            return self.build(session)
+        finally:
+            session.close()
+
+    def rebuild_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                index = self._build(None)
+                with self._lock:
+                    self.index = index
+            except Exception:
+                logger.exception("%s rebuild failed", self.name)
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name=f"{self.name}-rebuild", daemon=True).start()
+
+    def apply(self, namespace: str, update: Callable[[IndexT], None]) -> None:
+        """
+        应用本进程的写操作。调用前服务层已 invalidate 该命名空间，
+        若版本号恰好比索引记录的多 1，说明期间没有其他写入，可增量更新；否则交给后台重建。
+        """
+        with self._lock:
+            index = self.index
+            if index is None:
+                return
+            position = self.namespaces.index(namespace)
+            current = cache.versions(*self.namespaces)
+            expected = list(index.versions)
+            expected[position] += 1
+            if tuple(expected) == current:
+                update(index)
+                index.versions = current
+                return
+        self.rebuild_in_background()
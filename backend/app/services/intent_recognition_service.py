@@ -0,0 +1,178 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.schemas import ExtractedEntity, IntentRecognitionResponse, MatchedRule
+from backend.app.services.intent_rule_service import IntentRuleService
+from backend.app.services.item_service import ItemService
+from backend.app.services.recognition_bundle import RecognitionBundle, get_recognition_bundle
+from backend.app.services.recognition_coalescing import coalescing_key, recognition_flight
+from backend.app.services.recognition_stats import recognition_stats
+from backend.app.services import session_context
+from backend.app.services.session_context import SessionStoreError, session_id_of
+
+logger = logging.getLogger(__name__)
+
+UNRECOGNIZED_INTENT = "未识别"
+
+# 会话中保存的实体字段（含实体链接，补全的实体同样带有编码和路径）
+SESSION_ENTITY_FIELDS = (
+    "entity_type", "entity_value", "start_pos", "end_pos", "item_code", "item_name", "item_path", "label_path",
+)
+
+
+class IntentRecognitionService:
+    """意图识别: 规则匹配 + 实体提取，供识别接口和离线工具（流量回放等）共用"""
+
+    def __init__(self, db: Session, session_store=session_context.DEFAULT_STORE):
+        """session_store 默认使用配置的会话存储；离线工具传入独立的存储（None 表示不使用会话上下文）"""
+        self.db = db
+        self.session_store = session_context.session_store if session_store is session_context.DEFAULT_STORE \
+            else session_store
+
+    def recognize_coalesced(self, text: str, context: Optional[Dict[str, Any]] = None
+                            ) -> Tuple[Optional[str], IntentRecognitionResponse, bool]:
+        """
+        与 recognize 相同，但与正在进行的相同请求（文本、context、快照版本均相同）合并，
+        返回值多一项: 是否复用了其他请求的结果。复用时同样累加规则命中计数。
+        """
+        bundle = get_recognition_bundle(self.db)
+        key = coalescing_key(text, context, bundle.version)
+        (label_code, response), shared = recognition_flight.do(key, lambda: self.recognize(text, context, bundle))
+        if shared:
+            recognition_stats.record_rule_hits({"rule_code": rule.rule_code} for rule in response.matched_rules)
+        return label_code, response, shared
+
+    def recognize_batch(self, texts: List[str], context: Optional[Dict[str, Any]] = None
+                        ) -> List[Tuple[Optional[str], IntentRecognitionResponse, bool]]:
+        """按输入顺序逐条识别；同一批内的重复文本只识别一次（多轮会话除外，每条作为一轮）"""
+        seen: Dict[str, Tuple[Optional[str], IntentRecognitionResponse, bool]] = {}
+        results = []
+        for text in texts:
+            if text in seen:
+                label_code, response, _ = seen[text]
+                recognition_stats.record_rule_hits({"rule_code": rule.rule_code} for rule in response.matched_rules)
+                results.append((label_code, response, True))
+                continue
+            result = self.recognize_coalesced(text, context)
+            if coalescing_key(text, context, result[1].snapshot_version) is not None:
+                seen[text] = result
+            results.append(result)
+        return results
+
+    def recognize(self, text: str, context: Optional[Dict[str, Any]] = None,
+                  bundle: Optional[RecognitionBundle] = None) -> Tuple[Optional[str], IntentRecognitionResponse]:
+        """
+        识别一段文本，返回 (最佳匹配的标签编码, 响应)；未识别时标签编码为 None。
+        context 中带 session_id 时使用会话上下文:
+        - 本轮缺少的实体类型由上一轮的实体补全
+        - 本轮没有匹配到规则但提取到了实体时，沿用上一轮的意图
+        传入 bundle 时使用指定的快照。
+        """
+        session_id = session_id_of(context) if self.session_store is not None else None
+        previous = self._load_session(session_id) if session_id is not None else None
+
+        # 整次识别使用同一个快照，发布/回滚不会让一次请求读到两个版本
+        bundle = bundle or get_recognition_bundle(self.db)
+        matched_rules_data = IntentRuleService(self.db).match_rules(text, bundle)
+        label_code, intent_name, confidence = None, UNRECOGNIZED_INTENT, 0.0
+        intent_from_context = False
+
+        if matched_rules_data:
+            # 最佳匹配和目标意图
+            best_rule = matched_rules_data[0]
+            label_code, confidence = best_rule["label_code"], best_rule["confidence"]
+            intent_name = bundle.label_name(label_code) or "未知意图"
+            extracted_entities_data = ItemService(self.db).extract_entities_from_text(text, bundle)
+        elif session_id is not None:
+            # 多轮对话中只补充实体的一轮（如只说了型号），同样提取实体
+            extracted_entities_data = ItemService(self.db).extract_entities_from_text(text, bundle)
+            if previous and previous.get("label_code") and extracted_entities_data:
+                label_code, intent_name, confidence = previous["label_code"], previous["intent"], previous["confidence"]
+                intent_from_context = True
+        else:
+            extracted_entities_data = []
+
+        carried = []
+        if previous:
+            present = {entity["entity_type"] for entity in extracted_entities_data}
+            carried = [entity for entity in previous.get("entities", []) if entity["entity_type"] not in present]
+        if session_id is not None:
+            self._save_session(session_id, previous, label_code, intent_name, confidence,
+                               extracted_entities_data + carried)
+
+        entities = [ExtractedEntity(**entity) for entity in extracted_entities_data]
+        entities += [ExtractedEntity(**entity, from_context=True) for entity in carried]
+
+        if label_code is None:
+            return None, IntentRecognitionResponse(
+                intent=UNRECOGNIZED_INTENT,
+                confidence=0.0,
+                matched_rules=[],
+                extracted_entities=entities,
+                suggested_actions=["请提供更明确的描述"],
+                snapshot_version=bundle.version
+            )
+
+        suggested_actions = generate_suggested_actions(intent_name, extracted_entities_data + carried)
+
+        return label_code, IntentRecognitionResponse(
+            intent=intent_name,
+            confidence=confidence,
+            matched_rules=[
+                MatchedRule(
+                    rule_code=rule["rule_code"],
+                    rule_type=rule["rule_type"],
+                    rule_entity=rule["rule_entity"],
+                    matched_text=rule["matched_text"],
+                    confidence=rule["confidence"]
+                ) for rule in matched_rules_data
+            ],
+            extracted_entities=entities,
+            suggested_actions=suggested_actions,
+            intent_from_context=intent_from_context,
+            snapshot_version=bundle.version
+        )
+
+    def _load_session(self, session_id: str) -> Optional[dict]:
+        try:
+            return self.session_store.get(session_id)
+        except SessionStoreError as e:
+            logger.warning("session context unavailable: %s", e)
+            return None
+
+    def _save_session(self, session_id: str, previous: Optional[dict], label_code: Optional[str], intent_name: str,
+                      confidence: float, entities: List[dict]) -> None:
+        """保存本轮之后的会话状态；本轮未识别时保留之前的意图"""
+        if label_code is None and previous:
+            label_code, intent_name, confidence = previous.get("label_code"), previous["intent"], previous["confidence"]
+        state = {
+            "label_code": label_code,
+            "intent": intent_name,
+            "confidence": confidence,
+            "entities": [
+                {key: entity[key] for key in SESSION_ENTITY_FIELDS if key in entity}
+                for entity in entities
+            ],
+            "turns": (previous or {}).get("turns", 0) + 1,
+        }
+        try:
+            self.session_store.set(session_id, state)
+        except SessionStoreError as e:
+            logger.warning("session context unavailable: %s", e)
+
+
+def generate_suggested_actions(intent_name: str, extracted_entities: List[dict]) -> List[str]:
+    """生成建议操作"""
+    actions = []
+    if "故障码" in intent_name:
+        actions.append("查询故障码详细信息")
+        actions.append("提供故障码解决方案")
+        if extracted_entities:
+            actions.append(f"分析{extracted_entities[0]['entity_value']}相关故障")
+    elif "代码" in intent_name or "编程" in intent_name:
+        actions.append("提供代码示例")
+    else:
+        actions.append("提供相关帮助")
+    return actions
@@ -1,7 +1,12 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from backend.app.models import IntentRule
 from backend.app.core.schemas import IntentRuleCreate, IntentRuleUpdate
+from backend.app.core.events import publish_changes, record_change
+from backend.app.services.recognition_bundle import RecognitionBundle, get_recognition_bundle
+from backend.app.services.recognition_stats import recognition_stats
+from backend.app.services.regex_rules import validate_rule
 
 class IntentRuleService:
     def __init__(self, db: Session):
@@ -16,13 +21,26 @@ class IntentRuleService:
     def get_by_label(self, label_code: str) -> List[IntentRule]:
         return self.db.query(IntentRule).filter(IntentRule.label_code == label_code).all()
 
+    def get_by_label_rows(self, label_code: str) -> List[dict]:
+        """与 get_by_label 相同的数据，直接由行元组构建字典（字段顺序同 IntentRuleResponse）"""
+        columns = (
+            IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity, IntentRule.label_code,
+            IntentRule.is_active, IntentRule.id, IntentRule.created_at, IntentRule.updated_at,
+        )
+        keys = [column.key for column in columns]
+        rows = self.db.execute(select(*columns).where(IntentRule.label_code == label_code)).all()
+        return [dict(zip(keys, row)) for row in rows]
+
     def create(self, rule_create: IntentRuleCreate) -> IntentRule:
         if self.get_by_code(rule_create.rule_code):
             raise ValueError(f"Rule with code {rule_create.rule_code} already exists.")
+        validate_rule(rule_create.rule_type, rule_create.rule_entity)
         
         db_rule = IntentRule(**rule_create.dict())
         self.db.add(db_rule)
+        record_change(self.db, "intent_rules", db_rule.rule_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_rule)
         return db_rule
 
@@ -32,10 +50,13 @@ class IntentRuleService:
             return None
         
         update_data = rule_update.dict(exclude_unset=True)
+        validate_rule(update_data.get("rule_type", db_rule.rule_type), update_data.get("rule_entity", db_rule.rule_entity))
         for field, value in update_data.items():
             setattr(db_rule, field, value)
             
+        record_change(self.db, "intent_rules", db_rule.rule_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_rule)
         return db_rule
 
@@ -45,10 +66,13 @@ class IntentRuleService:
             return None
         
         update_data = rule_update.dict(exclude_unset=True)
+        validate_rule(update_data.get("rule_type", db_rule.rule_type), update_data.get("rule_entity", db_rule.rule_entity))
         for field, value in update_data.items():
             setattr(db_rule, field, value)
             
+        record_change(self.db, "intent_rules", db_rule.rule_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_rule)
         return db_rule
 
@@ -57,8 +81,11 @@ class IntentRuleService:
         if not db_rule:
             return False
         
+        rule_code = db_rule.rule_code
         self.db.delete(db_rule)
+        record_change(self.db, "intent_rules", rule_code, operation="delete")
         self.db.commit()
+        publish_changes(self.db)
         return True
 
     def delete(self, rule_code: str) -> bool:
@@ -66,49 +93,20 @@ class IntentRuleService:
         if not db_rule:
             return False
         
+        rule_code = db_rule.rule_code
         self.db.delete(db_rule)
+        record_change(self.db, "intent_rules", rule_code, operation="delete")
         self.db.commit()
+        publish_changes(self.db)
         return True
 
-    def match_rules(self, text: str) -> List[dict]:
+    def match_rules(self, text: str, bundle: Optional[RecognitionBundle] = None) -> List[dict]:
         """
         Matches input text against all active rules.
         Returns a list of matched rule dicts, sorted by confidence.
+        Matching runs on the compiled recognition bundle (one automaton pass over the text);
+        pass ``bundle`` to match against a specific snapshot.
         """
-        active_rules = self.db.query(IntentRule).filter(IntentRule.is_active == True).all()
-        matched_rules = []
-        text = text.lower()
-
-        for rule in active_rules:
-            confidence = 0.0
-            matched_text = ""
-
-            if rule.rule_type == 'keyword':
-                keywords = [k.strip().lower() for k in rule.rule_entity.split(',')]
-                for keyword in keywords:
-                    if keyword in text:
-                        confidence = 0.9 # High confidence for keyword match
-                        matched_text = keyword
-                        break # Stop after first keyword match for this rule
-            
-            elif rule.rule_type == 'expression':
-                # Simple substring search for now. Can be extended to regex.
-                pattern = rule.rule_entity.lower()
-                # A placeholder for a more complex pattern like "{产品型号}报{故障码}"
-                # This simple version doesn't handle placeholders.
-                if pattern in text:
-                    confidence = 0.7 # Medium confidence for expression match
-                    matched_text = pattern
-
-            if confidence > 0:
-                matched_rules.append({
-                    "rule_code": rule.rule_code,
-                    "rule_type": rule.rule_type,
-                    "rule_entity": rule.rule_entity,
-                    "label_code": rule.label_code,
-                    "matched_text": matched_text,
-                    "confidence": confidence,
-                })
-
-        # Sort by confidence descending
-        return sorted(matched_rules, key=lambda k: k['confidence'], reverse=True)
+        matched = (bundle or get_recognition_bundle(self.db)).match_rules(text)
+        recognition_stats.record_rule_hits(matched)
+        return matched
@@ -1,7 +1,12 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete as sql_delete, insert, literal, null, select, update
+from sqlalchemy.orm import Session, aliased, joinedload
 from typing import List, Optional
-from backend.app.models import Item, ItemSynonym
+from backend.app.models import Item, ItemSynonym, Label
 from backend.app.core.schemas import ItemCreate, ItemUpdate
+from backend.app.core.events import publish_changes, record_change
+from backend.app.services.recognition_bundle import RecognitionBundle, get_recognition_bundle
+from backend.app.services.surface_index import SurfaceCollisionError, surface_index
+from backend.app.utils.subtree import chunks, subtree_codes
 
 class ItemService:
     def __init__(self, db: Session):
@@ -42,32 +47,86 @@ class ItemService:
         
         return result
 
+    def get_by_label_rows(self, label_code: str) -> List[dict]:
+        """
+        与 get_by_label 返回相同结构，但直接由行元组构建，不创建 ORM 对象。
+        父级名称通过自连接一次取出，同义词用一条查询批量取出。
+        """
+        parent = aliased(Item)
+        rows = self.db.execute(
+            select(
+                Item.id, Item.item_name, Item.item_code, Item.parent_item_code, parent.item_name,
+                Item.label_code, Item.description, Item.is_active, Item.created_at, Item.updated_at,
+            )
+            .outerjoin(parent, parent.item_code == Item.parent_item_code)
+            .where(Item.label_code == label_code)
+            .order_by(Item.id)
+        ).all()
+
+        synonyms_by_item = {}
+        for item_code, synonym in self.db.execute(
+            select(ItemSynonym.item_code, ItemSynonym.synonym)
+            .join(Item, Item.item_code == ItemSynonym.item_code)
+            .where(Item.label_code == label_code)
+            .order_by(ItemSynonym.id)
+        ):
+            synonyms_by_item.setdefault(item_code, []).append(synonym)
+
+        keys = (
+            "id", "item_name", "item_code", "parent_item_code", "parent_item_name",
+            "label_code", "description", "is_active", "created_at", "updated_at",
+        )
+        result = []
+        for row in rows:
+            item_dict = dict(zip(keys, row))
+            item_dict["synonyms"] = synonyms_by_item.get(row[2], [])
+            result.append(item_dict)
+        return result
+
     def get_children(self, parent_item_code: str) -> List[Item]:
         return self.db.query(Item).filter(Item.parent_item_code == parent_item_code).all()
 
-    def create(self, item_create: ItemCreate) -> Item:
+    def check_surface_collisions(self, item_code: str, item_name: str, synonyms: List[str]) -> List[dict]:
+        """返回实体新增的名称/同义词中已被其他可用实体使用的部分"""
+        return surface_index.get_current(self.db).find_conflicts(item_code, item_name, synonyms)
+
+    def create(self, item_create: ItemCreate, allow_collision: bool = False) -> Item:
         if self.get_by_code(item_create.item_code):
             raise ValueError(f"Item with code {item_create.item_code} already exists.")
         
         item_dict = item_create.dict()
         synonyms_list = item_dict.pop('synonyms', [])
+        if item_dict["is_active"] and not allow_collision:
+            collisions = self.check_surface_collisions(item_create.item_code, item_create.item_name, synonyms_list)
+            if collisions:
+                raise SurfaceCollisionError(collisions)
         db_item = Item(**item_dict)
 
         if synonyms_list:
             db_item.synonyms = [ItemSynonym(synonym=s) for s in synonyms_list]
 
         self.db.add(db_item)
+        record_change(self.db, "items", db_item.item_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_item)
         return db_item
 
-    def update(self, item_code: str, item_update: ItemUpdate) -> Optional[Item]:
+    def update(self, item_code: str, item_update: ItemUpdate, allow_collision: bool = False) -> Optional[Item]:
         db_item = self.get_by_code(item_code)
         if not db_item:
             return None
         
         update_data = item_update.dict(exclude_unset=True)
         synonyms_list = update_data.pop('synonyms', None)
+        if update_data.get("is_active", db_item.is_active) and not allow_collision:
+            collisions = self.check_surface_collisions(
+                item_code,
+                update_data.get("item_name") or db_item.item_name,
+                synonyms_list if synonyms_list is not None else [s.synonym for s in db_item.synonyms],
+            )
+            if collisions:
+                raise SurfaceCollisionError(collisions)
 
         for field, value in update_data.items():
             setattr(db_item, field, value)
@@ -75,7 +134,9 @@ class ItemService:
         if synonyms_list is not None:
             db_item.synonyms = [ItemSynonym(synonym=s) for s in synonyms_list]
 
+        record_change(self.db, "items", item_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_item)
         return db_item
 
@@ -85,44 +146,120 @@ class ItemService:
             return False
         
         db_item.is_active = False
+        record_change(self.db, "items", item_code)
         self.db.commit()
+        publish_changes(self.db)
         return True
 
-    def extract_entities_from_text(self, text: str) -> List[dict]:
+    def get_subtree_codes(self, item_code: str) -> List[str]:
+        """子树（含自身）的全部实体编码，父实体在前"""
+        return subtree_codes(self.db, Item.item_code, Item.parent_item_code, item_code)
+
+    def move_subtree(self, item_code: str, new_parent_code: Optional[str]) -> Optional[dict]:
+        """把实体及其子树移到新的父实体下（为空则成为顶层实体）"""
+        if not self.get_by_code(item_code):
+            return None
+        codes = self.get_subtree_codes(item_code)
+        if new_parent_code is not None:
+            if not self.get_by_code(new_parent_code):
+                raise ValueError(f"Parent item {new_parent_code} not found.")
+            if new_parent_code in codes:
+                raise ValueError(f"Item {new_parent_code} is inside the subtree of {item_code}.")
+        self.db.execute(
+            update(Item).where(Item.item_code == item_code).values(parent_item_code=new_parent_code)
+            .execution_options(synchronize_session=False)
+        )
+        record_change(self.db, "items", item_code)
+        self.db.commit()
+        publish_changes(self.db)
+        return {"item_code": item_code, "parent_item_code": new_parent_code, "items": len(codes)}
+
+    def copy_subtree(self, item_code: str, new_parent_code: Optional[str], code_prefix: str,
+                     active: bool = False) -> Optional[dict]:
+        """
+        深拷贝实体子树及同义词，新编码为 code_prefix + 原编码，副本与原实体属于同一标签。
+        副本默认停用，避免与原实体的名称和同义词冲突。
+        """
+        if not self.get_by_code(item_code):
+            return None
+        if not code_prefix:
+            raise ValueError("code_prefix must not be empty.")
+        if new_parent_code is not None and not self.get_by_code(new_parent_code):
+            raise ValueError(f"Parent item {new_parent_code} not found.")
+        codes = self.get_subtree_codes(item_code)
+        limit = Item.item_code.type.length
+        if any(len(code_prefix) + len(code) > limit for code in codes):
+            raise ValueError(f"Prefixed item codes exceed {limit} characters.")
+        for chunk in chunks([code_prefix + code for code in codes]):
+            existing = self.db.scalars(select(Item.item_code).where(Item.item_code.in_(chunk)).limit(1)).first()
+            if existing is not None:
+                raise ValueError(f"Item with code {existing} already exists.")
+
+        prefix = literal(code_prefix)
+        columns = ["item_name", "item_code", "parent_item_code", "label_code", "description", "is_active"]
+        try:
+            for chunk in chunks(codes):
+                # 根实体挂到新的父实体下，其余实体的父实体都在子树内，指向其副本
+                for group, parent_column in (
+                    ([code for code in chunk if code == item_code], literal(new_parent_code) if new_parent_code else null()),
+                    ([code for code in chunk if code != item_code], prefix + Item.parent_item_code),
+                ):
+                    if group:
+                        self.db.execute(insert(Item).from_select(columns, select(
+                            Item.item_name, prefix + Item.item_code, parent_column, Item.label_code,
+                            Item.description, Item.is_active if active else literal(False),
+                        ).where(Item.item_code.in_(group))))
+                self.db.execute(insert(ItemSynonym).from_select(
+                    ["item_code", "synonym"],
+                    select(prefix + ItemSynonym.item_code, ItemSynonym.synonym).where(ItemSynonym.item_code.in_(chunk)),
+                ))
+            record_change(self.db, "items", *(code_prefix + code for code in codes))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {"item_code": code_prefix + item_code, "parent_item_code": new_parent_code, "items": len(codes)}
+
+    def delete_subtree(self, item_code: str, hard: bool = False) -> Optional[dict]:
+        """停用实体子树；hard 为真时连同同义词物理删除"""
+        if not self.get_by_code(item_code):
+            return None
+        codes = self.get_subtree_codes(item_code)
+        try:
+            if hard:
+                # 先断开子树内的父子引用，删除顺序不受自引用外键约束
+                for chunk in chunks(codes):
+                    self.db.execute(
+                        update(Item).where(Item.item_code.in_(chunk)).values(parent_item_code=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                for chunk in chunks(codes):
+                    self.db.execute(sql_delete(ItemSynonym).where(ItemSynonym.item_code.in_(chunk)))
+                    self.db.execute(sql_delete(Item).where(Item.item_code.in_(chunk)))
+            else:
+                for chunk in chunks(codes):
+                    self.db.execute(
+                        update(Item).where(Item.item_code.in_(chunk)).values(is_active=False)
+                        .execution_options(synchronize_session=False)
+                    )
+            record_change(self.db, "items", *codes, operation="delete" if hard else "upsert")
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {"item_code": item_code, "items": len(codes), "hard": hard}
+
+    def collision_report(self, system_code: str) -> List[dict]:
+        """列出体系内所有被多个可用实体共用的名称/同义词"""
+        label_codes = set(self.db.scalars(select(Label.label_code).where(Label.system_code == system_code)))
+        return surface_index.get_current(self.db).report(label_codes)
+
+    def extract_entities_from_text(self, text: str, bundle: Optional[RecognitionBundle] = None) -> List[dict]:
         """
         Extracts entities from text by matching against item names and synonyms.
+        Matching runs on the compiled recognition bundle (one automaton pass over the text);
+        pass ``bundle`` to extract against a specific snapshot.
         """
-        # For performance, it's better to query only relevant item types (e.g., products, specs)
-        # For now, we query all items.
-        all_items = self.db.query(Item).options(joinedload(Item.synonyms)).filter(Item.is_active == True).all()
-        found_entities = []
-        text_lower = text.lower()
-
-        for item in all_items:
-            # Check item name
-            item_name_lower = item.item_name.lower()
-            if item_name_lower in text_lower:
-                start_pos = text_lower.find(item_name_lower)
-                found_entities.append({
-                    "entity_type": item.label_code, # Use label_code as entity_type
-                    "entity_value": item.item_name,
-                    "start_pos": start_pos,
-                    "end_pos": start_pos + len(item.item_name)
-                })
-
-            # Check synonyms
-            for synonym in item.synonyms:
-                synonym_lower = synonym.synonym.lower()
-                if synonym_lower in text_lower:
-                    start_pos = text_lower.find(synonym_lower)
-                    found_entities.append({
-                        "entity_type": item.label_code,
-                        "entity_value": synonym.synonym, # Report the synonym that was found
-                        "start_pos": start_pos,
-                        "end_pos": start_pos + len(synonym.synonym)
-                    })
-        
-        # Remove duplicates if an item and its synonym are both found
-        # A more robust implementation would handle overlapping entities
-        # For now, we return all findings.
-        return found_entities
+        return (bundle or get_recognition_bundle(self.db)).extract_entities(text)
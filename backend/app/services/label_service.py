@@ -1,7 +1,11 @@
+from sqlalchemy import case, delete, insert, literal, null, select, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from backend.app.models import Label
+from backend.app.models import IntentRule, Item, ItemSynonym, Label
 from backend.app.core.schemas import LabelCreate, LabelUpdate
+from backend.app.core.cache import cache
+from backend.app.core.events import publish_changes, record_change
+from backend.app.utils.subtree import chunks, parent_first, subtree_codes
 
 class LabelService:
     def __init__(self, db: Session):
@@ -13,15 +17,34 @@ class LabelService:
     def get_by_system(self, system_code: str) -> List[Label]:
         return self.db.query(Label).filter(Label.system_code == system_code).all()
 
+    def get_by_system_rows(self, system_code: str) -> List[dict]:
+        """与 get_by_system 相同的数据，直接由行元组构建字典（字段顺序同 LabelResponse）"""
+        columns = (
+            Label.label_name, Label.label_code, Label.parent_label_code, Label.system_code,
+            Label.level, Label.description, Label.id, Label.created_at, Label.updated_at,
+        )
+        keys = [column.key for column in columns]
+        rows = self.db.execute(select(*columns).where(Label.system_code == system_code)).all()
+        return [dict(zip(keys, row)) for row in rows]
+
     def get_children(self, parent_label_code: str) -> List[Label]:
         return self.db.query(Label).filter(Label.parent_label_code == parent_label_code).all()
 
+    def get_label_name(self, label_code: str) -> Optional[str]:
+        """按编码查询标签名称 (缓存)"""
+        def load():
+            row = self.db.query(Label.label_name).filter(Label.label_code == label_code).first()
+            return row[0] if row else None
+        return cache.get_or_load("labels", f"name:{label_code}", load)
+
     def create(self, label_create: LabelCreate) -> Label:
         if self.get_by_code(label_create.label_code):
             raise ValueError(f"Label with code {label_create.label_code} already exists.")
         db_label = Label(**label_create.dict())
         self.db.add(db_label)
+        record_change(self.db, "labels", db_label.label_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_label)
         return db_label
 
@@ -32,7 +55,9 @@ class LabelService:
         update_data = label_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_label, field, value)
+        record_change(self.db, "labels", label_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_label)
         return db_label
 
@@ -41,10 +66,237 @@ class LabelService:
         if not db_label:
             return False
         self.db.delete(db_label)
+        record_change(self.db, "labels", label_code, operation="delete")
         self.db.commit()
+        publish_changes(self.db)
         return True
 
+    def get_subtree_codes(self, label_code: str) -> List[str]:
+        """子树（含自身）的全部标签编码，父标签在前"""
+        return subtree_codes(self.db, Label.label_code, Label.parent_label_code, label_code)
+
+    def _placement(self, root: Label, new_parent_code: Optional[str], subtree: List[str]):
+        """校验新的父标签，返回 (层级差, 目标体系编码)"""
+        if new_parent_code is None:
+            return 1 - root.level, root.system_code
+        parent = self.get_by_code(new_parent_code)
+        if parent is None:
+            raise ValueError(f"Parent label {new_parent_code} not found.")
+        if new_parent_code in subtree:
+            raise ValueError(f"Label {new_parent_code} is inside the subtree of {root.label_code}.")
+        return parent.level + 1 - root.level, parent.system_code
+
+    def move_subtree(self, label_code: str, new_parent_code: Optional[str]) -> Optional[dict]:
+        """把标签及其子树移到新的父标签下（为空则成为根标签），重新计算层级和所属体系"""
+        root = self.get_by_code(label_code)
+        if not root:
+            return None
+        codes = self.get_subtree_codes(label_code)
+        delta, system_code = self._placement(root, new_parent_code, codes)
+        values = {}
+        if delta:
+            values["level"] = Label.level + delta
+        if system_code != root.system_code:
+            values["system_code"] = system_code
+        try:
+            if values:
+                for chunk in chunks(codes):
+                    self.db.execute(
+                        update(Label).where(Label.label_code.in_(chunk)).values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+            self.db.execute(
+                update(Label).where(Label.label_code == label_code).values(parent_label_code=new_parent_code)
+                .execution_options(synchronize_session=False)
+            )
+            record_change(self.db, "labels", *codes)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {"label_code": label_code, "parent_label_code": new_parent_code, "labels": len(codes), "level_delta": delta}
+
+    def copy_subtree(self, label_code: str, new_parent_code: Optional[str], code_prefix: str,
+                     with_items: bool = True, with_rules: bool = True, active: bool = False) -> Optional[dict]:
+        """
+        深拷贝标签子树（可连同其下的实体、同义词和意图规则），新编码为 code_prefix + 原编码。
+        副本实体和规则默认停用，避免与原数据的名称和模式冲突。
+        """
+        root = self.get_by_code(label_code)
+        if not root:
+            return None
+        if not code_prefix:
+            raise ValueError("code_prefix must not be empty.")
+        codes = self.get_subtree_codes(label_code)
+        delta, system_code = self._placement(root, new_parent_code, codes)
+
+        item_pairs, rule_codes = [], []
+        for chunk in chunks(codes):
+            if with_items:
+                item_pairs += self.db.execute(
+                    select(Item.item_code, Item.parent_item_code).where(Item.label_code.in_(chunk))
+                ).all()
+            if with_rules:
+                rule_codes += self.db.scalars(select(IntentRule.rule_code).where(IntentRule.label_code.in_(chunk)))
+        item_codes = parent_first(item_pairs)
+        self._check_copy_codes(Label.label_code, codes, code_prefix)
+        self._check_copy_codes(Item.item_code, item_codes, code_prefix)
+        self._check_copy_codes(IntentRule.rule_code, rule_codes, code_prefix)
+
+        prefix = literal(code_prefix)
+        new_parent = literal(new_parent_code) if new_parent_code is not None else null()
+        item_parents = dict(item_pairs)
+        try:
+            for chunk in chunks(codes):
+                self.db.execute(insert(Label).from_select(
+                    ["label_name", "label_code", "parent_label_code", "system_code", "level", "description"],
+                    select(
+                        Label.label_name, prefix + Label.label_code,
+                        case((Label.label_code == label_code, new_parent), else_=prefix + Label.parent_label_code),
+                        literal(system_code), Label.level + delta, Label.description,
+                    ).where(Label.label_code.in_(chunk)),
+                ))
+            for chunk in chunks(item_codes):
+                # 父实体也在副本中的指向其副本，否则保持原父实体
+                inside = [code for code in chunk if item_parents[code] in item_parents]
+                outside = [code for code in chunk if item_parents[code] not in item_parents]
+                for group, parent_column in ((inside, prefix + Item.parent_item_code), (outside, Item.parent_item_code)):
+                    if group:
+                        self.db.execute(insert(Item).from_select(
+                            ["item_name", "item_code", "parent_item_code", "label_code", "description", "is_active"],
+                            select(
+                                Item.item_name, prefix + Item.item_code, parent_column, prefix + Item.label_code,
+                                Item.description, Item.is_active if active else literal(False),
+                            ).where(Item.item_code.in_(group)),
+                        ))
+                self.db.execute(insert(ItemSynonym).from_select(
+                    ["item_code", "synonym"],
+                    select(prefix + ItemSynonym.item_code, ItemSynonym.synonym).where(ItemSynonym.item_code.in_(chunk)),
+                ))
+            for chunk in chunks(rule_codes):
+                self.db.execute(insert(IntentRule).from_select(
+                    ["rule_code", "rule_type", "rule_entity", "label_code", "is_active"],
+                    select(
+                        prefix + IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity,
+                        prefix + IntentRule.label_code, IntentRule.is_active if active else literal(False),
+                    ).where(IntentRule.rule_code.in_(chunk)),
+                ))
+            record_change(self.db, "labels", *(code_prefix + code for code in codes))
+            if item_codes:
+                record_change(self.db, "items", *(code_prefix + code for code in item_codes))
+            if rule_codes:
+                record_change(self.db, "intent_rules", *(code_prefix + code for code in rule_codes))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {
+            "label_code": code_prefix + label_code,
+            "parent_label_code": new_parent_code,
+            "labels": len(codes),
+            "items": len(item_codes),
+            "rules": len(rule_codes),
+        }
+
+    def _check_copy_codes(self, column, codes: List[str], code_prefix: str) -> None:
+        """校验加前缀后的编码不超过列宽且不与已有编码重复"""
+        if not codes:
+            return
+        limit = column.type.length
+        too_long = next((code for code in codes if len(code_prefix) + len(code) > limit), None)
+        if too_long is not None:
+            raise ValueError(f"Code {code_prefix + too_long} exceeds {limit} characters.")
+        for chunk in chunks([code_prefix + code for code in codes]):
+            existing = self.db.scalars(select(column).where(column.in_(chunk)).limit(1)).first()
+            if existing is not None:
+                raise ValueError(f"Code {existing} already exists.")
+
+    def delete_subtree(self, label_code: str, hard: bool = True) -> Optional[dict]:
+        """
+        删除标签子树，连同其下的实体、同义词和意图规则；子树外指向被删实体的父实体引用置空。
+        hard 为假时只停用子树下的实体和意图规则（标签本身没有停用状态，保留不动），不再参与识别
+        """
+        if not self.get_by_code(label_code):
+            return None
+        codes = self.get_subtree_codes(label_code)
+        item_codes, rule_codes = [], []
+        for chunk in chunks(codes):
+            item_codes += self.db.scalars(select(Item.item_code).where(Item.label_code.in_(chunk)))
+            rule_codes += self.db.scalars(select(IntentRule.rule_code).where(IntentRule.label_code.in_(chunk)))
+        if not hard:
+            return self._deactivate_subtree(label_code, codes, item_codes, rule_codes)
+        doomed = set(item_codes)
+        detached = []
+        try:
+            # 先断开父子引用再删除，删除顺序不受自引用外键约束
+            for chunk in chunks(item_codes):
+                detached += [
+                    code for code in self.db.scalars(select(Item.item_code).where(Item.parent_item_code.in_(chunk)))
+                    if code not in doomed
+                ]
+                self.db.execute(
+                    update(Item).where(Item.parent_item_code.in_(chunk)).values(parent_item_code=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for chunk in chunks(codes):
+                self.db.execute(
+                    update(Label).where(Label.label_code.in_(chunk)).values(parent_label_code=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for chunk in chunks(item_codes):
+                self.db.execute(delete(ItemSynonym).where(ItemSynonym.item_code.in_(chunk)))
+                self.db.execute(delete(Item).where(Item.item_code.in_(chunk)))
+            for chunk in chunks(rule_codes):
+                self.db.execute(delete(IntentRule).where(IntentRule.rule_code.in_(chunk)))
+            for chunk in chunks(codes):
+                self.db.execute(delete(Label).where(Label.label_code.in_(chunk)))
+            record_change(self.db, "labels", *codes, operation="delete")
+            if item_codes:
+                record_change(self.db, "items", *item_codes, operation="delete")
+            if detached:
+                record_change(self.db, "items", *detached)
+            if rule_codes:
+                record_change(self.db, "intent_rules", *rule_codes, operation="delete")
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {"label_code": label_code, "labels": len(codes), "items": len(item_codes), "rules": len(rule_codes),
+                "hard": True}
+
+    def _deactivate_subtree(self, label_code: str, codes: List[str], item_codes: List[str],
+                            rule_codes: List[str]) -> dict:
+        try:
+            for chunk in chunks(item_codes):
+                self.db.execute(
+                    update(Item).where(Item.item_code.in_(chunk)).values(is_active=False)
+                    .execution_options(synchronize_session=False)
+                )
+            for chunk in chunks(rule_codes):
+                self.db.execute(
+                    update(IntentRule).where(IntentRule.rule_code.in_(chunk)).values(is_active=False)
+                    .execution_options(synchronize_session=False)
+                )
+            if item_codes:
+                record_change(self.db, "items", *item_codes)
+            if rule_codes:
+                record_change(self.db, "intent_rules", *rule_codes)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {"label_code": label_code, "labels": len(codes), "items": len(item_codes), "rules": len(rule_codes),
+                "hard": False}
+
     def get_label_tree(self, system_code: str) -> List[dict]:
+        """根据 system_code 获取标签树 (缓存)"""
+        return cache.get_or_load("labels", f"tree:{system_code}", lambda: self._build_label_tree(system_code))
+
+    def _build_label_tree(self, system_code: str) -> List[dict]:
         """根据 system_code 在内存中构建标签树"""
         all_labels_in_system = self.get_by_system(system_code)
         
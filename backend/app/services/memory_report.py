@@ -0,0 +1,60 @@
+"""
+内存占用报告
+
+汇总当前 worker 的进程内存和各内存结构的字节数（识别数据包、搜索/补全/冲突索引、缓存、会话上下文等），
+用于估算容器内存和评估 worker 数量。多 worker 时每次请求只反映处理该请求的 worker。
+"""
+from typing import Optional
+
+from backend.app.core.cache import cache
+from backend.app.services import autocomplete_index as autocomplete_module
+from backend.app.services.autocomplete_index import autocomplete_index
+from backend.app.services.recognition_bundle import bundle_manager
+from backend.app.services.recognition_log import recognition_log
+from backend.app.services.search_index import search_index
+from backend.app.services.session_context import session_store
+from backend.app.services.surface_index import surface_index
+from backend.app.utils.memory import deep_sizeof, process_memory
+
+
+def _index_report(manager, deep: bool) -> Optional[dict]:
+    index = manager.index
+    if index is None:
+        return None
+    report = {"entries": len(index), "versions": index.versions}
+    if deep:
+        attributes = index.memory_usage()
+        report.update({"bytes": sum(attributes.values()), "attributes": attributes})
+    return report
+
+
+def memory_report(deep: bool = True) -> dict:
+    """
+    deep 为真时逐个对象累加各结构的大小（大索引需要数百毫秒到数秒），否则只返回条目数和数据包大小。
+    未加载的结构为 null。
+    """
+    bundles = {name: bundle.memory_usage() for name, bundle in bundle_manager.loaded_bundles().items()}
+    structures = {
+        "recognition_bundles": bundles,
+        "search_index": _index_report(search_index, deep),
+        "autocomplete_index": _index_report(autocomplete_index, deep),
+        "surface_index": _index_report(surface_index, deep),
+        "session_context": session_store.stats() if session_store is not None else None,
+        "recognition_log": recognition_log.stats(),
+    }
+    backend = cache.backend
+    structures["cache"] = backend.memory_usage() if deep and hasattr(backend, "memory_usage") else {
+        "backend": type(backend).__name__,
+    }
+    popularity = autocomplete_module.popularity
+    structures["autocomplete_popularity"] = {"entries": len(popularity)}
+    if deep:
+        structures["autocomplete_popularity"]["bytes"] = deep_sizeof(dict(popularity))
+
+    summary = {"mapped_bytes": sum(b["mapped_bytes"] for b in bundles.values())}
+    if deep:
+        # 会话上下文按 JSON 长度估算 (estimated_bytes)，其余为 deep_sizeof
+        summary["heap_bytes"] = sum(
+            s.get("bytes", s.get("estimated_bytes", 0)) for s in structures.values() if s
+        )
+    return {"process": process_memory(), "summary": summary, "structures": structures}
@@ -0,0 +1,780 @@
+"""
+意图识别数据包 (recognition bundle)
+
+把意图规则、实体、同义词和标签编译成一个带版本号的二进制文件:
+字符串表 + Aho-Corasick 自动机数组 + 规则/实体/标签映射数组，以及实体和标签的祖先链（实体链接用）。
+各 worker 以只读方式 mmap 该文件，启动只需毫秒级，且同一文件的页面由操作系统页缓存在进程间共享。
+
+文件格式 (小端):
+- 文件头: magic(4s) format_version(H) byteorder(H) section_count(I)
+- 段表: 每项 name(16s) offset(Q) nbytes(Q)
+- 数据段: 8 字节对齐；meta 为 JSON，str_blob 为 UTF-8 字节，其余均为 int32 数组
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import CacheError, cache
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal
+from backend.app.core.events import publish_changes, record_change
+from backend.app.models import IntentRule, Item, ItemSynonym, Label, RecognitionSnapshot
+from backend.app.services.change_log import change_log
+from backend.app.services.regex_rules import REGEX_RULE_TYPE, RegexRuleSet
+from backend.app.utils.automaton import AutomatonMatcher, build_automaton
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LSRB"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_SECTION = struct.Struct("<16sQQ")
+_LITTLE_ENDIAN = 1
+
+# 识别数据依赖的缓存命名空间，任一命名空间变更都需要重新编译
+RECOGNITION_NAMESPACES = ("labels", "items", "intent_rules")
+
+# 快照发布/回滚时递增该命名空间版本号，提示各 worker 立即到数据库确认当前快照
+SNAPSHOT_NAMESPACE = "recognition_snapshots"
+
+# 规则类型 -> (类型编号, 置信度)；正则规则不进入自动机，加载数据包后按标签合并编译（见 regex_rules.py）
+RULE_KINDS = {
+    "keyword": (0, 0.9),
+    "expression": (1, 0.7),
+    REGEX_RULE_TYPE: (2, 0.8),
+}
+_REGEX_KIND = RULE_KINDS[REGEX_RULE_TYPE][0]
+_KIND_CONFIDENCE = {kind: confidence for kind, confidence in RULE_KINDS.values()}
+
+
+class _StringTable:
+    """字符串驻留表"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.blob = bytearray()
+        self.offsets = array("i", [0])
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[value] = string_id
+            self.blob += value.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return string_id
+
+
+def _postings(pairs: List[Tuple[int, int]], n_keys: int) -> Tuple[array, array]:
+    """把 (key, value) 列表转为 CSR 形式的倒排表 (start[n_keys + 1], values)"""
+    buckets: List[List[int]] = [[] for _ in range(n_keys)]
+    for key, value in pairs:
+        buckets[key].append(value)
+    start = array("i", [0])
+    values = array("i")
+    for bucket in buckets:
+        values.extend(bucket)
+        start.append(len(values))
+    return start, values
+
+
+def _ancestor_chains(parents: Sequence[int]) -> Tuple[array, array]:
+    """
+    每个节点的祖先序号（由近及远，不含自身），CSR 形式 (start[n + 1], values)。
+    已算出的祖先链复用，总耗时与各节点深度之和成正比；父子关系成环时在环上截断。
+    """
+    chains: List[Optional[List[int]]] = [None] * len(parents)
+    for node in range(len(parents)):
+        if chains[node] is not None:
+            continue
+        path: List[int] = []
+        on_path = set()
+        current = node
+        while current != -1 and chains[current] is None and current not in on_path:
+            path.append(current)
+            on_path.add(current)
+            current = parents[current]
+        tail = [current] + chains[current] if current != -1 and chains[current] is not None else []
+        for n in reversed(path):
+            chains[n] = tail
+            tail = [n] + tail
+    start = array("i", [0])
+    values = array("i")
+    for chain in chains:
+        values.extend(chain)
+        start.append(len(values))
+    return start, values
+
+
+def rule_patterns(rule_type: str, rule_entity: str) -> List[str]:
+    """与原 match_rules 语义一致的规则模式（已转小写），正则规则没有字面模式"""
+    if rule_type == REGEX_RULE_TYPE:
+        return []
+    if rule_type == "keyword":
+        return [k.strip().lower() for k in rule_entity.split(",")]
+    return [rule_entity.lower()]
+
+
+def build_bundle_sections(db: Session, version: str) -> Dict[str, object]:
+    """从数据库读取快照并生成各数据段"""
+    strings = _StringTable()
+    pattern_ids: Dict[str, int] = {}
+    patterns: List[str] = []
+
+    def pattern_id(pattern: str) -> int:
+        pid = pattern_ids.get(pattern)
+        if pid is None:
+            pid = len(patterns)
+            pattern_ids[pattern] = pid
+            patterns.append(pattern)
+        return pid
+
+    # 只读取需要的列（行元组），不创建 ORM 对象，编译数十万行时内存占用与行数成正比而非对象数
+    # 1. 规则
+    rules = db.execute(
+        select(IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity, IntentRule.label_code)
+        .where(IntentRule.is_active == True, IntentRule.rule_type.in_(list(RULE_KINDS)))
+        .order_by(IntentRule.id)
+    ).all()
+    rule_cols = {name: array("i") for name in ("rule_code", "rule_type", "rule_entity", "rule_label", "rule_kind")}
+    rule_pat_pairs: List[Tuple[int, int]] = []
+    pat_rule_pairs: List[Tuple[int, int]] = []
+    for rule_idx, (rule_code, rule_type, rule_entity, label_code) in enumerate(rules):
+        rule_cols["rule_code"].append(strings.intern(rule_code))
+        rule_cols["rule_type"].append(strings.intern(rule_type))
+        rule_cols["rule_entity"].append(strings.intern(rule_entity))
+        rule_cols["rule_label"].append(strings.intern(label_code))
+        rule_cols["rule_kind"].append(RULE_KINDS[rule_type][0])
+        for pattern in rule_patterns(rule_type, rule_entity):
+            pid = pattern_id(pattern)
+            rule_pat_pairs.append((rule_idx, pid))
+            pat_rule_pairs.append((pid, rule_idx))
+
+    # 2. 实体及同义词
+    items = db.execute(
+        select(Item.item_code, Item.item_name, Item.label_code, Item.parent_item_code)
+        .where(Item.is_active == True).order_by(Item.id)
+    ).all()
+    synonyms_by_item: Dict[str, List[str]] = {}
+    for item_code, synonym in db.execute(
+        select(ItemSynonym.item_code, ItemSynonym.synonym).order_by(ItemSynonym.id)
+    ):
+        synonyms_by_item.setdefault(item_code, []).append(synonym)
+
+    item_index = {item[0]: idx for idx, item in enumerate(items)}
+    item_cols = {name: array("i") for name in ("item_code", "item_name", "item_label", "item_parent")}
+    surf_item = array("i")
+    surf_str = array("i")
+    pat_surf_pairs: List[Tuple[int, int]] = []
+    for idx, (item_code, item_name, label_code, parent_item_code) in enumerate(items):
+        item_cols["item_code"].append(strings.intern(item_code))
+        item_cols["item_name"].append(strings.intern(item_name))
+        item_cols["item_label"].append(strings.intern(label_code))
+        item_cols["item_parent"].append(item_index.get(parent_item_code, -1))
+        for surface in [item_name] + synonyms_by_item.pop(item_code, []):
+            pat_surf_pairs.append((pattern_id(surface.lower()), len(surf_item)))
+            surf_item.append(idx)
+            surf_str.append(strings.intern(surface))
+    del synonyms_by_item, item_index
+
+    # 3. 标签
+    labels = db.execute(
+        select(Label.label_code, Label.label_name, Label.parent_label_code, Label.system_code).order_by(Label.id)
+    ).all()
+    label_index = {label[0]: idx for idx, label in enumerate(labels)}
+    label_cols = {name: array("i") for name in ("label_code", "label_name", "label_parent", "label_system")}
+    for label_code, label_name, parent_label_code, system_code in labels:
+        label_cols["label_code"].append(strings.intern(label_code))
+        label_cols["label_name"].append(strings.intern(label_name))
+        label_cols["label_parent"].append(label_index.get(parent_label_code, -1))
+        label_cols["label_system"].append(strings.intern(system_code))
+    label_by_code = array("i", sorted(range(len(labels)), key=lambda i: labels[i][0]))
+    # 实体链接: 实体所属标签的序号，以及实体/标签的祖先链
+    item_label_index = array("i", [label_index.get(item[2], -1) for item in items])
+    item_anc_start, item_anc = _ancestor_chains(item_cols["item_parent"])
+    label_anc_start, label_anc = _ancestor_chains(label_cols["label_parent"])
+
+    # 4. 自动机
+    automaton = build_automaton(patterns)
+    rule_pat_start, rule_pat = _postings(rule_pat_pairs, len(rules))
+    pat_rule_start, pat_rule = _postings(pat_rule_pairs, len(patterns))
+    pat_surf_start, pat_surf = _postings(pat_surf_pairs, len(patterns))
+    pat_str = array("i", [strings.intern(p) for p in patterns])
+
+    meta = {
+        "version": version,
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "empty_pattern": pattern_ids.get("", -1),
+        "counts": {
+            "rules": len(rules),
+            "items": len(items),
+            "surfaces": len(surf_item),
+            "labels": len(labels),
+            "patterns": len(patterns),
+            "states": len(automaton["fail"]),
+            "strings": len(strings.ids),
+        },
+    }
+
+    sections: Dict[str, object] = {
+        "meta": json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+        "str_blob": bytes(strings.blob),
+        "str_offsets": strings.offsets,
+        "pat_str": pat_str,
+        "pat_len": array("i", [len(p) for p in patterns]),
+        "rule_pat_start": rule_pat_start,
+        "rule_pat": rule_pat,
+        "pat_rule_start": pat_rule_start,
+        "pat_rule": pat_rule,
+        "surf_item": surf_item,
+        "surf_str": surf_str,
+        "pat_surf_start": pat_surf_start,
+        "pat_surf": pat_surf,
+        "label_by_code": label_by_code,
+        "item_label_idx": item_label_index,
+        "item_anc_start": item_anc_start,
+        "item_anc": item_anc,
+        "label_anc_start": label_anc_start,
+        "label_anc": label_anc,
+    }
+    sections.update(automaton)
+    sections.update(rule_cols)
+    sections.update(item_cols)
+    sections.update(label_cols)
+    return sections
+
+
+def write_bundle(sections: Dict[str, object], path: Path) -> Path:
+    """把数据段写入文件（先写临时文件再原子替换）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payloads = []
+    for name, data in sections.items():
+        if isinstance(data, array):
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            data = data.tobytes()
+        payloads.append((name, data))
+
+    offset = _HEADER.size + _SECTION.size * len(payloads)
+    table = []
+    for name, data in payloads:
+        offset = (offset + 7) & ~7
+        table.append((name, offset, len(data)))
+        offset += len(data)
+
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".bundle-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, _LITTLE_ENDIAN, len(payloads)))
+            for name, section_offset, nbytes in table:
+                f.write(_SECTION.pack(name.encode("ascii"), section_offset, nbytes))
+            for (name, data), (_, section_offset, _) in zip(payloads, table):
+                f.write(b"\0" * (section_offset - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def compile_bundle(db: Session, path: Path, version: str) -> Path:
+    """编译识别数据包到指定路径"""
+    return write_bundle(build_bundle_sections(db, version), path)
+
+
+class RecognitionBundle:
+    """只读的识别数据包，数组直接引用 mmap 内存"""
+
+    def __init__(self, buffer, path: Optional[Path] = None):
+        self.path = path
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        view = memoryview(buffer)
+        magic, format_version, byteorder, section_count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a recognition bundle")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format version: {format_version}")
+        if byteorder != _LITTLE_ENDIAN or sys.byteorder != "little":
+            raise ValueError("Recognition bundles can only be mapped on little-endian hosts")
+
+        self.sections: Dict[str, memoryview] = {}
+        for i in range(section_count):
+            raw_name, offset, nbytes = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            name = raw_name.rstrip(b"\0").decode("ascii")
+            section = view[offset:offset + nbytes]
+            self.sections[name] = section if name in ("meta", "str_blob") else section.cast("i")
+
+        self.meta = json.loads(bytes(self.sections["meta"]).decode("utf-8"))
+        self.version: str = self.meta["version"]
+        s = self.sections
+        self.matcher = AutomatonMatcher(s)
+        self._str_blob, self._str_offsets = s["str_blob"], s["str_offsets"]
+        self._empty_pattern = self.meta["empty_pattern"]
+        self._regex_rules: Optional[RegexRuleSet] = None
+
+    @classmethod
+    def open(cls, path: Path) -> "RecognitionBundle":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, Path(path))
+
+    def memory_usage(self) -> dict:
+        """各数据段的字节数；数据段引用 mmap 内存，由页缓存在 worker 间共享，不计入进程私有内存"""
+        sections = {name: section.nbytes for name, section in self.sections.items()}
+        return {
+            "version": self.version,
+            "path": str(self.path) if self.path else None,
+            "mapped_bytes": len(self._mmap) if self._mmap is not None else sum(sections.values()),
+            "sections": sections,
+            "counts": self.meta["counts"],
+        }
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id < 0:
+            return None
+        offsets = self._str_offsets
+        return bytes(self._str_blob[offsets[string_id]:offsets[string_id + 1]]).decode("utf-8")
+
+    def _hit_patterns(self, text_lower: str) -> Dict[int, int]:
+        hits = self.matcher.first_matches(text_lower, self.sections["pat_len"])
+        if self._empty_pattern != -1:
+            hits[self._empty_pattern] = 0
+        return hits
+
+    @staticmethod
+    def _expand(hits: Dict[int, int], start: Sequence[int], values: Sequence[int]) -> List[int]:
+        found = set()
+        for pid in hits:
+            found.update(values[start[pid]:start[pid + 1]])
+        return sorted(found)
+
+    @property
+    def regex_rules(self) -> RegexRuleSet:
+        """数据包中的正则规则，首次使用时按标签合并编译（并发首次调用时可能重复构建，结果相同）"""
+        rules = self._regex_rules
+        if rules is None:
+            s = self.sections
+            rules = self._regex_rules = RegexRuleSet(
+                (rule_idx, self.string(s["rule_label"][rule_idx]), self.string(s["rule_entity"][rule_idx]))
+                for rule_idx, kind in enumerate(s["rule_kind"]) if kind == _REGEX_KIND
+            )
+        return rules
+
+    def _rule_match(self, rule_idx: int, matched_text: str) -> dict:
+        s = self.sections
+        return {
+            "rule_code": self.string(s["rule_code"][rule_idx]),
+            "rule_type": self.string(s["rule_type"][rule_idx]),
+            "rule_entity": self.string(s["rule_entity"][rule_idx]),
+            "label_code": self.string(s["rule_label"][rule_idx]),
+            "matched_text": matched_text,
+            "confidence": _KIND_CONFIDENCE[s["rule_kind"][rule_idx]],
+        }
+
+    def match_rules(self, text: str) -> List[dict]:
+        """与 IntentRuleService.match_rules 返回格式一致"""
+        s = self.sections
+        hits = self._hit_patterns(text.lower())
+        matched = []
+        for rule_idx in self._expand(hits, s["pat_rule_start"], s["pat_rule"]):
+            # 关键词规则取列表中第一个命中的关键词
+            for pid in s["rule_pat"][s["rule_pat_start"][rule_idx]:s["rule_pat_start"][rule_idx + 1]]:
+                if pid in hits:
+                    matched.append(self._rule_match(rule_idx, self.string(s["pat_str"][pid])))
+                    break
+        for rule_idx, matched_text in self.regex_rules.match(text):
+            matched.append(self._rule_match(rule_idx, matched_text))
+        return sorted(matched, key=lambda k: k["confidence"], reverse=True)
+
+    def extract_entities(self, text: str) -> List[dict]:
+        """与 ItemService.extract_entities_from_text 返回格式一致"""
+        s = self.sections
+        hits = self._hit_patterns(text.lower())
+        surface_pattern = {}
+        for pid in hits:
+            for surf_idx in s["pat_surf"][s["pat_surf_start"][pid]:s["pat_surf_start"][pid + 1]]:
+                surface_pattern[surf_idx] = pid
+
+        entities = []
+        for surf_idx in sorted(surface_pattern):
+            value = self.string(s["surf_str"][surf_idx])
+            start_pos = hits[surface_pattern[surf_idx]]
+            item_idx = s["surf_item"][surf_idx]
+            entities.append({
+                "entity_type": self.string(s["item_label"][item_idx]),
+                "entity_value": value,
+                "start_pos": start_pos,
+                "end_pos": start_pos + len(value),
+                **self.link_item(item_idx),
+            })
+        return entities
+
+    def link_item(self, item_idx: int) -> dict:
+        """
+        实体链接: 规范的实体编码和名称，以及由根到父节点的实体路径、由根到所属标签的标签路径。
+        祖先链在编译数据包时算好，这里只做数组切片和字符串查找，不访问数据库
+        """
+        s = self.sections
+        label_idx = self._item_label_index(item_idx)
+        labels = [label_idx, *self._ancestors("label", label_idx)] if label_idx != -1 else []
+        return {
+            "item_code": self.string(s["item_code"][item_idx]),
+            "item_name": self.string(s["item_name"][item_idx]),
+            "item_path": [
+                {"item_code": self.string(s["item_code"][i]), "item_name": self.string(s["item_name"][i])}
+                for i in reversed(self._ancestors("item", item_idx))
+            ],
+            "label_path": [
+                {"label_code": self.string(s["label_code"][i]), "label_name": self.string(s["label_name"][i])}
+                for i in reversed(labels)
+            ],
+        }
+
+    def _ancestors(self, kind: str, index: int) -> Sequence[int]:
+        """实体 (kind="item") 或标签 (kind="label") 的祖先序号，由近及远"""
+        s = self.sections
+        values = s.get(f"{kind}_anc")
+        if values is not None:
+            start = s[f"{kind}_anc_start"]
+            return values[start[index]:start[index + 1]]
+        # 早期编译的数据包没有祖先数组: 沿父节点数组向上查找
+        parents = s[f"{kind}_parent"]
+        chain: List[int] = []
+        seen = {index}
+        node = parents[index]
+        while node != -1 and node not in seen:
+            chain.append(node)
+            seen.add(node)
+            node = parents[node]
+        return chain
+
+    def _item_label_index(self, item_idx: int) -> int:
+        s = self.sections
+        if "item_label_idx" in s:
+            return s["item_label_idx"][item_idx]
+        return self._label_index(self.string(s["item_label"][item_idx]))
+
+    def _label_index(self, label_code: Optional[str]) -> int:
+        """按标签编码二分查找标签序号，不存在时返回 -1"""
+        if label_code is None:
+            return -1
+        s = self.sections
+        order = s["label_by_code"]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(s["label_code"][order[mid]]) < label_code:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self.string(s["label_code"][order[lo]]) == label_code:
+            return order[lo]
+        return -1
+
+    def label_name(self, label_code: str) -> Optional[str]:
+        """按标签编码二分查找标签名称"""
+        label_idx = self._label_index(label_code)
+        return self.string(self.sections["label_name"][label_idx]) if label_idx != -1 else None
+
+
+def current_data_version(db: Session) -> str:
+    """
+    当前草稿数据（数据库中的规则/实体/标签）的版本: 变更日志的最新序号。
+    每次写操作在同一事务中递增该序号（见 services/change_log.py），跨进程一致且单调递增；
+    标签体系的修改同样会递增序号，只会多触发一次编译，不会漏掉修改
+    """
+    return f"r{change_log.latest_seq(db)}"
+
+
+def _seq(version: str) -> int:
+    """草稿版本 r<序号> 中的序号"""
+    return int(version[1:])
+
+
+def _version_hint(*namespaces: str) -> Optional[Tuple[int, ...]]:
+    """缓存版本号，作为数据可能已变化的提示；缓存不可用时返回 None（只按时间间隔检查）"""
+    try:
+        return cache.versions(*namespaces)
+    except CacheError:
+        return None
+
+
+class _LoadedBundle:
+    """已加载的数据包及其版本，以及上次到数据库确认版本时的提示值和时间"""
+
+    __slots__ = ("version", "bundle", "hint", "checked_at")
+
+    def __init__(self, version: str, bundle: "RecognitionBundle", hint):
+        self.version = version
+        self.bundle = bundle
+        self.hint = hint
+        self.checked_at = time.monotonic()
+
+    def fresh(self, hint) -> bool:
+        return hint == self.hint and time.monotonic() - self.checked_at < settings.RECOGNITION_VERSION_CHECK_INTERVAL
+
+
+class SnapshotError(ValueError):
+    """快照不存在或不可用"""
+
+
+class RecognitionBundleManager:
+    """
+    管理识别使用的数据包，两种模式 (RECOGNITION_PUBLISH_MODE):
+    - auto: 按草稿版本（变更日志序号）加载数据包，任何修改后在后台线程重新编译，编译完成后替换；
+      编译期间识别继续使用上一个数据包（只有进程内还没有数据包时才同步编译）。适合开发和测试环境
+    - manual: 规则/实体的修改只写入草稿（数据库），发布时才编译为不可变快照；识别读取当前快照的引用，无锁。
+      生产环境使用该模式，成批修改不会以半完成的状态生效
+
+    数据库是版本的唯一来源（recognition_snapshots 的当前行、change_sequence 的序号），缓存版本号只是提示:
+    本进程（或 Redis 下任一 worker）的修改、发布和回滚使提示变化，立即重新确认；
+    否则每隔 RECOGNITION_VERSION_CHECK_INTERVAL 秒到数据库确认一次，其他进程（包括命令行发布）的变化在此时间内生效
+    """
+
+    def __init__(self, bundle_dir: Path, keep: int = 5, snapshot_keep: int = 5):
+        self.bundle_dir = Path(bundle_dir)
+        self.keep = keep
+        self.snapshot_keep = snapshot_keep
+        # 整体替换以保证读到的版本和数据包一致
+        self._current: Optional[_LoadedBundle] = None
+        self._published: Optional[_LoadedBundle] = None
+        self._lock = threading.Lock()
+        # auto 模式的后台编译线程（同一时间最多一个）
+        self._compiler: Optional[threading.Thread] = None
+
+    def bundle_path(self, version: str) -> Path:
+        return self.bundle_dir / f"recognition-{version}.bin"
+
+    def snapshot_path(self, version: str) -> Path:
+        return self.bundle_dir / f"snapshot-{version}.bin"
+
+    def get(self, db: Session) -> RecognitionBundle:
+        if settings.RECOGNITION_PUBLISH_MODE == "auto":
+            return self._get_live(db)
+        return self._get_published(db)
+
+    def _get_live(self, db: Session) -> RecognitionBundle:
+        hint = _version_hint(*RECOGNITION_NAMESPACES)
+        current = self._current
+        if current is not None and current.fresh(hint):
+            return current.bundle
+        with self._lock:
+            current = self._current
+            if current is not None and current.fresh(hint):
+                return current.bundle
+            version = current_data_version(db)
+            if current is not None and current.version == version:
+                bundle = current.bundle
+            elif self.bundle_path(version).exists() or current is None:
+                bundle = self._load_live(db, version)
+            else:
+                # 编译期间继续使用上一个数据包，编译完成后由后台线程替换
+                self._compile_in_background(version, hint)
+                self._current = _LoadedBundle(current.version, current.bundle, hint)
+                return current.bundle
+            self._current = _LoadedBundle(version, bundle, hint)
+            return bundle
+
+    def _load_live(self, db: Session, version: str) -> RecognitionBundle:
+        """打开指定草稿版本的数据包，文件不存在时编译"""
+        path = self.bundle_path(version)
+        if not path.exists():
+            # Redis 下跨 worker 加锁编译，其他 worker 等待并复用同一文件（文件原子替换，并发编译也是安全的）
+            cache.get_or_load(RECOGNITION_NAMESPACES, f"bundle:{version}", lambda: str(self._compile(db, version)))
+            if not path.exists():
+                self._compile(db, version)
+        return RecognitionBundle.open(path)
+
+    def _compile_in_background(self, version: str, hint) -> None:
+        """在后台线程编译并替换 auto 模式的数据包，调用方持有 self._lock"""
+        if self._compiler is not None and self._compiler.is_alive():
+            # 正在编译较早的版本，完成后下一次确认时会发现版本落后，再编译最新的
+            return
+
+        def run():
+            db = SessionLocal()
+            try:
+                bundle = self._load_live(db, version)
+            except Exception:
+                logger.exception("recognition bundle %s compile failed", version)
+                return
+            finally:
+                db.close()
+            with self._lock:
+                current = self._current
+                if current is None or _seq(current.version) < _seq(version):
+                    self._current = _LoadedBundle(version, bundle, hint)
+
+        self._compiler = threading.Thread(target=run, name="recognition-bundle-compile", daemon=True)
+        self._compiler.start()
+
+    def wait_for_compile(self, timeout: Optional[float] = None) -> None:
+        """等待正在进行的后台编译结束"""
+        compiler = self._compiler
+        if compiler is not None:
+            compiler.join(timeout)
+
+    def _get_published(self, db: Session) -> RecognitionBundle:
+        hint = _version_hint(SNAPSHOT_NAMESPACE)
+        published = self._published
+        if published is not None and published.fresh(hint):
+            return published.bundle
+        with self._lock:
+            published = self._published
+            if published is not None and published.fresh(hint):
+                return published.bundle
+            snapshot = self.current_snapshot(db)
+            if snapshot is None:
+                # 尚未发布过: 把当前数据发布为初始快照。Redis 下跨 worker 只发布一次；
+                # 否则各 worker 可能各自发布一个，当前快照以最后激活的为准，各 worker 随后收敛到同一个
+                cache.get_or_load((SNAPSHOT_NAMESPACE,), "bootstrap", lambda: self.publish(db, "初始快照").version)
+                snapshot = self.current_snapshot(db) or self.publish(db, "初始快照")
+            if published is not None and published.version == snapshot.version:
+                bundle = published.bundle
+            else:
+                bundle = RecognitionBundle.open(Path(snapshot.file_path))
+            self._published = _LoadedBundle(snapshot.version, bundle, hint)
+            return bundle
+
+    def loaded_bundles(self) -> Dict[str, RecognitionBundle]:
+        """当前进程已加载的数据包: live (auto 模式) 和 published (manual 模式)"""
+        bundles = {}
+        current = self._current
+        if current is not None:
+            bundles["live"] = current.bundle
+        published = self._published
+        if published is not None:
+            bundles["published"] = published.bundle
+        return bundles
+
+    @staticmethod
+    def current_snapshot(db: Session) -> Optional[RecognitionSnapshot]:
+        """当前快照；并发发布偶尔留下多个 is_current 行时，以最后激活的为准"""
+        return db.scalars(
+            select(RecognitionSnapshot).where(RecognitionSnapshot.is_current == True)
+            .order_by(RecognitionSnapshot.activated_at.desc(), RecognitionSnapshot.id.desc())
+        ).first()
+
+    def publish(self, db: Session, note: Optional[str] = None) -> RecognitionSnapshot:
+        """把当前草稿编译为新快照并切换为当前快照，超出保留数量的旧快照删除文件"""
+        fingerprint = current_data_version(db)
+        # 版本号取自数据库分配的自增主键；插入时先用唯一的占位值，并发发布互不冲突
+        snapshot = RecognitionSnapshot(
+            version=f"pending-{uuid.uuid4().hex}", fingerprint=fingerprint, file_path="", note=note
+        )
+        db.add(snapshot)
+        db.flush()
+        snapshot.version = f"v{snapshot.id}"
+        path = self.snapshot_path(snapshot.version)
+        try:
+            compile_bundle(db, path, snapshot.version)
+            snapshot.file_path = str(path)
+            snapshot.counts = json.dumps(RecognitionBundle.open(path).meta["counts"])
+            self._activate(db, snapshot)
+            expired = self._expire(db)
+            record_change(db, SNAPSHOT_NAMESPACE, snapshot.version)
+            db.commit()
+        except Exception:
+            db.rollback()
+            path.unlink(missing_ok=True)
+            raise
+        for old in expired:
+            Path(old).unlink(missing_ok=True)
+        publish_changes(db)
+        logger.info("published recognition snapshot %s", snapshot.version)
+        return snapshot
+
+    def rollback(self, db: Session, version: str) -> RecognitionSnapshot:
+        """把保留中的快照重新设为当前快照，不影响草稿"""
+        snapshot = db.scalars(select(RecognitionSnapshot).where(RecognitionSnapshot.version == version)).first()
+        if snapshot is None:
+            raise SnapshotError(f"Snapshot {version} not found.")
+        if snapshot.status != "active" or not Path(snapshot.file_path).exists():
+            raise SnapshotError(f"Snapshot {version} is no longer retained.")
+        if snapshot.id != getattr(self.current_snapshot(db), "id", None):
+            self._activate(db, snapshot)
+            record_change(db, SNAPSHOT_NAMESPACE, snapshot.version)
+            db.commit()
+            publish_changes(db)
+            logger.info("rolled back recognition snapshot to %s", snapshot.version)
+        return snapshot
+
+    @staticmethod
+    def _activate(db: Session, snapshot: RecognitionSnapshot) -> None:
+        db.query(RecognitionSnapshot).filter(
+            RecognitionSnapshot.is_current == True, RecognitionSnapshot.id != snapshot.id
+        ).update({"is_current": False}, synchronize_session=False)
+        snapshot.is_current = True
+        snapshot.activated_at = datetime.now()
+
+    def _expire(self, db: Session) -> List[str]:
+        """保留最近 snapshot_keep 个快照（当前快照总是保留），返回需要删除的文件"""
+        active = db.scalars(
+            select(RecognitionSnapshot).where(RecognitionSnapshot.status == "active").order_by(RecognitionSnapshot.id.desc())
+        ).all()
+        files = []
+        for snapshot in active[self.snapshot_keep:]:
+            if snapshot.is_current:
+                continue
+            snapshot.status = "expired"
+            files.append(snapshot.file_path)
+        return files
+
+    def _compile(self, db: Session, version: str) -> Path:
+        path = compile_bundle(db, self.bundle_path(version), version)
+        logger.info("compiled recognition bundle %s", path)
+        self._cleanup()
+        return path
+
+    def discard_all(self) -> int:
+        """
+        丢弃已加载的数据包并删除全部数据包和快照文件，返回删除的文件数。
+        重建数据库后变更序号从 0 重新开始，按序号命名的旧文件不再对应当前数据
+        """
+        with self._lock:
+            self._current = self._published = None
+            removed = 0
+            for path in list(self.bundle_dir.glob("recognition-*.bin")) + list(self.bundle_dir.glob("snapshot-*.bin")):
+                path.unlink(missing_ok=True)
+                removed += 1
+            return removed
+
+    def _cleanup(self) -> None:
+        """只保留最近的若干个数据包文件（已 mmap 的文件删除后仍可继续使用）"""
+        bundles = sorted(self.bundle_dir.glob("recognition-*.bin"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in bundles[self.keep:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+bundle_manager = RecognitionBundleManager(
+    Path(settings.RECOGNITION_BUNDLE_DIR), settings.RECOGNITION_BUNDLE_KEEP, settings.RECOGNITION_SNAPSHOT_KEEP
+)
+
+
+def get_recognition_bundle(db: Session) -> RecognitionBundle:
+    """获取当前版本的识别数据包"""
+    return bundle_manager.get(db)
@@ -0,0 +1,104 @@
+"""
+识别请求合并 (single-flight)
+
+故障高峰时大量用户同时提交同一段文本（如 "SV660N 报 Er.201"）。键相同的并发请求只由第一个请求（leader）
+执行完整的识别流程，其余请求（follower）等待并复用它的结果（或异常）；leader 完成后键即失效，不缓存结果。
+
+键 = (去除首尾空白后的文本, 规范化的 context, 快照版本)，只合并结果完全相同的请求，实体位置等不受影响。
+带 session_id 的请求会读写会话状态，结果依赖上一轮，不参与合并。
+follower 最多等待 RECOGNITION_COALESCE_WAIT_TIMEOUT 秒，超时后自行识别，不被卡住的 leader 拖住。
+
+统计（当前 worker）: leader 数、被合并的请求数、等待超时次数、单次合并的最多 follower 数。
+"""
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from backend.app.core.config import settings
+from backend.app.services.session_context import session_id_of, session_store
+
+
+def coalescing_key(text: str, context: Optional[Dict[str, Any]], snapshot_version: Any) -> Optional[tuple]:
+    """请求的合并键，不能合并（多轮会话）时返回 None"""
+    if session_store is not None and session_id_of(context) is not None:
+        return None
+    options = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str) if context else ""
+    return text, options, snapshot_version
+
+
+class _Call:
+    """一次进行中的执行"""
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """键相同的并发调用只执行一次，其余调用等待并共享结果"""
+
+    def __init__(self, wait_timeout: float, enabled: bool = True):
+        self.wait_timeout = wait_timeout
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._counts = {"leaders": 0, "coalesced": 0, "wait_timeouts": 0, "shared_errors": 0, "max_followers": 0}
+
+    def do(self, key: Optional[Hashable], fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行或等待 fn，返回 (结果, 是否复用了其他请求的结果)；key 为 None 时直接执行"""
+        if not self.enabled or key is None:
+            return fn(), False
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._counts["leaders"] += 1
+                leader = True
+            else:
+                call.followers += 1
+                self._counts["coalesced"] += 1
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    if call.followers > self._counts["max_followers"]:
+                        self._counts["max_followers"] = call.followers
+                    if call.error is not None and call.followers:
+                        self._counts["shared_errors"] += call.followers
+                call.done.set()
+            return call.result, False
+
+        if not call.done.wait(self.wait_timeout):
+            with self._lock:
+                self._counts["wait_timeouts"] += 1
+                self._counts["coalesced"] -= 1
+            return fn(), False
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            in_flight = len(self._calls)
+        total = counts["leaders"] + counts["coalesced"]
+        return {
+            "enabled": self.enabled,
+            "in_flight": in_flight,
+            **counts,
+            "coalesced_ratio": round(counts["coalesced"] / total, 4) if total else 0.0,
+        }
+
+
+recognition_flight = SingleFlight(settings.RECOGNITION_COALESCE_WAIT_TIMEOUT, settings.RECOGNITION_COALESCING_ENABLED)
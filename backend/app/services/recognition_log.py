@@ -0,0 +1,300 @@
+"""
+识别请求日志
+
+记录每次意图识别的请求和结果，用于审计和训练数据积累。
+请求路径只把记录放入有界内存队列（按 RECOGNITION_LOG_SAMPLE_RATE 采样）；后台线程批量取出，
+写入按天和大小轮转的 JSONL 文件，或独立 SQLite 文件中的 recognition_log 表。
+多 worker 时每个进程写自己的 JSONL 文件（文件名带进程号），轮转互不影响，行也不会交错；
+SQLite 由各进程共用，写入时等待其他进程的写锁并重试。
+
+队列满时按 RECOGNITION_LOG_POLICY 处理: drop 直接丢弃；block 最多等待 RECOGNITION_LOG_BLOCK_TIMEOUT 秒，
+仍无空位再丢弃。丢弃、采样跳过和写入失败都有计数，可通过统计接口查看。
+
+JSONL 每行: {"id", "timestamp", "text", "context", "response", "latency_ms"}，
+response 与识别接口返回的 data 结构一致，可直接用于流量回放。
+"""
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LOG_BACKENDS = ("jsonl", "sqlite", "none")
+LOG_POLICIES = ("drop", "block")
+
+# SQLite 写锁被其他 worker 占用时的等待时间（秒）和重试次数
+SQLITE_BUSY_TIMEOUT = 5.0
+SQLITE_WRITE_RETRIES = 3
+
+
+class JsonlLogWriter:
+    """
+    追加写 JSONL 文件，文件名 recognition-YYYYMMDD-<pid>-NNN.jsonl，跨天或超过 max_bytes 时换新文件。
+    进程号在打开文件时取，主进程预加载后 fork 出的 worker 各写各的文件。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._file = None
+        self._day: Optional[str] = None
+        self._pid: Optional[int] = None
+        self._part = 0
+
+    def _path(self, day: str, part: int) -> Path:
+        return self.directory / f"recognition-{day}-{self._pid}-{part:03d}.jsonl"
+
+    def _open(self) -> None:
+        day, pid = datetime.now().strftime("%Y%m%d"), os.getpid()
+        if self._file is not None and (day, pid) == (self._day, self._pid) and self._file.tell() < self.max_bytes:
+            return
+        if self._file is not None:
+            self._file.close()
+        if (day, pid) != (self._day, self._pid):
+            # 重启后（进程号被复用时）接着当天最后一个文件写
+            self.directory.mkdir(parents=True, exist_ok=True)
+            parts = [int(p.stem.rsplit("-", 1)[1]) for p in self.directory.glob(f"recognition-{day}-{pid}-*.jsonl")]
+            self._day, self._pid, self._part = day, pid, max(parts, default=1)
+        path = self._path(day, self._part)
+        while path.exists() and path.stat().st_size >= self.max_bytes:
+            self._part += 1
+            path = self._path(day, self._part)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: List[dict]) -> None:
+        self._open()
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SqliteLogWriter:
+    """写入独立 SQLite 文件，不占用业务数据库的连接和锁；多个 worker 共用同一文件，写锁冲突时等待并重试"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 只由写入线程使用；停止时在线程退出后由调用方写出剩余记录并关闭
+            self._conn = sqlite3.connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recognition_log ("
+                " id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, text TEXT NOT NULL,"
+                " context TEXT, response TEXT, latency_ms REAL)"
+            )
+        return self._conn
+
+    def write(self, records: List[dict]) -> None:
+        rows = [
+            (
+                r["id"], r["timestamp"], r["text"],
+                json.dumps(r["context"], ensure_ascii=False, default=str) if r["context"] is not None else None,
+                json.dumps(r["response"], ensure_ascii=False, default=str),
+                r["latency_ms"],
+            )
+            for r in records
+        ]
+        for attempt in range(SQLITE_WRITE_RETRIES):
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT INTO recognition_log (id, timestamp, text, context, response, latency_ms)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+                return
+            except sqlite3.OperationalError as e:
+                if self._conn is not None:
+                    self._conn.rollback()
+                # 只有锁冲突重试，其他错误交由调用方计数
+                if "locked" not in str(e) or attempt == SQLITE_WRITE_RETRIES - 1:
+                    raise
+                logger.warning("recognition log database is locked, retrying (%d/%d)", attempt + 1,
+                               SQLITE_WRITE_RETRIES)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _serialize(response: Any) -> Any:
+    return response.model_dump(mode="json") if hasattr(response, "model_dump") else response
+
+
+class RecognitionLog:
+    """有界队列 + 后台批量写入"""
+
+    def __init__(self, writer, queue_size: int, batch_size: int, flush_interval: float,
+                 policy: str = "drop", block_timeout: float = 0.05, sample_rate: float = 1.0):
+        if policy not in LOG_POLICIES:
+            raise ValueError(f"Invalid recognition log policy: {policy}. Must be one of {', '.join(LOG_POLICIES)}.")
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.sample_rate = sample_rate
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 请求线程和写入线程都会累加计数
+        self._counters_lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "sampled_out": 0, "dropped": 0, "written": 0, "batches": 0, "write_errors": 0,
+        }
+
+    def _count(self, **increments: int) -> None:
+        with self._counters_lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    @property
+    def enabled(self) -> bool:
+        return self.writer is not None
+
+    def submit(self, text: str, context: Optional[dict], response: Any, latency_ms: float) -> None:
+        """在请求路径调用: 采样后放入队列，不做序列化和 I/O"""
+        if self.writer is None:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count(submitted=1, sampled_out=1)
+            return
+        self._count(submitted=1)
+        record = (uuid.uuid4().hex, datetime.now(), text, context, response, latency_ms)
+        try:
+            if self.policy == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self._count(dropped=1)
+
+    def _collect(self, first, wait: bool) -> List[tuple]:
+        """从队列中凑一批: 等到满 batch_size 或距第一条超过 flush_interval（wait=False 时只取现有的）"""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if wait and remaining > 0 and not self._stop.is_set():
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _records(batch: List[tuple]) -> List[dict]:
+        return [
+            {
+                "id": record_id,
+                "timestamp": timestamp.isoformat(),
+                "text": text,
+                "context": context,
+                "response": _serialize(response),
+                "latency_ms": round(latency_ms, 3),
+            }
+            for record_id, timestamp, text, context, response, latency_ms in batch
+        ]
+
+    def _write(self, records: List[dict]) -> None:
+        try:
+            self.writer.write(records)
+            self._count(written=len(records), batches=1)
+        except Exception:
+            self._count(write_errors=len(records))
+            logger.exception("recognition log write failed, %d records lost", len(records))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._records(self._collect(first, wait=True)))
+
+    def flush(self) -> None:
+        """同步写出队列中剩余的记录"""
+        while True:
+            try:
+                first = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._write(self._records(self._collect(first, wait=False)))
+
+    def start(self) -> None:
+        if self.writer is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recognition-log", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程，写出剩余记录并关闭文件"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        self.writer.close()
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {
+            "backend": settings.RECOGNITION_LOG_BACKEND,
+            "policy": self.policy,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            **counters,
+        }
+
+
+def create_recognition_log() -> RecognitionLog:
+    """根据配置创建识别日志"""
+    backend = settings.RECOGNITION_LOG_BACKEND.lower()
+    if backend not in LOG_BACKENDS:
+        raise ValueError(f"Invalid RECOGNITION_LOG_BACKEND: {backend}. Must be one of {', '.join(LOG_BACKENDS)}.")
+    directory = Path(settings.RECOGNITION_LOG_DIR)
+    if backend == "jsonl":
+        writer = JsonlLogWriter(directory, settings.RECOGNITION_LOG_MAX_BYTES)
+    elif backend == "sqlite":
+        writer = SqliteLogWriter(directory / "recognition_log.db")
+    else:
+        writer = None
+    return RecognitionLog(
+        writer,
+        queue_size=settings.RECOGNITION_LOG_QUEUE_SIZE,
+        batch_size=settings.RECOGNITION_LOG_BATCH_SIZE,
+        flush_interval=settings.RECOGNITION_LOG_FLUSH_INTERVAL,
+        policy=settings.RECOGNITION_LOG_POLICY,
+        block_timeout=settings.RECOGNITION_LOG_BLOCK_TIMEOUT,
+        sample_rate=settings.RECOGNITION_LOG_SAMPLE_RATE,
+    )
+
+
+recognition_log = create_recognition_log()
@@ -0,0 +1,237 @@
+"""
+意图识别统计计数
+
+识别热路径只在内存中累加计数: 每次调用取一次锁，把本次的全部增量按 (时间桶, 维度, 键) 记入字典。
+后台线程每隔 STATS_FLUSH_INTERVAL 秒换出字典，累加到 recognition_stats 汇总表: 每个 (时间桶, 维度, 键)
+只有一行，已有的行原地加上增量，没有的才插入；超过 STATS_RETENTION_DAYS 天的时间桶定期删除。
+统计接口只读取汇总表，因此统计数据相对实时请求最多延迟一个刷新周期。
+
+维度:
+- request: 键为 recognized / unrecognized
+- label: 识别结果的意图标签编码
+- rule: 命中的规则编码（一次识别中命中的每条规则各计一次）
+- unrecognized: 未识别的文本（每个刷新周期最多记录 STATS_MAX_UNRECOGNIZED_TEXTS 种）
+- latency: 识别耗时直方图，键为桶上界毫秒数
+
+此外累计本周期内被提取的实体文本次数，刷新时交给 on_entity_hits 注册的监听器（补全热度），不写入汇总表。
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, tuple_, update
+
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal, engine
+from backend.app.models import RecognitionStat
+
+logger = logging.getLogger(__name__)
+
+# 耗时直方图桶上界 (毫秒)，最后一个桶为 inf
+LATENCY_BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+LATENCY_KEYS = tuple(str(b) for b in LATENCY_BOUNDS_MS) + ("inf",)
+
+# 统计键列宽
+_KEY_LENGTH = 200
+
+# 清理过期时间桶的最短间隔（秒）
+PURGE_INTERVAL = 3600
+
+StatKey = Tuple[int, str, str]
+
+
+def latency_key(elapsed_ms: float) -> str:
+    for bound, key in zip(LATENCY_BOUNDS_MS, LATENCY_KEYS):
+        if elapsed_ms <= bound:
+            return key
+    return LATENCY_KEYS[-1]
+
+
+class RecognitionStats:
+    """进程内的识别计数器，定期刷新到汇总表"""
+
+    def __init__(self, bucket_seconds: int, flush_interval: float, max_unrecognized_texts: int,
+                 retention_days: int = 0, enabled: bool = True):
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.max_unrecognized_texts = max_unrecognized_texts
+        self.retention_days = retention_days
+        self.enabled = enabled
+        self._purged_at = 0.0
+        self._counts: Dict[StatKey, int] = {}
+        self._unrecognized_texts = 0
+        self._entity_hits: Dict[str, int] = {}
+        self._entity_hit_listeners: List[Callable[[Dict[str, int]], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _bucket(self) -> int:
+        return int(time.time()) // self.bucket_seconds
+
+    def record_rule_hits(self, matched_rules: Iterable[dict]) -> None:
+        """累加规则命中次数，由 match_rules 调用"""
+        if not self.enabled:
+            return
+        bucket = self._bucket()
+        keys = [(bucket, "rule", rule["rule_code"]) for rule in matched_rules]
+        if not keys:
+            return
+        with self._lock:
+            counts = self._counts
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+
+    def on_entity_hits(self, listener: Callable[[Dict[str, int]], None]) -> None:
+        """注册实体提取次数的监听器，每次刷新时以 {实体文本: 次数} 调用（在刷新线程中）"""
+        self._entity_hit_listeners.append(listener)
+
+    def record_recognition(self, label_code: Optional[str], text: str, elapsed_ms: float,
+                           entity_values: Iterable[str] = ()) -> None:
+        """累加一次识别的结果、耗时和提取到的实体文本，label_code 为空表示未识别"""
+        if not self.enabled:
+            return
+        bucket = self._bucket()
+        keys = [(bucket, "latency", latency_key(elapsed_ms))]
+        if label_code is None:
+            keys.append((bucket, "request", "unrecognized"))
+            text_key = (bucket, "unrecognized", text.strip().lower()[:_KEY_LENGTH])
+        else:
+            keys.append((bucket, "request", "recognized"))
+            keys.append((bucket, "label", label_code))
+            text_key = None
+        entity_values = set(entity_values)
+        with self._lock:
+            counts = self._counts
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+            entity_hits = self._entity_hits
+            for value in entity_values:
+                entity_hits[value] = entity_hits.get(value, 0) + 1
+            if text_key is not None:
+                if text_key in counts:
+                    counts[text_key] += 1
+                elif self._unrecognized_texts < self.max_unrecognized_texts:
+                    counts[text_key] = 1
+                    self._unrecognized_texts += 1
+
+    def flush(self) -> int:
+        """
+        把累计的计数累加到汇总表，返回涉及的行数；写入失败时计数并回内存，下次重试
+        （包括其他 worker 同时插入同一行导致的唯一约束冲突）
+        """
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            entity_hits, self._entity_hits = self._entity_hits, {}
+            self._unrecognized_texts = 0
+        if entity_hits:
+            for listener in self._entity_hit_listeners:
+                try:
+                    listener(entity_hits)
+                except Exception:
+                    logger.exception("entity hit listener failed")
+        if not counts:
+            self._purge()
+            return 0
+        increments = {
+            (datetime.fromtimestamp(bucket * self.bucket_seconds), dimension, key): count
+            for (bucket, dimension, key), count in counts.items()
+        }
+        db = SessionLocal()
+        try:
+            self._upsert(db, increments)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for key, count in counts.items():
+                    self._counts[key] = self._counts.get(key, 0) + count
+            raise
+        finally:
+            db.close()
+        self._purge()
+        return len(increments)
+
+    @staticmethod
+    def _upsert(db, increments: Dict[Tuple[datetime, str, str], int]) -> None:
+        """已有的行按 id 原地累加（旧数据中同一键有多行时只加到第一行），其余插入新行"""
+        table = RecognitionStat.__table__
+        existing: Dict[Tuple[datetime, str, str], int] = {}
+        buckets = sorted({bucket for bucket, _, _ in increments})
+        rows = db.execute(
+            select(table.c.id, table.c.bucket_start, table.c.dimension, table.c.stat_key)
+            .where(table.c.bucket_start.in_(buckets))
+            .where(tuple_(table.c.dimension, table.c.stat_key).in_(sorted({(d, k) for _, d, k in increments})))
+            .order_by(table.c.id)
+        )
+        for row_id, bucket_start, dimension, stat_key in rows:
+            existing.setdefault((bucket_start, dimension, stat_key), row_id)
+        updates = [{"row_id": existing[key], "delta": count} for key, count in increments.items() if key in existing]
+        inserts = [
+            {"bucket_start": bucket, "dimension": dimension, "stat_key": key, "hit_count": count}
+            for (bucket, dimension, key), count in increments.items() if (bucket, dimension, key) not in existing
+        ]
+        if updates:
+            db.execute(
+                update(table).where(table.c.id == bindparam("row_id"))
+                .values(hit_count=table.c.hit_count + bindparam("delta")),
+                updates,
+            )
+        if inserts:
+            db.execute(table.insert(), inserts)
+
+    def _purge(self) -> None:
+        """删除超过保留天数的时间桶，每 PURGE_INTERVAL 秒最多一次"""
+        now = time.monotonic()
+        if self.retention_days <= 0 or now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        db = SessionLocal()
+        try:
+            db.execute(delete(RecognitionStat.__table__).where(RecognitionStat.bucket_start < cutoff))
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("recognition stats purge failed")
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("recognition stats flush failed")
+
+    def start(self) -> None:
+        """确保汇总表存在并启动后台刷新线程"""
+        if not self.enabled or self._thread is not None:
+            return
+        RecognitionStat.__table__.create(bind=engine, checkfirst=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recognition-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止刷新线程并写出剩余计数"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("recognition stats final flush failed")
+
+
+recognition_stats = RecognitionStats(
+    bucket_seconds=settings.STATS_BUCKET_SECONDS,
+    flush_interval=settings.STATS_FLUSH_INTERVAL,
+    max_unrecognized_texts=settings.STATS_MAX_UNRECOGNIZED_TEXTS,
+    retention_days=settings.STATS_RETENTION_DAYS,
+    enabled=settings.STATS_ENABLED,
+)
@@ -0,0 +1,236 @@
+"""
+正则规则 (rule_type = "regex")
+
+规则内容是一个正则表达式（如 ``E\\d{2,3}``、``Er\\.\\d+``），不区分大小写，在文本任意位置命中即匹配，
+matched_text 为原文中命中的片段。
+
+创建/修改时校验 (validate_rule):
+- 语法正确，长度不超过 RECOGNITION_REGEX_MAX_LENGTH
+- 不匹配空串（否则对任何文本都生效）
+- 不使用反向引用、条件分组、命名分组和全局内联标志（这些在合并成一个模式后含义会变化或无法编译；
+  需要局部忽略大小写等可写作 ``(?i:...)``）
+- 不含嵌套的无上限量词（如 ``(a+)+``、``(\\w*)*``），这是灾难性回溯最常见的来源
+
+匹配: 每个标签的正则规则按 RECOGNITION_REGEX_GROUP_SIZE 条一组合并为 ``(?P<_r0>...)|(?P<_r1>...)|...`` 的交替模式，
+先用合并模式扫描一次，组内没有任何规则命中时（绝大多数情况）直接跳过；命中时再逐条确定命中的规则。
+编译结果按模式源码缓存，数据包切换后未变化的组无需重新编译。
+
+预算: 一次 match 中正则匹配的总耗时不超过 RECOGNITION_REGEX_BUDGET_MS，超出后跳过剩余的组并计数。
+安装了 regex 包时每次搜索带超时，能中断单个失控的匹配；否则使用标准库 re，只能在两次搜索之间检查预算，
+此时依赖上面的静态校验防止灾难性回溯。
+"""
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.app.core.config import settings
+
+try:
+    import regex as _regex_engine
+except ImportError:  # pragma: no cover - regex 为可选依赖
+    _regex_engine = None
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+logger = logging.getLogger(__name__)
+
+REGEX_RULE_TYPE = "regex"
+
+_UNBOUNDED = _sre_parse.MAXREPEAT
+_REPEATS = (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT)
+_FORBIDDEN = {
+    _sre_parse.GROUPREF: "backreferences",
+    _sre_parse.GROUPREF_EXISTS: "conditional groups",
+}
+
+
+def _walk(parsed, inside_unbounded: bool = False) -> Optional[str]:
+    """检查解析树，返回第一个不允许的结构的说明"""
+    for op, av in parsed:
+        if op in _FORBIDDEN:
+            return _FORBIDDEN[op]
+        if op in _REPEATS:
+            low, high, sub = av
+            unbounded = high == _UNBOUNDED
+            if unbounded and inside_unbounded:
+                return "nested unbounded quantifiers"
+            problem = _walk(sub, inside_unbounded or unbounded)
+        elif op is _sre_parse.SUBPATTERN:
+            problem = _walk(av[-1], inside_unbounded)
+        elif op is _sre_parse.BRANCH:
+            problem = next(filter(None, (_walk(branch, inside_unbounded) for branch in av[1])), None)
+        elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            problem = _walk(av[1], inside_unbounded)
+        else:
+            # 原子分组和占有量词不会回溯，不再向下检查
+            problem = None
+        if problem:
+            return problem
+    return None
+
+
+def validate_regex(pattern: str) -> None:
+    """校验正则规则内容，不合格时抛出 ValueError"""
+    if not pattern:
+        raise ValueError("Regex rule must not be empty.")
+    if len(pattern) > settings.RECOGNITION_REGEX_MAX_LENGTH:
+        raise ValueError(f"Regex rule exceeds {settings.RECOGNITION_REGEX_MAX_LENGTH} characters.")
+    try:
+        parsed = _sre_parse.parse(pattern)
+        compiled = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+    if parsed.state.groupdict:
+        raise ValueError("Regex rule must not use named groups.")
+    problem = _walk(parsed)
+    if problem:
+        raise ValueError(f"Regex rule must not use {problem}.")
+    try:
+        re.compile(f"(?P<_r0>{pattern})|(?P<_r1>x)")
+    except re.error:
+        raise ValueError("Regex rule must not use global inline flags; use scoped flags like (?i:...).")
+    if compiled.search("") is not None:
+        raise ValueError("Regex rule must not match the empty string.")
+
+
+def validate_rule(rule_type: Optional[str], rule_entity: Optional[str]) -> None:
+    """创建/修改规则时的内容校验（目前只校验正则规则）"""
+    if rule_type == REGEX_RULE_TYPE:
+        validate_regex(rule_entity or "")
+
+
+@lru_cache(maxsize=16384)
+def compile_pattern(source: str):
+    """编译（并缓存）单条或合并后的模式，安装了 regex 包时使用 regex"""
+    if _regex_engine is not None:
+        return _regex_engine.compile(source, _regex_engine.IGNORECASE | _regex_engine.V0)
+    return re.compile(source, re.IGNORECASE)
+
+
+class RegexStats:
+    """正则匹配计数（当前 worker）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"matches": 0, "group_scans": 0, "rule_scans": 0, "budget_exhausted": 0,
+                        "timeouts": 0, "skipped_groups": 0, "invalid_rules": 0}
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        cache_info = compile_pattern.cache_info()
+        return {
+            "engine": "regex" if _regex_engine is not None else "re",
+            "budget_ms": settings.RECOGNITION_REGEX_BUDGET_MS,
+            **counts,
+            "compiled_patterns": cache_info.currsize,
+            "compile_cache_hits": cache_info.hits,
+        }
+
+
+regex_stats = RegexStats()
+
+
+class _RegexGroup:
+    """同一标签下的一组正则规则及其合并模式"""
+
+    __slots__ = ("combined", "rules")
+
+    def __init__(self, combined: str, rules: List[Tuple[int, str]]):
+        self.combined = combined
+        self.rules = rules  # [(rule_idx, 模式源码)]
+
+
+class RegexRuleSet:
+    """一个数据包中全部可用的正则规则，按标签分组合并"""
+
+    def __init__(self, rules: Iterable[Tuple[int, str, str]], group_size: Optional[int] = None):
+        """rules: (规则序号, 标签编码, 模式源码)，按规则序号升序"""
+        group_size = max(group_size or settings.RECOGNITION_REGEX_GROUP_SIZE, 1)
+        by_label: Dict[str, List[Tuple[int, str]]] = {}
+        invalid = 0
+        for rule_idx, label_code, source in rules:
+            try:
+                validate_regex(source)
+            except ValueError as e:
+                # 绕过接口直接写入数据库的规则
+                logger.warning("skipping invalid regex rule #%s: %s", rule_idx, e)
+                invalid += 1
+                continue
+            by_label.setdefault(label_code, []).append((rule_idx, source))
+        if invalid:
+            regex_stats.add(invalid_rules=invalid)
+        self.groups: List[_RegexGroup] = []
+        for label_rules in by_label.values():
+            for i in range(0, len(label_rules), group_size):
+                chunk = label_rules[i:i + group_size]
+                combined = "|".join(f"(?P<_r{n}>{source})" for n, (_, source) in enumerate(chunk))
+                # 构建时即编译，编译耗时不计入识别请求的匹配预算
+                compile_pattern(combined)
+                for _, source in chunk:
+                    compile_pattern(source)
+                self.groups.append(_RegexGroup(combined, chunk))
+        self.rule_count = sum(len(group.rules) for group in self.groups)
+
+    def __len__(self) -> int:
+        return self.rule_count
+
+    def match(self, text: str, budget_ms: Optional[float] = None) -> List[Tuple[int, str]]:
+        """返回命中的 (规则序号, 原文中命中的片段)，按规则序号升序；超出预算时只返回已完成部分的结果"""
+        if not self.groups:
+            return []
+        budget = (settings.RECOGNITION_REGEX_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+        deadline = time.perf_counter() + budget
+        matched: List[Tuple[int, str]] = []
+        group_scans = rule_scans = 0
+        for index, group in enumerate(self.groups):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                self._exhausted(len(self.groups) - index, group_scans, rule_scans)
+                return sorted(matched)
+            try:
+                group_scans += 1
+                first = self._search(group.combined, text, remaining)
+                if first is None:
+                    continue
+                first_name = first.lastgroup
+                for n, (rule_idx, source) in enumerate(group.rules):
+                    if f"_r{n}" == first_name:
+                        matched.append((rule_idx, first.group()))
+                        continue
+                    rule_scans += 1
+                    found = self._search(source, text, deadline - time.perf_counter())
+                    if found is not None:
+                        matched.append((rule_idx, found.group()))
+            except TimeoutError:
+                regex_stats.add(timeouts=1)
+                self._exhausted(len(self.groups) - index, group_scans, rule_scans)
+                return sorted(matched)
+        regex_stats.add(matches=1, group_scans=group_scans, rule_scans=rule_scans)
+        return sorted(matched)
+
+    @staticmethod
+    def _search(source: str, text: str, remaining: float):
+        if remaining <= 0:
+            raise TimeoutError
+        pattern = compile_pattern(source)
+        if _regex_engine is not None:
+            return pattern.search(text, timeout=remaining)
+        return pattern.search(text)
+
+    @staticmethod
+    def _exhausted(skipped: int, group_scans: int, rule_scans: int) -> None:
+        logger.warning("regex rule budget exhausted, skipped %s rule groups", skipped)
+        regex_stats.add(matches=1, group_scans=group_scans, rule_scans=rule_scans,
+                        budget_exhausted=1, skipped_groups=skipped)
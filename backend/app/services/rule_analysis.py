@@ -0,0 +1,144 @@
+"""
+意图规则遮蔽/冗余分析
+
+识别时规则按 (置信度降序, 规则编号升序) 排序取第一条，因此若模式 q 是模式 p 的子串（或与之相同），
+且 q 所属规则的优先级不低于 p 所属规则，则任何包含 p 的文本都不会让 p 所属规则胜出。
+
+对所有规则模式构建一个 Aho-Corasick 自动机，再把每个模式本身作为文本扫描一遍，
+即可得到它包含的全部模式，总耗时与模式总长度加匹配数成正比，无需两两比较。
+
+发现的问题:
+- duplicate: 同一标签下的另一条规则使用了相同模式
+- conflict: 不同标签下优先级更高的规则使用了相同模式
+- redundant: 同一标签（或同一规则）中优先级不低的规则含有该模式的子串
+- shadowed: 不同标签下优先级更高的规则含有该模式的子串
+- dead_rule: 规则的所有模式都被遮蔽，永远不会成为最佳匹配
+- unsupported_type: 识别引擎不处理的规则类型，规则不会生效
+正则规则没有字面模式，不参与子串分析。
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.models import IntentRule, Label
+from backend.app.services.recognition_bundle import RULE_KINDS, rule_patterns
+from backend.app.utils.automaton import AutomatonMatcher, build_automaton
+
+FINDING_TYPES = ("duplicate", "conflict", "redundant", "shadowed", "dead_rule", "unsupported_type")
+
+
+class _Rule:
+    __slots__ = ("rank", "rule_code", "rule_type", "label_code", "patterns")
+
+    def __init__(self, rule_code: str, rule_type: str, label_code: str, patterns: List[str]):
+        self.rank = -1
+        self.rule_code = rule_code
+        self.rule_type = rule_type
+        self.label_code = label_code
+        self.patterns = patterns
+
+
+def _load_rules(db: Session) -> Tuple[List[_Rule], List[_Rule]]:
+    """读取可用规则，返回 (按识别优先级排序的可匹配规则, 类型不受支持的规则)"""
+    matchable, unsupported = [], []
+    for rule in db.scalars(select(IntentRule).where(IntentRule.is_active == True).order_by(IntentRule.id)):
+        if rule.rule_type in RULE_KINDS:
+            patterns = rule_patterns(rule.rule_type, rule.rule_entity)
+            matchable.append(_Rule(rule.rule_code, rule.rule_type, rule.label_code, patterns))
+        else:
+            unsupported.append(_Rule(rule.rule_code, rule.rule_type, rule.label_code, []))
+    # 与 match_rules 的排序一致: 置信度降序，同置信度保持规则编号顺序
+    matchable.sort(key=lambda r: -RULE_KINDS[r.rule_type][1])
+    for rank, rule in enumerate(matchable):
+        rule.rank = rank
+    return matchable, unsupported
+
+
+def analyze_rules(db: Session) -> dict:
+    """分析全部可用规则，按 label_code 分组返回发现的问题"""
+    rules, unsupported = _load_rules(db)
+
+    pattern_ids: Dict[str, int] = {}
+    patterns: List[str] = []
+    # 每个模式的规则列表，按优先级排序（rules 已有序，按序追加即可）
+    pattern_rules: List[List[_Rule]] = []
+    for rule in rules:
+        for pattern in dict.fromkeys(rule.patterns):
+            pid = pattern_ids.get(pattern)
+            if pid is None:
+                pid = pattern_ids[pattern] = len(patterns)
+                patterns.append(pattern)
+                pattern_rules.append([])
+            pattern_rules[pid].append(rule)
+
+    matcher = AutomatonMatcher(build_automaton(patterns))
+    empty_pid = pattern_ids.get("")
+    findings: List[dict] = []
+    # (规则编码, 模式) -> 是否被遮蔽
+    dominated: Dict[Tuple[str, str], bool] = {}
+
+    for pid, pattern in enumerate(patterns):
+        # 该模式真子串中优先级最高的规则（空模式是所有模式的子串）
+        best_sub: Optional[_Rule] = None
+        best_sub_pattern = None
+        sub_ids = {q for q, _ in matcher.iter_matches(pattern) if q != pid}
+        if empty_pid is not None and empty_pid != pid:
+            sub_ids.add(empty_pid)
+        for q in sub_ids:
+            candidate = pattern_rules[q][0]
+            if best_sub is None or candidate.rank < best_sub.rank:
+                best_sub, best_sub_pattern = candidate, patterns[q]
+
+        owners = pattern_rules[pid]
+        for position, rule in enumerate(owners):
+            by, by_pattern = None, pattern
+            if position > 0:
+                by = owners[0]
+            if best_sub is not None and best_sub.rank <= rule.rank and (by is None or best_sub.rank < by.rank):
+                by, by_pattern = best_sub, best_sub_pattern
+            dominated[(rule.rule_code, pattern)] = by is not None
+            if by is None:
+                continue
+            same_label = by.label_code == rule.label_code
+            if by_pattern == pattern:
+                kind = "duplicate" if same_label else "conflict"
+            else:
+                kind = "redundant" if same_label else "shadowed"
+            findings.append({
+                "type": kind,
+                "rule_code": rule.rule_code,
+                "label_code": rule.label_code,
+                "pattern": pattern,
+                "by_rule_code": by.rule_code,
+                "by_label_code": by.label_code,
+                "by_pattern": by_pattern,
+            })
+
+    for rule in rules:
+        if rule.patterns and all(dominated[(rule.rule_code, p)] for p in rule.patterns):
+            findings.append({"type": "dead_rule", "rule_code": rule.rule_code, "label_code": rule.label_code})
+    for rule in unsupported:
+        findings.append({
+            "type": "unsupported_type",
+            "rule_code": rule.rule_code,
+            "label_code": rule.label_code,
+            "rule_type": rule.rule_type,
+        })
+
+    label_names = dict(db.execute(select(Label.label_code, Label.label_name)).all())
+    labels: Dict[str, dict] = {}
+    for finding in findings:
+        group = labels.get(finding["label_code"])
+        if group is None:
+            group = labels[finding["label_code"]] = {
+                "label_code": finding["label_code"],
+                "label_name": label_names.get(finding["label_code"]),
+                "findings": [],
+            }
+        group["findings"].append(finding)
+
+    summary = {"rules": len(rules) + len(unsupported), "patterns": len(patterns)}
+    for kind in FINDING_TYPES:
+        summary[kind] = sum(1 for f in findings if f["type"] == kind)
+    return {"summary": summary, "labels": [labels[code] for code in sorted(labels)]}
@@ -0,0 +1,233 @@
+"""
+候选规则变更的离线评估 (what-if)
+
+在一个不提交的事务中把候选变更集应用到数据库并编译出候选识别数据包，随后回滚；
+当前数据同样编译为数据包。标注语料按块分发到进程池，各 worker mmap 两个数据包逐条识别，
+只返回混淆计数和意图发生变化的语句，主进程汇总出各标签的精确率/召回率/F1 和混淆矩阵。
+
+语料为 JSONL，每行 {"text": "...", "label_code": "..."}；label_code 为空表示期望不识别。
+
+变更集为 JSON:
+{
+  "rules": {"upsert": [{"rule_code": "...", ...}], "delete": ["rule_code"]},
+  "items": {"upsert": [{"item_code": "...", ...}], "delete": ["item_code"]}
+}
+已存在的编码按部分更新处理，不存在的按新建处理（字段同创建接口）；实体删除与接口一致为停用。
+"""
+import json
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.schemas import IntentRuleCreate, IntentRuleUpdate, ItemCreate, ItemUpdate
+from backend.app.models import IntentRule, Item, ItemSynonym
+from backend.app.services.recognition_bundle import RecognitionBundle, compile_bundle, current_data_version
+from backend.app.services.regex_rules import validate_rule
+
+# 未识别时的预测标签
+UNRECOGNIZED = "__unrecognized__"
+
+CHUNK_SIZE = 2000
+
+# worker 进程内的数据包
+_engines: Dict[str, RecognitionBundle] = {}
+
+
+def apply_change_set(db: Session, changes: dict) -> None:
+    """在当前事务中应用变更集（只 flush 不提交），字段校验沿用接口的请求模型"""
+    rule_changes = changes.get("rules", {})
+    for data in rule_changes.get("upsert", []):
+        rule = db.query(IntentRule).filter(IntentRule.rule_code == data["rule_code"]).first()
+        if rule is None:
+            rule = IntentRule(**IntentRuleCreate(**data).dict())
+            db.add(rule)
+        else:
+            fields = {k: v for k, v in data.items() if k != "rule_code"}
+            for field, value in IntentRuleUpdate(**fields).dict(exclude_unset=True).items():
+                setattr(rule, field, value)
+        validate_rule(rule.rule_type, rule.rule_entity)
+    for rule_code in rule_changes.get("delete", []):
+        db.query(IntentRule).filter(IntentRule.rule_code == rule_code).delete(synchronize_session=False)
+
+    item_changes = changes.get("items", {})
+    for data in item_changes.get("upsert", []):
+        item = db.query(Item).filter(Item.item_code == data["item_code"]).first()
+        if item is None:
+            fields = ItemCreate(**data).dict()
+            synonyms = fields.pop("synonyms", [])
+            item = Item(**fields)
+        else:
+            fields = ItemUpdate(**{k: v for k, v in data.items() if k != "item_code"}).dict(exclude_unset=True)
+            synonyms = fields.pop("synonyms", None)
+            for field, value in fields.items():
+                setattr(item, field, value)
+        if synonyms is not None:
+            item.synonyms = [ItemSynonym(synonym=s) for s in synonyms]
+        db.add(item)
+    for item_code in item_changes.get("delete", []):
+        db.query(Item).filter(Item.item_code == item_code).update({"is_active": False}, synchronize_session=False)
+    db.flush()
+
+
+def compile_engines(db: Session, changes: dict, directory: Path) -> Tuple[Path, Path]:
+    """编译当前与候选两个数据包，候选变更在编译后回滚"""
+    current = compile_bundle(db, Path(directory) / "current.bin", current_data_version(db))
+    try:
+        apply_change_set(db, changes)
+        candidate = compile_bundle(db, Path(directory) / "candidate.bin", "candidate")
+    finally:
+        db.rollback()
+    return current, candidate
+
+
+def _init_worker(current_path: str, candidate_path: str) -> None:
+    _engines["current"] = RecognitionBundle.open(Path(current_path))
+    _engines["candidate"] = RecognitionBundle.open(Path(candidate_path))
+
+
+def _recognize(engine: RecognitionBundle, text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    rules = engine.match_rules(text)
+    label = rules[0]["label_code"] if rules else UNRECOGNIZED
+    entities = sorted((e["entity_type"], e["entity_value"]) for e in engine.extract_entities(text)) if rules else []
+    return label, entities
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, str, str]]) -> dict:
+    current, candidate = _engines["current"], _engines["candidate"]
+    confusion = {"current": Counter(), "candidate": Counter()}
+    changed = []
+    entities_changed = 0
+    for line_no, text, gold in chunk:
+        current_label, current_entities = _recognize(current, text)
+        candidate_label, candidate_entities = _recognize(candidate, text)
+        confusion["current"][(gold, current_label)] += 1
+        confusion["candidate"][(gold, candidate_label)] += 1
+        if current_entities != candidate_entities:
+            entities_changed += 1
+        if current_label != candidate_label:
+            changed.append({
+                "line": line_no,
+                "text": text,
+                "label_code": gold,
+                "current": current_label,
+                "candidate": candidate_label,
+            })
+    return {"confusion": confusion, "changed": changed, "entities_changed": entities_changed}
+
+
+def read_corpus(path: Path) -> Iterator[Tuple[int, str, str]]:
+    """逐行读取标注语料，产出 (行号, 文本, 期望标签)"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            text = (record.get("text") or "").strip()
+            if text:
+                yield line_no, text, record.get("label_code") or UNRECOGNIZED
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def label_metrics(confusion: Counter) -> Dict[str, dict]:
+    """由 (期望, 预测) 计数计算各标签的精确率/召回率/F1，未识别不作为一个标签统计"""
+    true_pos, predicted, actual = Counter(), Counter(), Counter()
+    for (gold, pred), count in confusion.items():
+        actual[gold] += count
+        predicted[pred] += count
+        if gold == pred:
+            true_pos[gold] += count
+    metrics = {}
+    for label in sorted((set(actual) | set(predicted)) - {UNRECOGNIZED}):
+        precision = true_pos[label] / predicted[label] if predicted[label] else 0.0
+        recall = true_pos[label] / actual[label] if actual[label] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        metrics[label] = {
+            "support": actual[label],
+            "predicted": predicted[label],
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(f1, 4),
+        }
+    return metrics
+
+
+def confusion_matrix(confusion: Counter) -> dict:
+    labels = sorted({label for pair in confusion for label in pair})
+    position = {label: i for i, label in enumerate(labels)}
+    matrix = [[0] * len(labels) for _ in labels]
+    for (gold, pred), count in confusion.items():
+        matrix[position[gold]][position[pred]] += count
+    return {"labels": labels, "matrix": matrix}
+
+
+def _summarize(confusion: Counter) -> dict:
+    total = sum(confusion.values())
+    correct = sum(count for (gold, pred), count in confusion.items() if gold == pred)
+    return {
+        "accuracy": round(correct / total, 4) if total else 0.0,
+        "labels": label_metrics(confusion),
+        "confusion_matrix": confusion_matrix(confusion),
+    }
+
+
+def evaluate_change_set(db: Session, corpus_path: Path, changes: dict,
+                        workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> dict:
+    """在标注语料上对比当前规则与候选变更集的识别效果"""
+    workers = workers or os.cpu_count() or 1
+    confusion = {"current": Counter(), "candidate": Counter()}
+    changed: List[dict] = []
+    entities_changed = 0
+
+    with tempfile.TemporaryDirectory(prefix="rule-eval-") as directory:
+        current_path, candidate_path = compile_engines(db, changes, Path(directory))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(str(current_path), str(candidate_path))
+        ) as pool:
+            # 同时在途的块数有上限，语料无需整体读入内存
+            pending = set()
+            chunks = _chunks(read_corpus(corpus_path), chunk_size)
+            while True:
+                for chunk in islice(chunks, workers * 2 - len(pending)):
+                    pending.add(pool.submit(_evaluate_chunk, chunk))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    partial = future.result()
+                    for engine in confusion:
+                        confusion[engine].update(partial["confusion"][engine])
+                    changed.extend(partial["changed"])
+                    entities_changed += partial["entities_changed"]
+        changed.sort(key=lambda record: record["line"])
+
+    current, candidate = _summarize(confusion["current"]), _summarize(confusion["candidate"])
+    deltas = {}
+    for label in sorted(set(current["labels"]) | set(candidate["labels"])):
+        before = current["labels"].get(label, {}).get("f1", 0.0)
+        after = candidate["labels"].get(label, {}).get("f1", 0.0)
+        if before != after:
+            deltas[label] = round(after - before, 4)
+    return {
+        "total": sum(confusion["current"].values()),
+        "intent_changed": len(changed),
+        "entities_changed": entities_changed,
+        "current": current,
+        "candidate": candidate,
+        "f1_delta": deltas,
+        "changed": changed,
+    }
@@ -0,0 +1,347 @@
+"""
+字符 n-gram 倒排索引搜索
+
+对实体名称、同义词、标签名称和意图规则内容建立字符二元/三元组倒排索引，支持模糊匹配排序，
+并按 system_code / label_code 过滤。写操作后由服务层增量更新索引。
+
+检索时用 numpy 对查询 gram 的倒排表做 bincount 得到每个文档共享的 gram 数，再向量化计算相似度、
+过滤并取 top-N。倒排表按长度从短到长参与计数，总长度不超过 POSTINGS_BUDGET_RATIO，
+超出预算的高频 gram 区分度很低，其贡献按比例估算，从而保证单次查询的耗时有界。
+"""
+import heapq
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import cache
+from backend.app.core.events import subscribe
+from backend.app.models import IntentRule, Item, ItemSynonym, Label
+from backend.app.services.incremental_index import IncrementalIndexManager
+from backend.app.utils.memory import attribute_sizes
+
+# 文档类型
+KIND_ITEM, KIND_SYNONYM, KIND_LABEL, KIND_RULE = 0, 1, 2, 3
+KIND_NAMES = ("item", "synonym", "label", "rule")
+
+# 索引依赖的缓存命名空间
+SEARCH_NAMESPACES = ("labels", "items", "intent_rules")
+
+# 删除标记超过该比例时重建以回收空间
+COMPACT_RATIO = 0.3
+
+# 单次查询参与计数的倒排表总长度上限（占文档数的比例）
+POSTINGS_BUDGET_RATIO = 0.3
+
+_BEGIN, _END = "\x02", "\x03"
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def ngrams(text: str) -> set:
+    """生成带首尾标记的二元组和三元组"""
+    padded = f"{_BEGIN}{normalize(text)}{_END}"
+    grams = {padded[i:i + 2] for i in range(len(padded) - 1)}
+    grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    内存倒排索引。文档按追加顺序分配递增编号，每个文档的属性存放在按编号索引的紧凑数组中；
+    更新时旧文档仅打删除标记，待删除比例过高时整体重建。
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self.texts: List[str] = []
+        self.kinds = array("b")
+        self.gram_counts = array("i")
+        self.label_ids = array("i")
+        self.alive = bytearray()
+        self.active = bytearray()
+        self.item_codes: List[Optional[str]] = []
+        self.rule_codes: List[Optional[str]] = []
+        # 标签编码驻留: label_id <-> label_code
+        self.label_code_ids: Dict[str, int] = {}
+        self.label_code_list: List[str] = []
+        # (分组, 编码) -> 文档编号区间；分组为 item/label/rule，实体与其同义词同属一个 item 分组。
+        # 同一分组的文档总是一次连续追加，用 range 代替编号列表
+        self.doc_groups: Dict[Tuple[str, str], range] = {}
+        self.label_systems: Dict[str, str] = {}
+        self.dead = 0
+        self.versions: Tuple[int, ...] = ()
+        # 写入会改变数组长度，检索读取数组缓冲区期间需要互斥
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.texts) - self.dead
+
+    def needs_compaction(self) -> bool:
+        return self.dead > len(self.texts) * COMPACT_RATIO
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            return attribute_sizes(self)
+
+    def _label_id(self, label_code: Optional[str]) -> int:
+        if label_code is None:
+            return -1
+        label_id = self.label_code_ids.get(label_code)
+        if label_id is None:
+            label_id = self.label_code_ids[label_code] = len(self.label_code_list)
+            self.label_code_list.append(label_code)
+        return label_id
+
+    def _add_doc(self, kind: int, text: str, label_code: Optional[str],
+                 item_code: Optional[str] = None, rule_code: Optional[str] = None, active: bool = True) -> None:
+        doc_id = len(self.texts)
+        grams = ngrams(text)
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings is None:
+                postings = self.postings[gram] = array("i")
+            postings.append(doc_id)
+        self.texts.append(text)
+        self.kinds.append(kind)
+        self.gram_counts.append(len(grams))
+        self.label_ids.append(self._label_id(label_code))
+        self.alive.append(1)
+        self.active.append(1 if active else 0)
+        self.item_codes.append(item_code)
+        self.rule_codes.append(rule_code)
+
+    def remove_group(self, group: Tuple[str, str]) -> None:
+        for doc_id in self.doc_groups.pop(group, ()):
+            if self.alive[doc_id]:
+                self.alive[doc_id] = 0
+                self.dead += 1
+
+    # ---------------------------------------------------------------
+    # 写入
+    # ---------------------------------------------------------------
+    def put_label(self, label_code: str, label_name: str, system_code: str) -> None:
+        group = ("label", label_code)
+        with self._lock:
+            self.remove_group(group)
+            self.label_systems[label_code] = system_code
+            start = len(self.texts)
+            self._add_doc(KIND_LABEL, label_name, label_code)
+            self.doc_groups[group] = range(start, len(self.texts))
+
+    def remove_label(self, label_code: str) -> None:
+        with self._lock:
+            self.remove_group(("label", label_code))
+            self.label_systems.pop(label_code, None)
+
+    def put_item(self, item_code: str, item_name: str, label_code: str, is_active: bool,
+                 synonyms: Iterable[str]) -> None:
+        group = ("item", item_code)
+        with self._lock:
+            self.remove_group(group)
+            start = len(self.texts)
+            self._add_doc(KIND_ITEM, item_name, label_code, item_code=item_code, active=is_active)
+            for synonym in synonyms:
+                self._add_doc(KIND_SYNONYM, synonym, label_code, item_code=item_code, active=is_active)
+            self.doc_groups[group] = range(start, len(self.texts))
+
+    def remove_item(self, item_code: str) -> None:
+        with self._lock:
+            self.remove_group(("item", item_code))
+
+    def put_rule(self, rule_code: str, rule_entity: str, label_code: str, is_active: bool) -> None:
+        group = ("rule", rule_code)
+        with self._lock:
+            self.remove_group(group)
+            start = len(self.texts)
+            self._add_doc(KIND_RULE, rule_entity, label_code, rule_code=rule_code, active=is_active)
+            self.doc_groups[group] = range(start, len(self.texts))
+
+    def remove_rule(self, rule_code: str) -> None:
+        with self._lock:
+            self.remove_group(("rule", rule_code))
+
+    # ---------------------------------------------------------------
+    # 检索
+    # ---------------------------------------------------------------
+    def search(self, query: str, limit: int = 20, kinds: Optional[Iterable[str]] = None,
+               system_code: Optional[str] = None, label_code: Optional[str] = None,
+               active_only: bool = False, min_score: float = 0.3) -> List[dict]:
+        query_norm = normalize(query)
+        if not query_norm:
+            return []
+        query_grams = ngrams(query_norm)
+
+        # 数组缓冲区被 numpy 引用期间不能追加写入，计数和过滤都在锁内完成
+        with self._lock:
+            n_docs = len(self.texts)
+            lists = sorted((self.postings[g] for g in query_grams if g in self.postings), key=len)
+            if not lists:
+                return []
+            # 从最短（区分度最高）的倒排表开始选取，总长度不超过预算；至少保留最短的一个
+            budget = max(1, int(n_docs * POSTINGS_BUDGET_RATIO))
+            selective, total = [], 0
+            for postings in lists:
+                if selective and total + len(postings) > budget:
+                    break
+                selective.append(postings)
+                total += len(postings)
+            q = len(query_grams)
+            # 跳过的高频 gram 按比例估算: 共享数估计值 = 计数 * scale
+            scale = q / len(selective) if len(selective) < len(lists) else 1.0
+            hits = np.concatenate([np.frombuffer(p, dtype=np.int32) for p in selective])
+            counts = np.bincount(hits, minlength=n_docs)
+            # Dice = 2c / (q + g) 且 g >= c，因此 c >= min_score * q / (2 - min_score)，先据此剪枝
+            # 包含完整查询串的文档必然包含全部内部 gram（不含首尾标记），即使 Dice 较低也要保留
+            interior = sum(1 for g in query_grams if _BEGIN not in g and _END not in g)
+            min_shared = max(1, int(np.ceil(min_score * q / (2 - min_score) / scale)))
+            if interior:
+                min_shared = min(min_shared, max(1, int(np.ceil(interior / scale))))
+            candidates = np.flatnonzero(counts >= min_shared)
+
+            label_ids = np.frombuffer(self.label_ids, dtype=np.int32)
+            mask = np.frombuffer(self.alive, dtype=np.uint8)[candidates].astype(bool)
+            if active_only:
+                mask &= np.frombuffer(self.active, dtype=np.uint8)[candidates].astype(bool)
+            if kinds is not None:
+                kind_ids = [KIND_NAMES.index(k) for k in kinds]
+                mask &= np.isin(np.frombuffer(self.kinds, dtype=np.int8)[candidates], kind_ids)
+            if label_code is not None:
+                mask &= label_ids[candidates] == self.label_code_ids.get(label_code, -2)
+            if system_code is not None:
+                allowed = [self.label_code_ids[code] for code, system in self.label_systems.items()
+                           if system == system_code and code in self.label_code_ids]
+                mask &= np.isin(label_ids[candidates], allowed)
+            candidates = candidates[mask]
+
+            # Dice 相似度
+            gram_counts = np.frombuffer(self.gram_counts, dtype=np.int32)[candidates]
+            shared = counts[candidates] * scale
+            scores = 2.0 * shared / (q + gram_counts)
+            del label_ids, mask, gram_counts
+        likely_contains = shared >= interior if interior else np.zeros(len(candidates), dtype=bool)
+        keep = (scores >= min_score) | likely_contains
+        candidates, scores, likely_contains = candidates[keep], scores[keep], likely_contains[keep]
+
+        # 先按相似度（可能包含完整查询串的预先加分）取出较多候选，再确认是否包含查询串后重排
+        pool = min(len(candidates), limit * 5)
+        if pool < len(candidates):
+            top = np.argpartition(-(scores + likely_contains), pool - 1)[:pool]
+            candidates, scores = candidates[top], scores[top]
+
+        ranked = []
+        for doc_id, score in zip(candidates.tolist(), scores.tolist()):
+            if query_norm in normalize(self.texts[doc_id]):
+                score += 1.0
+            elif score < min_score:
+                continue
+            ranked.append((score, -doc_id))
+
+        results = []
+        for score, neg_doc_id in heapq.nlargest(limit, ranked):
+            doc_id = -neg_doc_id
+            label_id = self.label_ids[doc_id]
+            doc_label = self.label_code_list[label_id] if label_id >= 0 else None
+            results.append({
+                "kind": KIND_NAMES[self.kinds[doc_id]],
+                "text": self.texts[doc_id],
+                "item_code": self.item_codes[doc_id],
+                "rule_code": self.rule_codes[doc_id],
+                "label_code": doc_label,
+                "system_code": self.label_systems.get(doc_label),
+                "is_active": bool(self.active[doc_id]),
+                "score": round(score, 4),
+            })
+        return results
+
+
+def build_index(db: Session) -> NgramIndex:
+    """从数据库全量构建索引"""
+    index = NgramIndex()
+    index.versions = cache.versions(*SEARCH_NAMESPACES)
+    for label_code, label_name, system_code in db.execute(
+        select(Label.label_code, Label.label_name, Label.system_code).order_by(Label.id)
+    ):
+        index.put_label(label_code, label_name, system_code)
+
+    synonyms_by_item: Dict[str, List[str]] = {}
+    for item_code, synonym in db.execute(
+        select(ItemSynonym.item_code, ItemSynonym.synonym).order_by(ItemSynonym.id)
+    ):
+        synonyms_by_item.setdefault(item_code, []).append(synonym)
+    for item_code, item_name, label_code, is_active in db.execute(
+        select(Item.item_code, Item.item_name, Item.label_code, Item.is_active).order_by(Item.id)
+    ):
+        index.put_item(item_code, item_name, label_code, is_active, synonyms_by_item.get(item_code, []))
+
+    for rule_code, rule_entity, label_code, is_active in db.execute(
+        select(IntentRule.rule_code, IntentRule.rule_entity, IntentRule.label_code, IntentRule.is_active)
+        .order_by(IntentRule.id)
+    ):
+        index.put_rule(rule_code, rule_entity, label_code, is_active)
+    return index
+
+
+class SearchIndexManager(IncrementalIndexManager[NgramIndex]):
+    """维护当前进程的搜索索引，写操作后按变更的编码增量更新"""
+
+    def __init__(self):
+        super().__init__("search-index", SEARCH_NAMESPACES, build_index)
+
+    def labels_changed(self, db: Session, label_codes: List[str]) -> None:
+        rows = dict((r[0], r[1:]) for r in db.execute(
+            select(Label.label_code, Label.label_name, Label.system_code).where(Label.label_code.in_(label_codes))
+        ))
+
+        def update(index: NgramIndex):
+            for label_code in label_codes:
+                if label_code in rows:
+                    index.put_label(label_code, *rows[label_code])
+                else:
+                    index.remove_label(label_code)
+        self.apply("labels", update)
+
+    def items_changed(self, db: Session, item_codes: List[str]) -> None:
+        rows = dict((r[0], r[1:]) for r in db.execute(
+            select(Item.item_code, Item.item_name, Item.label_code, Item.is_active)
+            .where(Item.item_code.in_(item_codes))
+        ))
+        synonyms: Dict[str, List[str]] = {}
+        for item_code, synonym in db.execute(
+            select(ItemSynonym.item_code, ItemSynonym.synonym)
+            .where(ItemSynonym.item_code.in_(item_codes)).order_by(ItemSynonym.id)
+        ):
+            synonyms.setdefault(item_code, []).append(synonym)
+
+        def update(index: NgramIndex):
+            for item_code in item_codes:
+                if item_code in rows:
+                    index.put_item(item_code, *rows[item_code], synonyms.get(item_code, []))
+                else:
+                    index.remove_item(item_code)
+        self.apply("items", update)
+
+    def rules_changed(self, db: Session, rule_codes: List[str]) -> None:
+        rows = dict((r[0], r[1:]) for r in db.execute(
+            select(IntentRule.rule_code, IntentRule.rule_entity, IntentRule.label_code, IntentRule.is_active)
+            .where(IntentRule.rule_code.in_(rule_codes))
+        ))
+
+        def update(index: NgramIndex):
+            for rule_code in rule_codes:
+                if rule_code in rows:
+                    index.put_rule(rule_code, *rows[rule_code])
+                else:
+                    index.remove_rule(rule_code)
+        self.apply("intent_rules", update)
+
+
+search_index = SearchIndexManager()
+subscribe("labels", search_index.labels_changed)
+subscribe("items", search_index.items_changed)
+subscribe("intent_rules", search_index.rules_changed)
@@ -0,0 +1,167 @@
+"""
+多轮会话上下文
+
+按 IntentRecognitionRequest.context["session_id"] 保存会话的当前状态: 最近一次识别出的意图，
+以及按实体类型合并后的实体（每种类型保留最近一次提取到的值）。下一轮识别时直接读取该状态补全缺失的槽位，
+不需要回看历史文本。
+
+后端:
+- memory: 进程内，LRU 淘汰，同时限制会话数和估算的内存占用，过期时间从最近一次写入算起
+- redis: 使用 REDIS_URL，键带 TTL，多个 worker 共享；淘汰交由 Redis 的 maxmemory 策略
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SESSION_BACKENDS = ("memory", "redis")
+
+# 每个会话的固定开销估算 (字典、键、时间戳等)，加上状态 JSON 的长度即为估算占用
+_ENTRY_OVERHEAD = 200
+
+
+# IntentRecognitionService 的 session_store 参数默认值: 使用配置的会话存储
+DEFAULT_STORE = object()
+
+
+class SessionStoreError(Exception):
+    """会话存储后端不可用"""
+
+
+class MemorySessionStore:
+    """进程内会话存储 (LRU + TTL + 内存上限)"""
+
+    def __init__(self, ttl: float, max_sessions: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        # session_id -> (状态, 估算字节数, 过期时刻)
+        self._data: "OrderedDict[str, Tuple[dict, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(session_id)
+                return None
+            self._data.move_to_end(session_id)
+            return entry[0]
+
+    def set(self, session_id: str, state: dict) -> None:
+        size = len(json.dumps(state, ensure_ascii=False)) + len(session_id) + _ENTRY_OVERHEAD
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._data:
+                self._remove(session_id)
+            self._data[session_id] = (state, size, now + self.ttl)
+            self._bytes += size
+            # 先清掉队首已过期的会话，再按 LRU 淘汰到上限以内
+            while self._data:
+                oldest, (_, _, expires_at) = next(iter(self._data.items()))
+                if expires_at > now and len(self._data) <= self.max_sessions and self._bytes <= self.max_bytes:
+                    break
+                if expires_at > now:
+                    self.evictions += 1
+                self._remove(oldest)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._data:
+                self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        self._bytes -= self._data.pop(session_id)[1]
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._data),
+            "estimated_bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class RedisSessionStore:
+    """Redis 会话存储，状态以 JSON 保存"""
+
+    def __init__(self, url: str, ttl: float, prefix: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise SessionStoreError("redis package is not installed") from e
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _call(self, method: str, *args, **kwargs):
+        try:
+            return getattr(self._client, method)(*args, **kwargs)
+        except self._redis_errors as e:
+            raise SessionStoreError(str(e)) from e
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    def get(self, session_id: str) -> Optional[dict]:
+        raw = self._call("get", self._key(session_id))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, session_id: str, state: dict) -> None:
+        self._call("set", self._key(session_id), json.dumps(state, ensure_ascii=False), px=int(self.ttl * 1000))
+
+    def delete(self, session_id: str) -> None:
+        self._call("delete", self._key(session_id))
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+def session_id_of(context: Optional[dict]) -> Optional[str]:
+    """从请求上下文中取会话ID"""
+    if not context:
+        return None
+    session_id = context.get("session_id")
+    return str(session_id) if session_id not in (None, "") else None
+
+
+def _memory_store() -> MemorySessionStore:
+    return MemorySessionStore(
+        settings.SESSION_CONTEXT_TTL, settings.SESSION_CONTEXT_MAX_SESSIONS, settings.SESSION_CONTEXT_MAX_BYTES
+    )
+
+
+def create_isolated_store() -> Optional[MemorySessionStore]:
+    """离线工具（流量回放等）使用的独立进程内存储，从空状态开始，不读写配置的会话存储"""
+    return _memory_store() if settings.SESSION_CONTEXT_ENABLED else None
+
+
+def create_session_store():
+    """根据配置创建会话存储，关闭时返回 None；Redis 不可用时退回进程内存储"""
+    if not settings.SESSION_CONTEXT_ENABLED:
+        return None
+    backend = settings.SESSION_CONTEXT_BACKEND.lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Invalid SESSION_CONTEXT_BACKEND: {backend}. Must be one of {', '.join(SESSION_BACKENDS)}.")
+    if backend == "redis":
+        try:
+            return RedisSessionStore(settings.REDIS_URL, settings.SESSION_CONTEXT_TTL, settings.CACHE_KEY_PREFIX)
+        except SessionStoreError as e:
+            logger.warning("redis session store unavailable, falling back to memory: %s", e)
+    return _memory_store()
+
+
+session_store = create_session_store()
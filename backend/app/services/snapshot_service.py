@@ -0,0 +1,54 @@
+import json
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.models import RecognitionSnapshot
+from backend.app.services.recognition_bundle import bundle_manager, current_data_version
+
+
+class SnapshotService:
+    """识别快照的发布、回滚和查询；规则/实体的增删改即草稿，发布后才对识别生效"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def to_dict(snapshot: RecognitionSnapshot) -> dict:
+        return {
+            "version": snapshot.version,
+            "fingerprint": snapshot.fingerprint,
+            "counts": json.loads(snapshot.counts) if snapshot.counts else None,
+            "note": snapshot.note,
+            "status": snapshot.status,
+            "is_current": snapshot.is_current,
+            "created_at": snapshot.created_at,
+            "activated_at": snapshot.activated_at,
+        }
+
+    def get_all(self, include_expired: bool = False) -> List[RecognitionSnapshot]:
+        query = select(RecognitionSnapshot).order_by(RecognitionSnapshot.id.desc())
+        if not include_expired:
+            query = query.where(RecognitionSnapshot.status == "active")
+        return list(self.db.scalars(query))
+
+    def get_current(self) -> Optional[RecognitionSnapshot]:
+        return bundle_manager.current_snapshot(self.db)
+
+    def draft_status(self) -> dict:
+        """草稿与当前快照的对比: 草稿版本（变更序号）与当前快照发布时的版本不同即有未发布的修改"""
+        current = self.get_current()
+        fingerprint = current_data_version(self.db)
+        return {
+            "current_version": current.version if current else None,
+            "draft_fingerprint": fingerprint,
+            "published_fingerprint": current.fingerprint if current else None,
+            "has_unpublished_changes": current is None or current.fingerprint != fingerprint,
+        }
+
+    def publish(self, note: Optional[str] = None) -> RecognitionSnapshot:
+        return bundle_manager.publish(self.db, note)
+
+    def rollback(self, version: str) -> RecognitionSnapshot:
+        return bundle_manager.rollback(self.db, version)
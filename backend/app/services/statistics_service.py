@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.app.models import IntentRule, Item, Label, RecognitionStat
+from backend.app.services.recognition_stats import LATENCY_BOUNDS_MS, LATENCY_KEYS
+
+
+class StatisticsService:
+    """统计查询，只读取 recognition_stats 汇总表和少量分组计数"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _sum(self, dimension: str, since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Tuple[int, datetime]]:
+        """按键汇总某个维度: stat_key -> (次数, 最近一个有计数的时间桶)"""
+        query = (
+            select(RecognitionStat.stat_key, func.sum(RecognitionStat.hit_count), func.max(RecognitionStat.bucket_start))
+            .where(RecognitionStat.dimension == dimension)
+            .group_by(RecognitionStat.stat_key)
+        )
+        query = self._between(query, since, until)
+        return {key: (int(count), last) for key, count, last in self.db.execute(query)}
+
+    @staticmethod
+    def _between(query, since: Optional[datetime], until: Optional[datetime]):
+        if since is not None:
+            query = query.where(RecognitionStat.bucket_start >= since)
+        if until is not None:
+            query = query.where(RecognitionStat.bucket_start < until)
+        return query
+
+    def label_stats(self, system_code: Optional[str] = None, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None) -> List[dict]:
+        """各标签的规则数、实体数和作为识别结果的次数"""
+        hits = self._sum("label", since, until)
+        rule_counts = dict(self.db.execute(
+            select(IntentRule.label_code, func.count()).where(IntentRule.is_active == True).group_by(IntentRule.label_code)
+        ).all())
+        item_counts = dict(self.db.execute(
+            select(Item.label_code, func.count()).where(Item.is_active == True).group_by(Item.label_code)
+        ).all())
+        query = select(Label.label_code, Label.label_name, Label.system_code, Label.level).order_by(Label.id)
+        if system_code:
+            query = query.where(Label.system_code == system_code)
+        result = []
+        for label_code, label_name, label_system, level in self.db.execute(query):
+            hit_count, last_hit = hits.get(label_code, (0, None))
+            result.append({
+                "label_code": label_code,
+                "label_name": label_name,
+                "system_code": label_system,
+                "level": level,
+                "rule_count": rule_counts.get(label_code, 0),
+                "item_count": item_counts.get(label_code, 0),
+                "hit_count": hit_count,
+                "last_hit_bucket": last_hit,
+            })
+        return result
+
+    def rule_stats(self, label_code: Optional[str] = None, unused_only: bool = False,
+                   since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[dict]:
+        """各规则的命中次数，按命中次数降序；unused_only 时只返回未命中过的可用规则"""
+        hits = self._sum("rule", since, until)
+        query = select(
+            IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity, IntentRule.label_code, IntentRule.is_active
+        ).order_by(IntentRule.id)
+        if label_code:
+            query = query.where(IntentRule.label_code == label_code)
+        result = []
+        for rule_code, rule_type, rule_entity, rule_label, is_active in self.db.execute(query):
+            hit_count, last_hit = hits.get(rule_code, (0, None))
+            if unused_only and (hit_count or not is_active):
+                continue
+            result.append({
+                "rule_code": rule_code,
+                "rule_type": rule_type,
+                "rule_entity": rule_entity,
+                "label_code": rule_label,
+                "is_active": is_active,
+                "hit_count": hit_count,
+                "last_hit_bucket": last_hit,
+            })
+        result.sort(key=lambda r: r["hit_count"], reverse=True)
+        return result
+
+    def recognition_stats(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          top_unrecognized: int = 20) -> dict:
+        """识别总量、识别率、耗时分布、按时间桶的趋势和高频未识别文本"""
+        requests = self._sum("request", since, until)
+        recognized = requests.get("recognized", (0, None))[0]
+        unrecognized = requests.get("unrecognized", (0, None))[0]
+        total = recognized + unrecognized
+
+        latency = {key: 0 for key in LATENCY_KEYS}
+        for key, (count, _) in self._sum("latency", since, until).items():
+            if key in latency:
+                latency[key] = count
+        percentiles = {}
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            percentiles[name] = self._histogram_quantile(latency, q)
+
+        timeline: Dict[datetime, dict] = {}
+        query = self._between(
+            select(RecognitionStat.bucket_start, RecognitionStat.stat_key, func.sum(RecognitionStat.hit_count))
+            .where(RecognitionStat.dimension == "request")
+            .group_by(RecognitionStat.bucket_start, RecognitionStat.stat_key),
+            since, until,
+        )
+        for bucket_start, key, count in self.db.execute(query):
+            point = timeline.setdefault(bucket_start, {"bucket_start": bucket_start, "recognized": 0, "unrecognized": 0})
+            point[key] = int(count)
+
+        unrecognized_texts = sorted(
+            ((count, text) for text, (count, _) in self._sum("unrecognized", since, until).items()),
+            reverse=True,
+        )[:top_unrecognized]
+        return {
+            "total": total,
+            "recognized": recognized,
+            "unrecognized": unrecognized,
+            "recognition_rate": round(recognized / total, 4) if total else 0.0,
+            "latency_histogram_ms": latency,
+            "latency_ms": percentiles,
+            "timeline": [timeline[bucket] for bucket in sorted(timeline)],
+            "top_unrecognized": [{"text": text, "count": count} for count, text in unrecognized_texts],
+        }
+
+    @staticmethod
+    def _histogram_quantile(histogram: Dict[str, int], q: float) -> Optional[float]:
+        """由直方图估算分位数，取所在桶的上界（最后一个桶返回 None）"""
+        total = sum(histogram.values())
+        if not total:
+            return None
+        threshold, seen = q * total, 0
+        for bound, key in zip(LATENCY_BOUNDS_MS + (None,), LATENCY_KEYS):
+            seen += histogram[key]
+            if seen >= threshold:
+                return bound
+        return None
@@ -0,0 +1,208 @@
+"""
+实体表面形式冲突索引
+
+维护 规范化表面形式（实体名称/同义词）-> 实体编码 的映射，只收录可用实体（与识别数据包一致）。
+ItemService 创建/更新实体前以 O(1) 查询新表面形式是否已被其他实体占用；
+同一表面形式属于多个实体的键另存一份集合，冲突报告只需遍历该集合。
+"""
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import cache
+from backend.app.core.events import subscribe
+from backend.app.models import Item, ItemSynonym
+from backend.app.services.incremental_index import IncrementalIndexManager
+from backend.app.utils.memory import attribute_sizes
+
+# 索引依赖的缓存命名空间
+SURFACE_NAMESPACES = ("items",)
+
+
+def normalize_surface(text: str) -> str:
+    """全半角统一、合并空白并转小写"""
+    return " ".join(unicodedata.normalize("NFKC", text).split()).lower()
+
+
+class SurfaceCollisionError(ValueError):
+    """新的表面形式与其他实体冲突"""
+
+    def __init__(self, collisions: List[dict]):
+        self.collisions = collisions
+        surfaces = ", ".join(c["surface"] for c in collisions)
+        super().__init__(f"Surface forms already used by other items: {surfaces}")
+
+
+class _Owner:
+    """占用某个表面形式的实体"""
+
+    __slots__ = ("item_code", "kind", "text")
+
+    def __init__(self, item_code: str, kind: str, text: str):
+        self.item_code = item_code
+        self.kind = kind
+        self.text = text
+
+
+class _ItemEntry:
+    """实体的名称、所属标签和全部规范化表面形式"""
+
+    __slots__ = ("item_name", "label_code", "surfaces")
+
+    def __init__(self, item_name: str, label_code: str, surfaces: Tuple[str, ...]):
+        self.item_name = item_name
+        self.label_code = label_code
+        self.surfaces = surfaces
+
+
+class SurfaceIndex:
+    """
+    规范化表面形式 -> 占用它的实体 (_Owner 元组)。
+    绝大多数表面形式只属于一个实体，用元组和 __slots__ 记录代替每个键一个字典，内存约为后者的一半。
+    """
+
+    def __init__(self):
+        self.owners: Dict[str, Tuple[_Owner, ...]] = {}
+        self.items: Dict[str, _ItemEntry] = {}
+        self.collisions: Set[str] = set()
+        self.versions: Tuple[int, ...] = ()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    @staticmethod
+    def surfaces_of(item_name: str, synonyms: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """实体的全部表面形式，同一实体内规范化后重复的只保留第一个"""
+        surfaces: Dict[str, Tuple[str, str]] = {}
+        for kind, text in [("name", item_name)] + [("synonym", s) for s in synonyms]:
+            key = normalize_surface(text)
+            if key and key not in surfaces:
+                surfaces[key] = (kind, text)
+        return surfaces
+
+    def put_item(self, item_code: str, item_name: str, label_code: str, synonyms: Iterable[str]) -> None:
+        with self._lock:
+            self._remove(item_code)
+            surfaces = self.surfaces_of(item_name, synonyms)
+            for key, (kind, text) in surfaces.items():
+                owners = self.owners.get(key, ()) + (_Owner(item_code, kind, text),)
+                self.owners[key] = owners
+                if len(owners) > 1:
+                    self.collisions.add(key)
+            self.items[item_code] = _ItemEntry(item_name, label_code, tuple(surfaces))
+
+    def remove_item(self, item_code: str) -> None:
+        with self._lock:
+            self._remove(item_code)
+
+    def _remove(self, item_code: str) -> None:
+        entry = self.items.pop(item_code, None)
+        if entry is None:
+            return
+        for key in entry.surfaces:
+            owners = tuple(owner for owner in self.owners[key] if owner.item_code != item_code)
+            if owners:
+                self.owners[key] = owners
+            else:
+                del self.owners[key]
+            if len(owners) < 2:
+                self.collisions.discard(key)
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            return attribute_sizes(self)
+
+    def find_conflicts(self, item_code: str, item_name: str, synonyms: Iterable[str]) -> List[dict]:
+        """
+        返回该实体新增的表面形式中已被其他实体占用的部分。
+        实体已有的表面形式不再检查，已存在的冲突由冲突报告暴露，不阻塞无关字段的修改。
+        """
+        with self._lock:
+            entry = self.items.get(item_code)
+            existing = set(entry.surfaces) if entry is not None else set()
+            conflicts = []
+            for key, (_, text) in self.surfaces_of(item_name, synonyms).items():
+                if key in existing:
+                    continue
+                others = [owner for owner in self.owners.get(key, ()) if owner.item_code != item_code]
+                if others:
+                    conflicts.append({"surface": key, "text": text, "items": [self._owner(o) for o in others]})
+            return conflicts
+
+    def _owner(self, owner: _Owner) -> dict:
+        entry = self.items[owner.item_code]
+        return {
+            "item_code": owner.item_code, "item_name": entry.item_name, "label_code": entry.label_code,
+            "kind": owner.kind, "text": owner.text,
+        }
+
+    def report(self, label_codes: Optional[Set[str]] = None) -> List[dict]:
+        """列出所有冲突的表面形式；给定 label_codes 时只保留至少有一个实体属于这些标签的冲突"""
+        with self._lock:
+            result = []
+            for key in sorted(self.collisions):
+                owners = [self._owner(owner) for owner in self.owners[key]]
+                if label_codes is not None and not any(o["label_code"] in label_codes for o in owners):
+                    continue
+                result.append({"surface": key, "items": owners})
+            return result
+
+
+def _load_items(db: Session, item_codes: Optional[List[str]] = None) -> Dict[str, tuple]:
+    """读取可用实体及其同义词: item_code -> (item_name, label_code, synonyms)"""
+    query = select(Item.item_code, Item.item_name, Item.label_code).where(Item.is_active == True).order_by(Item.id)
+    synonym_query = (
+        select(ItemSynonym.item_code, ItemSynonym.synonym)
+        .join(Item, Item.item_code == ItemSynonym.item_code)
+        .where(Item.is_active == True)
+        .order_by(ItemSynonym.id)
+    )
+    if item_codes is not None:
+        query = query.where(Item.item_code.in_(item_codes))
+        synonym_query = synonym_query.where(ItemSynonym.item_code.in_(item_codes))
+    synonyms: Dict[str, List[str]] = {}
+    for item_code, synonym in db.execute(synonym_query):
+        synonyms.setdefault(item_code, []).append(synonym)
+    return {
+        item_code: (item_name, label_code, synonyms.get(item_code, []))
+        for item_code, item_name, label_code in db.execute(query)
+    }
+
+
+def build_surface_index(db: Session) -> SurfaceIndex:
+    """从数据库全量构建冲突索引"""
+    index = SurfaceIndex()
+    index.versions = cache.versions(*SURFACE_NAMESPACES)
+    for item_code, (item_name, label_code, synonyms) in _load_items(db).items():
+        index.put_item(item_code, item_name, label_code, synonyms)
+    return index
+
+
+class SurfaceIndexManager(IncrementalIndexManager[SurfaceIndex]):
+    """维护当前进程的冲突索引，实体写操作后增量更新"""
+
+    def __init__(self):
+        super().__init__("surface-index", SURFACE_NAMESPACES, build_surface_index)
+
+    def items_changed(self, db: Session, item_codes: List[str]) -> None:
+        rows = _load_items(db, item_codes)
+
+        def update(index: SurfaceIndex):
+            for item_code in item_codes:
+                if item_code in rows:
+                    item_name, label_code, synonyms = rows[item_code]
+                    index.put_item(item_code, item_name, label_code, synonyms)
+                else:
+                    index.remove_item(item_code)
+        self.apply("items", update)
+
+
+surface_index = SurfaceIndexManager()
+subscribe("items", surface_index.items_changed)
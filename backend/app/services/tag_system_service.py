@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
-from backend.app.models import TagSystem
-from backend.app.core.schemas import TagSystemCreate, TagSystemUpdate
+from backend.app.models import TagSystem, Label, Item, ItemSynonym, IntentRule
+from backend.app.core.schemas import TagSystemCloneRequest, TagSystemCreate, TagSystemUpdate
+from backend.app.core.cache import cache
+from backend.app.core.events import publish_changes, record_change
+from backend.app.utils.subtree import chunks, parent_first
 
 class TagSystemService:
     def __init__(self, db: Session):
@@ -10,15 +14,75 @@ class TagSystemService:
     def get_by_code(self, system_code: str) -> Optional[TagSystem]:
         return self.db.query(TagSystem).filter(TagSystem.system_code == system_code).first()
 
-    def get_all(self) -> List[TagSystem]:
-        return self.db.query(TagSystem).all()
+    def get_all(self) -> List[dict]:
+        """获取全部标签体系 (缓存)"""
+        def load():
+            return [
+                {
+                    "system_name": system.system_name,
+                    "system_code": system.system_code,
+                    "system_type": system.system_type,
+                    "description": system.description,
+                    "id": system.id,
+                    "created_at": system.created_at,
+                    "updated_at": system.updated_at,
+                }
+                for system in self.db.query(TagSystem).all()
+            ]
+        return cache.get_or_load("tag_systems", "all", load)
+
+    def export_rows(self, system_code: str) -> Optional[dict]:
+        """导出整个体系（标签、实体、同义词、意图规则），全部由行元组构建，不创建 ORM 对象"""
+        def fetch(*columns, where, order_by):
+            keys = [column.key for column in columns]
+            rows = self.db.execute(select(*columns).where(where).order_by(order_by)).all()
+            return [dict(zip(keys, row)) for row in rows]
+
+        systems = fetch(
+            TagSystem.system_name, TagSystem.system_code, TagSystem.system_type, TagSystem.description,
+            TagSystem.id, TagSystem.created_at, TagSystem.updated_at,
+            where=TagSystem.system_code == system_code, order_by=TagSystem.id,
+        )
+        if not systems:
+            return None
+
+        label_codes = select(Label.label_code).where(Label.system_code == system_code)
+        item_codes = select(Item.item_code).where(Item.label_code.in_(label_codes))
+        labels = fetch(
+            Label.label_name, Label.label_code, Label.parent_label_code, Label.system_code,
+            Label.level, Label.description, Label.id, Label.created_at, Label.updated_at,
+            where=Label.system_code == system_code, order_by=Label.id,
+        )
+        items = fetch(
+            Item.item_name, Item.item_code, Item.parent_item_code, Item.label_code,
+            Item.description, Item.is_active, Item.id, Item.created_at, Item.updated_at,
+            where=Item.label_code.in_(label_codes), order_by=Item.id,
+        )
+        synonyms = fetch(
+            ItemSynonym.id, ItemSynonym.item_code, ItemSynonym.synonym,
+            where=ItemSynonym.item_code.in_(item_codes), order_by=ItemSynonym.id,
+        )
+        rules = fetch(
+            IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity, IntentRule.label_code,
+            IntentRule.is_active, IntentRule.id, IntentRule.created_at, IntentRule.updated_at,
+            where=IntentRule.label_code.in_(label_codes), order_by=IntentRule.id,
+        )
+        return {
+            "system": systems[0],
+            "labels": labels,
+            "items": items,
+            "item_synonyms": synonyms,
+            "intent_rules": rules,
+        }
 
     def create(self, system_create: TagSystemCreate) -> TagSystem:
         if self.get_by_code(system_create.system_code):
             raise ValueError(f"System with code {system_create.system_code} already exists.")
         db_system = TagSystem(**system_create.dict())
         self.db.add(db_system)
+        record_change(self.db, "tag_systems", db_system.system_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_system)
         return db_system
 
@@ -29,7 +93,9 @@ class TagSystemService:
         update_data = system_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_system, field, value)
+        record_change(self.db, "tag_systems", system_code)
         self.db.commit()
+        publish_changes(self.db)
         self.db.refresh(db_system)
         return db_system
 
@@ -38,5 +104,119 @@ class TagSystemService:
         if not db_system:
             return False
         self.db.delete(db_system)
+        record_change(self.db, "tag_systems", system_code, operation="delete")
         self.db.commit()
+        publish_changes(self.db)
         return True
+
+    def clone(self, system_code: str, request: TagSystemCloneRequest) -> Optional[dict]:
+        """
+        克隆整个体系（标签、实体、同义词、意图规则）到新的 system_code，所有编码加上 code_prefix
+        （默认为 "新体系编码_"），父子关系在副本内部重新指向。副本实体和规则默认停用。
+        标签和实体按父节点在前的顺序分块 INSERT ... SELECT，同义词和规则各一条 INSERT ... SELECT，同一事务提交。
+        """
+        source = self.get_by_code(system_code)
+        if not source:
+            return None
+        if self.get_by_code(request.system_code):
+            raise ValueError(f"System with code {request.system_code} already exists.")
+        system_name = request.system_name or f"{source.system_name} ({request.system_code})"
+        if self.db.scalars(select(TagSystem.id).where(TagSystem.system_name == system_name)).first():
+            raise ValueError(f"System with name {system_name} already exists.")
+        prefix_text = request.code_prefix or f"{request.system_code}_"
+        prefix = literal(prefix_text)
+
+        label_codes = select(Label.label_code).where(Label.system_code == system_code)
+        item_codes = select(Item.item_code).where(Item.label_code.in_(label_codes))
+        self._check_clone_codes(Label, Label.label_code, Label.system_code == system_code, prefix_text)
+        self._check_clone_codes(Item, Item.item_code, Item.label_code.in_(label_codes), prefix_text)
+        self._check_clone_codes(IntentRule, IntentRule.rule_code, IntentRule.label_code.in_(label_codes), prefix_text)
+
+        label_pairs = self.db.execute(
+            select(Label.label_code, Label.parent_label_code).where(Label.system_code == system_code)
+        ).all()
+        item_pairs = self.db.execute(
+            select(Item.item_code, Item.parent_item_code).where(Item.label_code.in_(label_codes))
+        ).all()
+        item_parents = dict(item_pairs)
+        try:
+            self.db.add(TagSystem(
+                system_name=system_name,
+                system_code=request.system_code,
+                system_type=source.system_type,
+                description=request.description if request.description is not None else source.description,
+            ))
+            self.db.flush()
+            # 父节点在副本内的指向其副本，父节点在体系外的（跨体系引用）保持原引用
+            label_parents = dict(label_pairs)
+            for chunk in chunks(parent_first(label_pairs)):
+                for group, parent_column in self._split_by_parent(chunk, label_parents, prefix + Label.parent_label_code,
+                                                                  Label.parent_label_code):
+                    self.db.execute(insert(Label).from_select(
+                        ["label_name", "label_code", "parent_label_code", "system_code", "level", "description"],
+                        select(
+                            Label.label_name, prefix + Label.label_code, parent_column,
+                            literal(request.system_code), Label.level, Label.description,
+                        ).where(Label.label_code.in_(group)),
+                    ))
+            for chunk in chunks(parent_first(item_pairs)):
+                for group, parent_column in self._split_by_parent(chunk, item_parents, prefix + Item.parent_item_code,
+                                                                  Item.parent_item_code):
+                    self.db.execute(insert(Item).from_select(
+                        ["item_name", "item_code", "parent_item_code", "label_code", "description", "is_active"],
+                        select(
+                            Item.item_name, prefix + Item.item_code, parent_column, prefix + Item.label_code,
+                            Item.description, Item.is_active if request.active else literal(False),
+                        ).where(Item.item_code.in_(group)),
+                    ))
+            synonyms = self.db.execute(insert(ItemSynonym).from_select(
+                ["item_code", "synonym"],
+                select(prefix + ItemSynonym.item_code, ItemSynonym.synonym)
+                .where(ItemSynonym.item_code.in_(item_codes)).order_by(ItemSynonym.id),
+            )).rowcount
+            rules = self.db.execute(insert(IntentRule).from_select(
+                ["rule_code", "rule_type", "rule_entity", "label_code", "is_active"],
+                select(
+                    prefix + IntentRule.rule_code, IntentRule.rule_type, IntentRule.rule_entity,
+                    prefix + IntentRule.label_code, IntentRule.is_active if request.active else literal(False),
+                ).where(IntentRule.label_code.in_(label_codes)).order_by(IntentRule.id),
+            )).rowcount
+            record_change(self.db, "tag_systems", request.system_code)
+            for namespace in ("labels", "items", "intent_rules"):
+                record_change(self.db, namespace)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        publish_changes(self.db)
+        return {
+            "system_code": request.system_code,
+            "system_name": system_name,
+            "code_prefix": prefix_text,
+            "labels": len(label_pairs),
+            "items": len(item_pairs),
+            "item_synonyms": synonyms,
+            "intent_rules": rules,
+        }
+
+    @staticmethod
+    def _split_by_parent(chunk, parents: dict, inside_column, outside_column):
+        """按父节点是否在被克隆集合内分组，返回 (编码组, 父编码列表达式)"""
+        inside = [code for code in chunk if parents[code] in parents]
+        outside = [code for code in chunk if parents[code] not in parents]
+        return [(group, column) for group, column in ((inside, inside_column), (outside, outside_column)) if group]
+
+    def _check_clone_codes(self, model, column, where, code_prefix: str) -> None:
+        """校验加前缀后的编码不超过列宽且不与已有编码重复（各一条查询）"""
+        longest = self.db.scalar(select(func.max(func.length(column))).where(where))
+        if longest is not None and longest + len(code_prefix) > column.type.length:
+            raise ValueError(f"Prefixed codes in {model.__tablename__} exceed {column.type.length} characters.")
+        source = aliased(model)
+        source_column = getattr(source, column.key)
+        existing = self.db.scalars(
+            select(column).where(column.in_(
+                select(literal(code_prefix) + source_column).where(source_column.in_(select(column).where(where)))
+            )).limit(1)
+        ).first()
+        if existing is not None:
+            raise ValueError(f"Code {existing} already exists in {model.__tablename__}.")
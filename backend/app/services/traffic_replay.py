@@ -0,0 +1,238 @@
+"""
+识别流量回放
+
+读取识别请求日志 (JSONL，每行 {"text", "context", "response", "latency_ms", ...}，见 recognition_log)，
+用当前规则和实体数据逐条重新识别，统计耗时分位数和吞吐量，并与日志中记录的响应逐条对比意图、置信度和提取的实体。
+
+回放可以全速进行，也可以按固定速率 (条/秒) 发送。按速率回放时请求按计划时刻发出，
+response_ms 从计划时刻算起（包含排队等待），service_ms 只计识别本身耗时，避免慢请求掩盖后续请求的等待。
+记录中的 context 原样传入，带 session_id 的多轮请求只有在单线程回放时才能保证与原始顺序一致。
+每次回放使用独立的进程内会话存储，从空状态开始，不读写线上配置的会话存储（如 Redis），结果可重复。
+"""
+import json
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.app.core.database import SessionLocal
+from backend.app.services.intent_recognition_service import IntentRecognitionService
+from backend.app.services.session_context import create_isolated_store
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+# 置信度差异不超过该值视为相同
+CONFIDENCE_TOLERANCE = 1e-6
+
+# 意图变化统计只保留出现最多的若干种
+TOP_TRANSITIONS = 20
+
+Entity = Tuple[str, str, int, int]
+
+
+def log_files(paths: Sequence[Path]) -> List[Path]:
+    """
+    展开回放输入: 文件原样使用，目录取其中的 recognition-*.jsonl，
+    包括各 worker 的 recognition-YYYYMMDD-<pid>-NNN.jsonl 和旧的 recognition-YYYYMMDD-NNN.jsonl。
+    按日期、文件名排序，同一天内不同 worker 的文件依次回放（不按时间戳交错）。
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("recognition-*.jsonl"), key=lambda p: (p.stem.split("-")[1], p.name)))
+        else:
+            files.append(path)
+    return files
+
+
+def read_log(paths: Sequence[Path], limit: Optional[int] = None) -> Iterator[Tuple[int, dict]]:
+    """逐行读取识别日志，产出 (序号, 记录)，跳过空行和没有文本的记录"""
+    seq = 0
+    for path in log_files(paths):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if not (record.get("text") or "").strip():
+                    continue
+                if limit is not None and seq >= limit:
+                    return
+                seq += 1
+                yield seq, record
+
+
+def percentiles(values: List[float], points: Iterable[float] = PERCENTILES) -> Dict[str, Optional[float]]:
+    """最近秩分位数 (毫秒，保留 3 位小数)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered) / 100) - 1))
+        result[f"p{p:g}"] = round(ordered[index], 3)
+    result["max"] = round(ordered[-1], 3)
+    result["mean"] = round(sum(ordered) / len(ordered), 3)
+    return result
+
+
+def _entities(response: dict) -> set:
+    return {
+        (e["entity_type"], e["entity_value"], e["start_pos"], e["end_pos"])
+        for e in response.get("extracted_entities") or []
+    }
+
+
+def _entity_dicts(entities: Iterable[Entity]) -> List[dict]:
+    return [
+        {"entity_type": t, "entity_value": v, "start_pos": s, "end_pos": e}
+        for t, v, s, e in sorted(entities, key=lambda x: (x[2], x[3], x[0], x[1]))
+    ]
+
+
+def diff_response(recorded: dict, replayed: dict, tolerance: float = CONFIDENCE_TOLERANCE) -> dict:
+    """对比记录的响应和回放的响应，返回有差异的字段（无差异时为空字典）"""
+    diff = {}
+    if recorded.get("intent") != replayed["intent"]:
+        diff["intent"] = [recorded.get("intent"), replayed["intent"]]
+    old_confidence = recorded.get("confidence")
+    if old_confidence is None or abs(old_confidence - replayed["confidence"]) > tolerance:
+        diff["confidence"] = [old_confidence, replayed["confidence"]]
+    old_entities, new_entities = _entities(recorded), _entities(replayed)
+    if old_entities != new_entities:
+        diff["entities_added"] = _entity_dicts(new_entities - old_entities)
+        diff["entities_removed"] = _entity_dicts(old_entities - new_entities)
+    return diff
+
+
+class TrafficReplayer:
+    """多线程回放，每个线程使用独立的数据库会话"""
+
+    def __init__(self, concurrency: int = 1, rate: Optional[float] = None,
+                 tolerance: float = CONFIDENCE_TOLERANCE):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate if rate and rate > 0 else None
+        self.tolerance = tolerance
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self.session_store = create_isolated_store()
+
+    def _service(self) -> IntentRecognitionService:
+        service = getattr(self._local, "service", None)
+        if service is None:
+            db = SessionLocal()
+            with self._sessions_lock:
+                self._sessions.append(db)
+            service = self._local.service = IntentRecognitionService(db, session_store=self.session_store)
+        return service
+
+    def _replay_one(self, seq: int, record: dict, scheduled: float) -> dict:
+        service = self._service()
+        started = time.perf_counter()
+        try:
+            _, response = service.recognize(record["text"].strip(), record.get("context"))
+            replayed, error = response.model_dump(mode="json"), None
+        except Exception as e:
+            service.db.rollback()
+            replayed, error = None, f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        return {
+            "seq": seq,
+            "record": record,
+            "replayed": replayed,
+            "error": error,
+            "service_ms": (finished - started) * 1000,
+            "response_ms": (finished - scheduled) * 1000,
+        }
+
+    def run(self, records: Iterable[Tuple[int, dict]], on_diff: Optional[Callable[[dict], None]] = None,
+            on_progress: Optional[Callable[[int], None]] = None) -> dict:
+        """回放全部记录并返回汇总报告；每条有差异（或出错）的记录回调 on_diff"""
+        service_ms: List[float] = []
+        response_ms: List[float] = []
+        recorded_ms: List[float] = []
+        counts = Counter()
+        transitions = Counter()
+
+        def collect(result: dict) -> None:
+            record = result["record"]
+            counts["total"] += 1
+            service_ms.append(result["service_ms"])
+            response_ms.append(result["response_ms"])
+            if isinstance(record.get("latency_ms"), (int, float)):
+                recorded_ms.append(record["latency_ms"])
+            if result["error"] is not None:
+                counts["errors"] += 1
+                diff = {"error": result["error"]}
+            else:
+                diff = diff_response(record.get("response") or {}, result["replayed"], self.tolerance)
+                if not diff:
+                    counts["identical"] += 1
+                if "intent" in diff:
+                    counts["intent_changed"] += 1
+                    transitions[tuple(diff["intent"])] += 1
+                if "confidence" in diff:
+                    counts["confidence_changed"] += 1
+                if "entities_added" in diff:
+                    counts["entities_changed"] += 1
+            if diff and on_diff is not None:
+                on_diff({"seq": result["seq"], "id": record.get("id"), "text": record["text"], **diff})
+            if on_progress is not None:
+                on_progress(counts["total"])
+
+        interval = 1.0 / self.rate if self.rate else 0.0
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="replay") as pool:
+                pending = set()
+                for index, (seq, record) in enumerate(records):
+                    # 在途请求数有上限，日志无需整体读入内存
+                    while len(pending) >= self.concurrency * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result())
+                    if interval:
+                        scheduled = started + index * interval
+                        delay = scheduled - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    else:
+                        scheduled = time.perf_counter()
+                    pending.add(pool.submit(self._replay_one, seq, record, scheduled))
+                for future in pending:
+                    collect(future.result())
+        finally:
+            for db in self._sessions:
+                db.close()
+            self._sessions.clear()
+        elapsed = time.perf_counter() - started
+
+        total = counts["total"]
+        return {
+            "total": total,
+            "errors": counts["errors"],
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+            "target_rate": self.rate,
+            "concurrency": self.concurrency,
+            "latency_ms": {
+                "service": percentiles(service_ms),
+                "response": percentiles(response_ms),
+                "recorded": percentiles(recorded_ms),
+            },
+            "diff": {
+                "identical": counts["identical"],
+                "intent_changed": counts["intent_changed"],
+                "confidence_changed": counts["confidence_changed"],
+                "entities_changed": counts["entities_changed"],
+                "intent_transitions": [
+                    {"recorded": old, "replayed": new, "count": count}
+                    for (old, new), count in transitions.most_common(TOP_TRANSITIONS)
+                ],
+            },
+        }
@@ -0,0 +1,202 @@
+"""
+启动预热
+
+应用启动后在后台线程中依次预热数据库连接池、识别数据包、标签树缓存、搜索索引、补全索引和冲突索引，
+并记录每个阶段的耗时。预热完成前 /ready 返回未就绪，滚动发布时负载均衡器不会把流量导给冷启动的 worker。
+
+失败的阶段（如启动时数据库短暂不可用）按指数退避重试（WARMUP_RETRY_INITIAL_DELAY 起，
+最长间隔 WARMUP_RETRY_MAX_DELAY），全部成功后进程即变为就绪，不会因一次失败永久退出负载均衡。
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal, engine
+from backend.app.services.autocomplete_index import autocomplete_index
+from backend.app.services.label_service import LabelService
+from backend.app.services.recognition_bundle import get_recognition_bundle
+from backend.app.services.search_index import search_index
+from backend.app.services.surface_index import surface_index
+from backend.app.services.tag_system_service import TagSystemService
+
+logger = logging.getLogger(__name__)
+
+
+def warm_database_pool() -> dict:
+    """预先建立连接池中的连接"""
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    connections = []
+    try:
+        for _ in range(max(pool_size, 1)):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    return {"connections": len(connections)}
+
+
+def warm_recognition() -> dict:
+    """加载（必要时编译）识别数据包，并试跑一次匹配使 mmap 页面进入内存"""
+    db = SessionLocal()
+    try:
+        bundle = get_recognition_bundle(db)
+        bundle.match_rules("warmup")
+        bundle.extract_entities("warmup")
+        return {"version": bundle.version, "counts": bundle.meta["counts"]}
+    finally:
+        db.close()
+
+
+def warm_label_trees() -> dict:
+    """预先构建所有体系的标签树缓存"""
+    db = SessionLocal()
+    try:
+        systems = TagSystemService(db).get_all()
+        label_service = LabelService(db)
+        for system in systems:
+            label_service.get_label_tree(system["system_code"])
+        return {"systems": len(systems)}
+    finally:
+        db.close()
+
+
+def warm_search_index() -> dict:
+    """构建搜索索引"""
+    db = SessionLocal()
+    try:
+        return {"documents": len(search_index.get(db))}
+    finally:
+        db.close()
+
+
+def warm_autocomplete_index() -> dict:
+    """构建实体补全索引"""
+    db = SessionLocal()
+    try:
+        return {"entries": len(autocomplete_index.get(db))}
+    finally:
+        db.close()
+
+
+def warm_surface_index() -> dict:
+    """构建实体表面形式冲突索引"""
+    db = SessionLocal()
+    try:
+        return {"surfaces": len(surface_index.get(db))}
+    finally:
+        db.close()
+
+
+WARMUP_PHASES: List[Tuple[str, Callable[[], dict]]] = [
+    ("database", warm_database_pool),
+    ("recognition", warm_recognition),
+    ("label_trees", warm_label_trees),
+    ("search_index", warm_search_index),
+    ("autocomplete_index", warm_autocomplete_index),
+    ("surface_index", warm_surface_index),
+]
+
+
+class WarmupState:
+    """预热状态，供 /ready 查询"""
+
+    def __init__(self, phases: List[Tuple[str, Callable[[], dict]]]):
+        self.phases = phases
+        self.results: Dict[str, dict] = {name: {"status": "pending"} for name, _ in phases}
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.total_ms: Optional[float] = None
+        self.passes = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """至少已完整执行过一轮"""
+        return self.finished_at is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished and all(r["status"] == "ok" for r in self.results.values())
+
+    def run_once(self) -> bool:
+        """执行一轮: 依次运行尚未成功的阶段，返回是否全部成功"""
+        if self.started_at is None:
+            self.started_at = datetime.now()
+        started = time.perf_counter()
+        for name, phase in self.phases:
+            if self.results[name]["status"] == "ok":
+                continue
+            attempts = self.results[name].get("attempts", 0) + 1
+            self.results[name] = {"status": "running", "attempts": attempts}
+            phase_started = time.perf_counter()
+            try:
+                detail = phase()
+                self.results[name] = {"status": "ok", "detail": detail, "attempts": attempts}
+            except Exception as e:
+                logger.exception("warm-up phase %s failed (attempt %s)", name, attempts)
+                self.results[name] = {"status": "failed", "error": str(e), "attempts": attempts}
+            self.results[name]["duration_ms"] = round((time.perf_counter() - phase_started) * 1000, 2)
+            logger.info("warm-up phase %s: %s", name, self.results[name])
+        self.passes += 1
+        self.total_ms = round((self.total_ms or 0.0) + (time.perf_counter() - started) * 1000, 2)
+        self.finished_at = datetime.now()
+        return self.ready
+
+    def run(self) -> None:
+        """执行预热，失败的阶段按指数退避重试直到全部成功"""
+        delay = settings.WARMUP_RETRY_INITIAL_DELAY
+        while not self.run_once():
+            failed = [name for name, r in self.results.items() if r["status"] != "ok"]
+            logger.warning("warm-up not ready, retrying %s in %.1fs", failed, delay)
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, settings.WARMUP_RETRY_MAX_DELAY)
+
+    def start(self) -> None:
+        """
+        在后台线程中执行预热。已就绪（多 worker 模式下主进程已预加载）时直接返回；
+        主进程预加载有阶段失败时，由各 worker 在这里继续重试
+        """
+        if self.ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台重试"""
+        self._stop.set()
+
+    def mark_skipped(self) -> None:
+        for name in self.results:
+            self.results[name] = {"status": "ok", "detail": "skipped", "duration_ms": 0.0}
+        self.started_at = self.finished_at = datetime.now()
+        self.total_ms = 0.0
+
+    def report(self) -> dict:
+        if self.ready:
+            status = "ready"
+        elif self.finished:
+            # 有阶段失败，后台线程正在退避重试
+            status = "retrying"
+        else:
+            status = "warming_up"
+        return {
+            "status": status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total_ms": self.total_ms,
+            "passes": self.passes,
+            "phases": self.results,
+        }
+
+
+warmup_state = WarmupState(WARMUP_PHASES)
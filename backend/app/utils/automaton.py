@@ -0,0 +1,114 @@
+"""
+Aho-Corasick 多模式匹配自动机
+
+自动机以扁平的 int32 数组表示，既可以由 ``build_automaton`` 在内存中构建，
+也可以直接使用 mmap 出来的 memoryview，匹配逻辑完全相同。
+
+数组说明 (n 为状态数):
+- trans_start[n + 1]: 状态 s 的转移位于 trans_char/trans_next[trans_start[s]:trans_start[s + 1]]
+- trans_char / trans_next: 按字符码点升序排列的转移
+- fail[n]: 失败指针
+- out[n]: 在该状态结束的模式编号，没有则为 -1
+- dict_link[n]: 沿失败链最近的一个 out != -1 的状态，没有则为 -1
+"""
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+AUTOMATON_ARRAYS = ("trans_start", "trans_char", "trans_next", "fail", "out", "dict_link")
+
+
+def build_automaton(patterns: Sequence[str]) -> Dict[str, array]:
+    """为模式列表构建自动机，模式编号即其在列表中的下标，空模式会被忽略"""
+    goto: List[Dict[int, int]] = [{}]
+    out = [-1]
+    for pattern_id, pattern in enumerate(patterns):
+        if not pattern:
+            continue
+        state = 0
+        for ch in pattern:
+            code = ord(ch)
+            nxt = goto[state].get(code)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][code] = nxt
+                goto.append({})
+                out.append(-1)
+            state = nxt
+        if out[state] == -1:
+            out[state] = pattern_id
+
+    n_states = len(goto)
+    fail = [0] * n_states
+    dict_link = [-1] * n_states
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for code, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and code not in goto[f]:
+                f = fail[f]
+            target = goto[f].get(code, 0)
+            fail[nxt] = target if target != nxt else 0
+            dict_link[nxt] = fail[nxt] if out[fail[nxt]] != -1 else dict_link[fail[nxt]]
+
+    trans_start = array("i", [0])
+    trans_char = array("i")
+    trans_next = array("i")
+    for edges in goto:
+        for code in sorted(edges):
+            trans_char.append(code)
+            trans_next.append(edges[code])
+        trans_start.append(len(trans_char))
+
+    return {
+        "trans_start": trans_start,
+        "trans_char": trans_char,
+        "trans_next": trans_next,
+        "fail": array("i", fail),
+        "out": array("i", out),
+        "dict_link": array("i", dict_link),
+    }
+
+
+class AutomatonMatcher:
+    """基于扁平数组的自动机匹配器"""
+
+    __slots__ = AUTOMATON_ARRAYS
+
+    def __init__(self, arrays: Dict[str, Sequence[int]]):
+        for name in AUTOMATON_ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def _step(self, state: int, code: int) -> int:
+        trans_start, trans_char = self.trans_start, self.trans_char
+        while True:
+            lo, hi = trans_start[state], trans_start[state + 1]
+            if lo < hi:
+                i = bisect_left(trans_char, code, lo, hi)
+                if i < hi and trans_char[i] == code:
+                    return self.trans_next[i]
+            if state == 0:
+                return 0
+            state = self.fail[state]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """依次产出 (pattern_id, end)，end 为匹配结束位置（不含）"""
+        out, dict_link = self.out, self.dict_link
+        state = 0
+        for i, ch in enumerate(text):
+            state = self._step(state, ord(ch))
+            s = state if out[state] != -1 else dict_link[state]
+            while s != -1:
+                yield out[s], i + 1
+                s = dict_link[s]
+
+    def first_matches(self, text: str, pattern_lengths: Sequence[int]) -> Dict[int, int]:
+        """返回每个命中模式首次出现的起始位置 {pattern_id: start}"""
+        found: Dict[int, int] = {}
+        for pattern_id, end in self.iter_matches(text):
+            if pattern_id not in found:
+                found[pattern_id] = end - pattern_lengths[pattern_id]
+        return found
@@ -0,0 +1,80 @@
+"""
+内存占用估算
+
+deep_sizeof 递归累加容器及其元素的 sys.getsizeof，同一对象只计一次；
+array / bytearray / numpy 数组按缓冲区大小计算，mmap 和 memoryview 只计对象头（数据在文件页缓存中，见 mapped_bytes）。
+结果是 CPython 对象的近似大小，用于比较各结构的量级和估算容器内存，不等于进程 RSS。
+"""
+import gc
+import os
+import resource
+import sys
+from typing import Any, Dict, Optional, Set
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """对象及其引用的全部对象的大小（字节）；传入同一个 seen 可在多个结构间去重"""
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, (str, bytes, bytearray, int, float, bool, memoryview, type(None))):
+            continue
+        if np is not None and isinstance(current, np.ndarray):
+            # getsizeof 只在数组拥有缓冲区时包含数据，视图按引用的基数组计算
+            if current.base is not None:
+                stack.append(current.base)
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") or hasattr(type(current), "__slots__"):
+            if hasattr(current, "__dict__"):
+                stack.append(current.__dict__)
+            for cls in type(current).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(current, name):
+                        stack.append(getattr(current, name))
+    return total
+
+
+def attribute_sizes(obj: Any, exclude: tuple = ("_lock",)) -> Dict[str, int]:
+    """对象各属性的 deep_sizeof，属性间共享的对象计入先出现的属性"""
+    seen: Set[int] = set()
+    names = list(vars(obj)) if hasattr(obj, "__dict__") else list(getattr(type(obj), "__slots__", ()))
+    return {
+        name: deep_sizeof(getattr(obj, name), seen)
+        for name in names
+        if name not in exclude and hasattr(obj, name)
+    }
+
+
+def process_memory() -> dict:
+    """进程级内存: 当前 RSS、峰值 RSS 和 GC 统计"""
+    report = {
+        "pid": os.getpid(),
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "gc_counts": gc.get_count(),
+        "gc_frozen_objects": gc.get_freeze_count(),
+    }
+    try:
+        with open("/proc/self/statm") as f:
+            size, resident, shared = (int(v) for v in f.read().split()[:3])
+        page = os.sysconf("SC_PAGE_SIZE")
+        report.update({"vms_bytes": size * page, "rss_bytes": resident * page, "shared_bytes": shared * page})
+    except OSError:
+        pass
+    return report
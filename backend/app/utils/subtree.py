@@ -0,0 +1,59 @@
+"""
+邻接表子树的批量操作辅助
+
+标签 (labels.parent_label_code) 和实体 (items.parent_item_code) 都以邻接表存储父子关系。
+子树用一条递归 CTE 取出并按深度排序；随后的批量语句按块执行（每块一条 IN 语句），
+父节点总是先于子节点处理，满足逐行检查外键的数据库（如 InnoDB），也不会超出 SQLite 的参数个数限制。
+"""
+from typing import Iterator, List, Sequence
+
+from sqlalchemy import literal, select
+from sqlalchemy.orm import Session
+
+CHUNK_SIZE = 500
+
+# 递归深度上限，防止数据中存在环时无限递归
+MAX_DEPTH = 1000
+
+
+class SubtreeDepthError(ValueError):
+    """子树超过深度上限（或数据中存在环），不能只对截断的部分操作"""
+
+
+def subtree_codes(db: Session, code_column, parent_column, root_code: str) -> List[str]:
+    """返回以 root_code 为根的子树（含根）的全部编码，按深度排序；超过 MAX_DEPTH 层时抛出 SubtreeDepthError"""
+    tree = (
+        select(code_column.label("code"), literal(0).label("depth"))
+        .where(code_column == root_code)
+        .cte("subtree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(code_column, tree.c.depth + 1)
+        .where(parent_column == tree.c.code, tree.c.depth <= MAX_DEPTH)
+    )
+    # 多递归一层: 出现第 MAX_DEPTH + 1 层说明子树被截断
+    rows = db.execute(select(tree.c.code, tree.c.depth).order_by(tree.c.depth)).all()
+    if rows and rows[-1].depth > MAX_DEPTH:
+        raise SubtreeDepthError(f"Subtree of {root_code} is deeper than {MAX_DEPTH} levels or contains a cycle.")
+    return list(dict.fromkeys(code for code, _ in rows))
+
+
+def chunks(values: Sequence, size: int = CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def parent_first(pairs: Sequence) -> List[str]:
+    """把 (编码, 父编码) 排成父节点在前的顺序（只考虑集合内部的父子关系）"""
+    parents = dict(pairs)
+    depth = {}
+    for code in parents:
+        path = []
+        node = code
+        while node in parents and node not in depth and node not in path:
+            path.append(node)
+            node = parents[node]
+        base = depth.get(node, -1) if node in parents else -1
+        for offset, step in enumerate(reversed(path), 1):
+            depth[step] = base + offset
+    return sorted(parents, key=depth.__getitem__)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+列表接口序列化基准测试
+
+在临时 SQLite 数据库中生成一个包含大量实体的标签，分别以默认路径和快速路径
+(FAST_RESPONSE_ENABLED) 请求 /items/by_label、/intent-rules/by_label 和 /labels/by_system，
+对比耗时与响应体大小。
+
+用法: python backend/benchmark_serialization.py --items 20000 --rounds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix="label-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmp_dir) / 'bench.db'}"
+os.environ["RECOGNITION_BUNDLE_DIR"] = str(Path(_tmp_dir) / "bundles")
+
+from fastapi.testclient import TestClient
+
+from backend.app.core.config import settings
+from backend.app.core.database import Base, SessionLocal, engine
+from backend.app.core.fast_json import orjson
+from backend.app.main import app
+from backend.app.models import IntentRule, Item, ItemSynonym, Label, TagSystem
+
+
+def seed(n_items: int, n_rules: int, n_labels: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(TagSystem(system_name="基准体系", system_code="bench_system", system_type="entity"))
+        db.add(Label(label_name="基准标签", label_code="bench_label", system_code="bench_system", level=1))
+        db.add_all([
+            Label(label_name=f"子标签{i}", label_code=f"bench_label_{i}", parent_label_code="bench_label",
+                  system_code="bench_system", level=2)
+            for i in range(n_labels)
+        ])
+        db.add_all([
+            Item(item_name=f"SV{i:06d}", item_code=f"bench_item_{i}", label_code="bench_label",
+                 parent_item_code=f"bench_item_{i // 10}" if i >= 10 else None,
+                 description=f"基准实体 {i}")
+            for i in range(n_items)
+        ])
+        db.add_all([
+            ItemSynonym(item_code=f"bench_item_{i}", synonym=f"sv{i:06d}")
+            for i in range(n_items)
+        ])
+        db.add_all([
+            IntentRule(rule_code=f"bench_rule_{i}", rule_type="keyword", rule_entity=f"关键词{i},kw{i}",
+                       label_code="bench_label")
+            for i in range(n_rules)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(client: TestClient, url: str, fast: bool, rounds: int):
+    settings.FAST_RESPONSE_ENABLED = fast
+    timings = []
+    size = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+        size = len(response.content)
+    return statistics.median(timings), min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表接口序列化基准测试")
+    parser.add_argument("--items", type=int, default=20000, help="标签下的实体数量")
+    parser.add_argument("--rules", type=int, default=5000, help="标签下的规则数量")
+    parser.add_argument("--labels", type=int, default=2000, help="体系中的标签数量")
+    parser.add_argument("--rounds", type=int, default=5, help="每个接口请求次数")
+    args = parser.parse_args()
+
+    print(f"📦 生成数据: {args.items} 实体, {args.rules} 规则, {args.labels} 标签 ...")
+    seed(args.items, args.rules, args.labels)
+    print(f"🔧 JSON 编码器: {'orjson' if orjson is not None else 'json (未安装 orjson)'}")
+
+    client = TestClient(app)
+    urls = [
+        "/api/v1/items/by_label/bench_label",
+        "/api/v1/intent-rules/by_label/bench_label",
+        "/api/v1/labels/by_system/bench_system",
+    ]
+    print(f"{'接口':<45}{'默认路径(ms)':>14}{'快速路径(ms)':>14}{'加速比':>8}{'响应大小':>12}")
+    for url in urls:
+        default_median, _, size = measure(client, url, False, args.rounds)
+        fast_median, _, _ = measure(client, url, True, args.rounds)
+        print(f"{url:<45}{default_median:>14.1f}{fast_median:>14.1f}{default_median / fast_median:>8.1f}x{size:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+识别数据包编译脚本
+
+从数据库读取当前规则/实体快照并编译为二进制数据包。
+不指定 --output 时写入 RECOGNITION_BUNDLE_DIR，文件名带当前数据版本，
+各 worker（使用 redis 缓存后端时）可直接 mmap 该文件而无需各自编译。
+
+--publish 时把当前草稿发布为新的识别快照（RECOGNITION_PUBLISH_MODE=manual 时识别只使用已发布的快照）。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.app.core.database import SessionLocal
+from backend.app.services.recognition_bundle import (
+    RecognitionBundle, bundle_manager, compile_bundle, current_data_version
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编译意图识别数据包")
+    parser.add_argument("--output", help="输出文件路径 (默认写入 RECOGNITION_BUNDLE_DIR)")
+    parser.add_argument("--publish", action="store_true", help="发布为新的识别快照")
+    parser.add_argument("--note", help="发布说明 (与 --publish 一起使用)")
+    args = parser.parse_args()
+
+    if args.publish:
+        return publish(args.note)
+
+    db = SessionLocal()
+    try:
+        version = current_data_version(db)
+        output = Path(args.output) if args.output else bundle_manager.bundle_path(version)
+        print(f"🔧 正在编译识别数据包 (版本 {version})...")
+        started = time.perf_counter()
+        compile_bundle(db, output, version)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    bundle = RecognitionBundle.open(output)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    print(f"✅ 编译完成: {output}")
+    print(f"   大小: {output.stat().st_size} 字节, 编译耗时: {elapsed:.2f}s, 加载耗时: {load_ms:.2f}ms")
+    for name, count in bundle.meta["counts"].items():
+        print(f"   - {name}: {count}")
+    return 0
+
+
+def publish(note):
+    print("🚀 正在发布识别快照...")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        snapshot = bundle_manager.publish(db, note)
+        elapsed = time.perf_counter() - started
+        print(f"✅ 发布完成: 快照 {snapshot.version} ({snapshot.file_path}), 耗时 {elapsed:.2f}s")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
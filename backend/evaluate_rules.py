@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+候选规则变更评估脚本
+
+在标注语料 (JSONL: {"text", "label_code"}) 上对比当前规则与候选变更集的识别效果，
+输出各标签精确率/召回率/F1、混淆矩阵以及意图发生变化的语句。候选变更不会写入数据库。
+
+用法:
+    python backend/evaluate_rules.py --corpus corpus.jsonl --changes changes.json --output report.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.app.core.database import SessionLocal
+from backend.app.services.rule_evaluation import evaluate_change_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在标注语料上评估候选规则/实体变更")
+    parser.add_argument("--corpus", required=True, help="标注语料 JSONL 文件")
+    parser.add_argument("--changes", help="候选变更集 JSON 文件 (不指定时只评估当前规则)")
+    parser.add_argument("--workers", type=int, help="进程数 (默认 CPU 核数)")
+    parser.add_argument("--output", help="把完整报告写入 JSON 文件")
+    parser.add_argument("--changed-output", help="把意图变化的语句写入 JSONL 文件")
+    args = parser.parse_args()
+
+    changes = json.loads(Path(args.changes).read_text(encoding="utf-8")) if args.changes else {}
+
+    print(f"🧪 正在评估: {args.corpus}")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        report = evaluate_change_set(db, Path(args.corpus), changes, workers=args.workers)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    total = report["total"]
+    print(f"✅ 评估完成: {total} 条语料, 耗时 {elapsed:.1f}s ({total / elapsed:.0f} 条/秒)" if elapsed else "")
+    print(f"   准确率: {report['current']['accuracy']} -> {report['candidate']['accuracy']}")
+    print(f"   意图变化: {report['intent_changed']} 条, 实体变化: {report['entities_changed']} 条")
+    print(f"\n{'标签':<28}{'支持数':>8}{'当前F1':>10}{'候选F1':>10}")
+    labels = sorted(set(report["current"]["labels"]) | set(report["candidate"]["labels"]))
+    for label in labels:
+        current = report["current"]["labels"].get(label, {})
+        candidate = report["candidate"]["labels"].get(label, {})
+        marker = " *" if label in report["f1_delta"] else ""
+        print(f"{label:<28}{current.get('support', candidate.get('support', 0)):>8}"
+              f"{current.get('f1', 0.0):>10}{candidate.get('f1', 0.0):>10}{marker}")
+
+    if args.changed_output:
+        with open(args.changed_output, "w", encoding="utf-8") as f:
+            for record in report["changed"]:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"\n📄 意图变化的语句已写入: {args.changed_output}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"📄 报告已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,8 +10,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from backend.app.core.database import engine, Base
 from backend.app.models import (
-    TagSystem, Label, Item, ItemSynonym, IntentRule
+    TagSystem, Label, Item, ItemSynonym, IntentRule, RecognitionStat, RecognitionSnapshot, ChangeLogEntry, ChangeSequence
 )
+from backend.app.services.recognition_bundle import bundle_manager
 from sqlalchemy.orm import sessionmaker
 
 def init_database():
@@ -23,6 +24,9 @@ def init_database():
     print("✨  正在创建新表...")
     Base.metadata.create_all(bind=engine)
     print("✅  数据库表创建成功")
+    removed = bundle_manager.discard_all()
+    if removed:
+        print(f"🧹  已删除 {removed} 个旧的识别数据包文件")
     
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
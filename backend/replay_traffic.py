@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+识别流量回放脚本
+
+读取识别请求日志 (RECOGNITION_LOG_DIR 下的 recognition-*.jsonl，或指定文件)，用当前规则和实体数据重新识别，
+输出耗时分位数、吞吐量，以及意图、置信度、实体与记录响应不一致的请求。
+
+用法:
+    python backend/replay_traffic.py logs/recognition --rate 200 --diff-output diff.jsonl
+    python backend/replay_traffic.py logs/recognition/recognition-20260101-12345-001.jsonl --concurrency 4 --output report.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.app.services.traffic_replay import CONFIDENCE_TOLERANCE, TrafficReplayer, log_files, read_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放识别请求日志，对比性能和识别结果")
+    parser.add_argument("paths", nargs="+", help="日志文件或目录 (目录下的 recognition-*.jsonl)")
+    parser.add_argument("--rate", type=float, default=0, help="回放速率 条/秒 (默认 0: 全速)")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发线程数 (默认 1)")
+    parser.add_argument("--limit", type=int, help="最多回放的请求数")
+    parser.add_argument("--tolerance", type=float, default=CONFIDENCE_TOLERANCE, help="置信度差异容忍度")
+    parser.add_argument("--diff-output", help="把有差异的请求写入 JSONL 文件")
+    parser.add_argument("--output", help="把汇总报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    files = log_files([Path(p) for p in args.paths])
+    if not files:
+        print("❌ 没有找到日志文件")
+        return 1
+    mode = f"{args.rate:g} 条/秒" if args.rate > 0 else "全速"
+    print(f"🔁 正在回放 {len(files)} 个日志文件 ({mode}, 并发 {args.concurrency})")
+
+    diff_file = open(args.diff_output, "w", encoding="utf-8") if args.diff_output else None
+
+    def on_diff(record):
+        if diff_file is not None:
+            diff_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def on_progress(total):
+        if total % 10000 == 0:
+            print(f"   已回放 {total} 条")
+
+    replayer = TrafficReplayer(concurrency=args.concurrency, rate=args.rate, tolerance=args.tolerance)
+    try:
+        report = replayer.run(read_log(files, args.limit), on_diff=on_diff, on_progress=on_progress)
+    finally:
+        if diff_file is not None:
+            diff_file.close()
+
+    print(f"✅ 回放完成: {report['total']} 条, 耗时 {report['elapsed_seconds']}s, "
+          f"吞吐 {report['throughput_per_second']} 条/秒, 错误 {report['errors']} 条")
+    print(f"\n{'耗时(ms)':<12}" + "".join(f"{name:>10}" for name in ("p50", "p90", "p95", "p99", "p99.9", "max")))
+    for name, label in (("service", "识别"), ("response", "响应"), ("recorded", "记录")):
+        values = report["latency_ms"][name]
+        if values:
+            print(f"{label:<12}" + "".join(f"{values[k]:>10}" for k in ("p50", "p90", "p95", "p99", "p99.9", "max")))
+
+    diff = report["diff"]
+    print(f"\n   完全一致: {diff['identical']} 条")
+    print(f"   意图变化: {diff['intent_changed']} 条, 置信度变化: {diff['confidence_changed']} 条, "
+          f"实体变化: {diff['entities_changed']} 条")
+    for transition in diff["intent_transitions"][:10]:
+        print(f"     {transition['recorded']} -> {transition['replayed']}: {transition['count']}")
+
+    if args.diff_output:
+        print(f"\n📄 差异已写入: {args.diff_output}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"📄 报告已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+测试公共夹具: 使用临时 SQLite 数据库和临时数据包目录，每个用例重建表、清空缓存和数据包
+"""
+import os
+import tempfile
+from pathlib import Path
+
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="label_system_tests_"))
+
+# 必须在导入应用模块之前设置
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR / 'test.db'}"
+os.environ["RECOGNITION_BUNDLE_DIR"] = str(_TMP_DIR / "bundles")
+os.environ["RECOGNITION_LOG_BACKEND"] = "none"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["WARMUP_ON_STARTUP"] = "false"
+
+import pytest
+
+from backend.app.core.cache import cache
+from backend.app.core.database import Base, SessionLocal, engine
+from backend.app.models import Item, Label, TagSystem
+from backend.app.services.recognition_bundle import bundle_manager
+
+# main.py 以相对路径挂载 web 目录
+os.chdir(Path(__file__).resolve().parents[2])
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    cache.clear()
+    bundle_manager.discard_all()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+
+    # 不进入 lifespan，不启动预热和后台任务
+    return TestClient(app)
+
+
+@pytest.fixture
+def entity_system(db):
+    """一个实体体系: 产品(product) -> 伺服(servo)，伺服下有 SV660 系列及两个型号"""
+    db.add(TagSystem(system_name="产品实体体系", system_code="product", system_type="entity"))
+    db.add_all([
+        Label(label_name="产品", label_code="product_root", system_code="product", level=1),
+        Label(label_name="伺服", label_code="servo", parent_label_code="product_root", system_code="product", level=2),
+        Label(label_name="变频器", label_code="inverter", parent_label_code="product_root", system_code="product", level=2),
+    ])
+    db.flush()
+    db.add_all([
+        Item(item_name="SV660系列", item_code="sv660", label_code="servo"),
+        Item(item_name="SV660A", item_code="sv660a", parent_item_code="sv660", label_code="servo"),
+        Item(item_name="SV660N", item_code="sv660n", parent_item_code="sv660", label_code="servo"),
+    ])
+    db.commit()
+    return "product"
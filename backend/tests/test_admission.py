@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from backend.app.core.admission import AdmissionControlMiddleware, AdmissionGate, classify
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/api/v1/intent-recognition/", "recognition"),
+    ("/api/v1/items/autocomplete", "interactive"),
+    ("/api/v1/search/", "interactive"),
+    ("/api/v1/items/sv660/subtree", "admin"),
+    ("/api/v1/systems/product/clone", "admin"),
+    ("/api/v1/changes/stream", None),
+    ("/health", None),
+])
+def test_classify(path, expected):
+    assert classify(path) == expected
+
+
+class _Controller:
+    def __init__(self, **gates):
+        self.gates = gates
+
+
+def test_queue_full_and_timeout_return_503():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    gate = AdmissionGate("interactive", limit=1, queue_size=1, queue_timeout=0.05)
+    middleware = AdmissionControlMiddleware(app, _Controller(interactive=gate, admin=AdmissionGate("admin", 1, 1, 1)))
+
+    async def request(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware({"type": "http", "path": path}, None, send)
+        start = messages[0]
+        return start["status"], dict(start["headers"])
+
+    async def scenario():
+        holding = asyncio.create_task(request("/api/v1/items/autocomplete"))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(request("/api/v1/items/autocomplete"))
+        await asyncio.sleep(0)
+        full = await request("/api/v1/search/")
+        timed_out = await queued
+        # 管理类请求不受补全类闸门影响
+        admin = asyncio.create_task(request("/api/v1/items/sv660/subtree"))
+        release.set()
+        return full, timed_out, await holding, await admin
+
+    full, timed_out, held, admin = asyncio.run(scenario())
+    assert full[0] == 503 and full[1][b"retry-after"] == b"1"
+    assert timed_out[0] == 503
+    assert held[0] == 200 and admin[0] == 200
+    assert (gate.rejected_queue_full, gate.rejected_timeout, gate.active) == (1, 1, 0)
@@ -0,0 +1,26 @@
+from backend.app.services import autocomplete_index as autocomplete_module
+from backend.app.services.intent_recognition_service import IntentRecognitionService
+from backend.app.services.recognition_stats import recognition_stats
+
+
+def test_popularity_counts_only_live_recognition(client, db, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+    popularity = autocomplete_module.popularity
+    before = popularity.get("sv660a", 0)
+
+    response = client.post("/api/v1/intent-recognition/", json={"text": "伺服 SV660A 报警"})
+    assert response.status_code == 200
+    # 离线识别（评估、回放）不计入
+    IntentRecognitionService(db).recognize("伺服 SV660A 报警")
+    assert popularity.get("sv660a", 0) == before
+
+    recognition_stats.flush()
+    assert popularity["sv660a"] == before + 1
+
+
+def test_record_hits_updates_sealed_and_delta_entries(db, entity_system):
+    index = autocomplete_module.build_autocomplete_index(db)
+    index.put_item("sv660x", "SV660X", "servo", True, None, [])
+    index.record_hits({"sv660n": 2, "sv660x": 3})
+    assert [entry["text"] for entry in index.complete("sv660", limit=2)] == ["SV660X", "SV660N"]
@@ -0,0 +1,38 @@
+from backend.app.core.cache import Cache, MemoryCacheBackend
+
+
+def test_counters_survive_lru_eviction():
+    cache = Cache(MemoryCacheBackend(max_entries=3), prefix="t")
+    version = cache.version("labels")
+    for i in range(10):
+        cache.get_or_load("labels", f"k{i}", lambda: i)
+    assert cache.version("labels") == version
+    cache.invalidate("labels")
+    assert cache.version("labels") == version + 1
+
+
+def test_add_respects_max_entries():
+    backend = MemoryCacheBackend(max_entries=2)
+    for i in range(5):
+        assert backend.add(f"k{i}", i)
+    assert backend.memory_usage()["entries"] == 2
+
+
+def test_get_or_load_invalidation():
+    cache = Cache(MemoryCacheBackend(), prefix="t")
+    assert cache.get_or_load("labels", "tree", lambda: "old") == "old"
+    assert cache.get_or_load("labels", "tree", lambda: "new") == "old"
+    cache.invalidate("labels")
+    assert cache.get_or_load("labels", "tree", lambda: "new") == "new"
+
+
+def test_clear_keeps_versions_and_other_prefixes():
+    backend = MemoryCacheBackend()
+    cache = Cache(backend, prefix="t")
+    backend.set("other:key", 1)
+    cache.get_or_load("labels", "tree", lambda: "old")
+    version = cache.version("labels")
+    cache.clear()
+    assert cache.version("labels") == version
+    assert backend.get("other:key") == 1
+    assert cache.get_or_load("labels", "tree", lambda: "new") == "new"
@@ -0,0 +1,89 @@
+import asyncio
+
+from backend.app.core.config import settings
+from backend.app.core.events import record_change
+from backend.app.services.change_log import ChangeNotifier, change_log
+from backend.app.services.item_service import ItemService
+
+
+def _changes(client, since=0, limit=None):
+    params = {"since": since}
+    if limit is not None:
+        params["limit"] = limit
+    response = client.get("/api/v1/changes/", params=params)
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def _ops(data):
+    return [(c["namespace"], c["key"], c["operation"]) for c in data["changes"]]
+
+
+def test_paging_with_since(client, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+    assert client.put("/api/v1/intent-rules/r1", json={"rule_entity": "SV660"}).status_code == 200
+    assert client.delete("/api/v1/intent-rules/r1").status_code == 204
+
+    first = _changes(client, since=0, limit=2)
+    assert [c["seq"] for c in first["changes"]] == [1, 2]
+    assert first["has_more"] and first["next_since"] == 2 and first["latest_seq"] == 3
+
+    rest = _changes(client, since=first["next_since"])
+    assert _ops(rest) == [("intent_rules", "r1", "delete")]
+    assert not rest["has_more"] and rest["next_since"] == 3
+
+    assert _changes(client, since=3)["changes"] == []
+    ahead = _changes(client, since=99)
+    assert ahead["reset_required"] and ahead["next_since"] == 3
+
+
+def test_subtree_delete_operations(client, entity_system):
+    assert client.delete("/api/v1/items/sv660/subtree").status_code == 200
+    soft = _changes(client)
+    assert {op for _, _, op in _ops(soft)} == {"upsert"}
+
+    assert client.delete("/api/v1/items/sv660/subtree", params={"hard": True}).status_code == 200
+    hard = _changes(client, since=soft["next_since"])
+    assert sorted(_ops(hard)) == [("items", code, "delete") for code in ("sv660", "sv660a", "sv660n")]
+
+
+def test_bulk_clone_recorded_as_bulk(client, entity_system):
+    response = client.post(f"/api/v1/systems/{entity_system}/clone", json={"system_code": "product_copy"})
+    assert response.status_code == 200
+    assert _ops(_changes(client)) == [
+        ("tag_systems", "product_copy", "upsert"),
+        ("labels", None, "bulk"),
+        ("items", None, "bulk"),
+        ("intent_rules", None, "bulk"),
+    ]
+
+
+def test_rollback_discards_change(db, entity_system):
+    ItemService(db).delete("sv660a")
+    latest = change_log.latest_seq(db)
+
+    item = ItemService(db).get_by_code("sv660n")
+    item.item_name = "SV660N-rolled-back"
+    record_change(db, "items", "sv660n")
+    db.rollback()
+
+    assert change_log.latest_seq(db) == latest
+    assert "pending_changes" not in db.info
+    assert [c["key"] for c in change_log.changes_since(db, 0, 10)["changes"]] == ["sv660a"]
+
+
+def test_stream_limit_is_enforced_atomically(client, monkeypatch):
+    notifier = ChangeNotifier()
+
+    async def connect_many():
+        return [notifier.subscribe(limit=3) for _ in range(5)]
+
+    events = asyncio.run(connect_many())
+    assert sum(event is not None for event in events) == 3 and notifier.subscribers == 3
+    notifier.unsubscribe(events[0])
+    assert notifier.subscribers == 2
+
+    monkeypatch.setattr(settings, "CHANGE_FEED_MAX_STREAMS", 0)
+    response = client.get("/api/v1/changes/stream")
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
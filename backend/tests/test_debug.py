@@ -0,0 +1,2 @@
+def test_debug_endpoints_disabled_by_default(client):
+    assert client.get("/debug/memory").status_code == 404
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from backend.app.services import document_recognition
+from backend.app.services.document_recognition import document_pool, split_windows
+
+URL = "/api/v1/intent-recognition/document"
+
+
+@pytest.fixture
+def inline_scan(monkeypatch):
+    """测试中不启动扫描进程池"""
+    monkeypatch.setattr(document_pool, "workers", 0)
+
+
+@pytest.fixture
+def servo_rule(client, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+
+
+def _lines(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_split_windows_cover_text_with_overlap():
+    text = "第一句话。" * 50
+    windows = split_windows(text, window_chars=40, overlap_chars=10)
+    assert windows[0][:2] == (0, 0) and windows[-1][2] == len(text)
+    for (_, _, prev_end), (start, own_start, end) in zip(windows, windows[1:]):
+        assert own_start == prev_end
+        assert own_start - 10 <= start < own_start
+        assert end - start <= 40
+
+
+def test_stream_segments_then_summary(client, servo_rule, inline_scan):
+    text = "".join(f"第{i}台伺服 SV660A 报警，请检查。" for i in range(20))
+    lines = _lines(client.post(URL, json={"text": text, "window_chars": 100, "overlap_chars": 30}))
+
+    segments, summary = lines[:-1], lines[-1]
+    assert {line["type"] for line in segments} == {"segment"} and summary["type"] == "summary"
+    assert summary["segments"] == len(segments) > 1
+    assert summary["intents"][0]["label_code"] == "servo"
+
+    positions = [(e["start_pos"], e["end_pos"]) for line in segments for e in line["entities"]]
+    # 实体位置为全文偏移；每个窗口报告该表面形式在自己范围内的首次出现，重叠区内的不重复报告
+    assert len(positions) == len(set(positions)) == summary["entity_count"] == len(segments)
+    assert all(text[start:end] == "SV660A" for start, end in positions)
+    for line in segments:
+        assert all(e["end_pos"] > line["own_start"] and e["start_pos"] >= line["start"] for e in line["entities"])
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"text": "   "}, 400),
+    ({"text": "伺服", "window_chars": 200, "overlap_chars": 200}, 400),
+    ({"text": "伺服", "window_chars": 10}, 422),
+    ({"text": "伺服", "mode": "line"}, 422),
+])
+def test_rejects_invalid_requests_before_streaming(client, entity_system, body, status):
+    assert client.post(URL, json=body).status_code == status
+
+
+def test_error_mid_stream_ends_with_error_line(client, servo_rule, inline_scan, monkeypatch):
+    scan_window = document_recognition.scan_window
+    calls = []
+
+    def failing_scan(bundle, start, own_start, text):
+        calls.append(start)
+        if len(calls) == 2:
+            raise RuntimeError("scan failed")
+        return scan_window(bundle, start, own_start, text)
+
+    monkeypatch.setattr(document_recognition, "scan_window", failing_scan)
+    text = "伺服报警，请检查。" * 40
+    lines = _lines(client.post(URL, json={"text": text, "window_chars": 100, "overlap_chars": 20}))
+    assert [line["type"] for line in lines] == ["segment", "error"]
+    assert lines[-1]["detail"] == "scan failed"
@@ -0,0 +1,54 @@
+from backend.app.models import Item, ItemSynonym
+from backend.app.services.recognition_bundle import (
+    RecognitionBundle, build_bundle_sections, get_recognition_bundle, write_bundle,
+)
+
+SERVO_LABEL_PATH = [
+    {"label_code": "product_root", "label_name": "产品"},
+    {"label_code": "servo", "label_name": "伺服"},
+]
+
+
+def _link(entity):
+    return {key: entity[key] for key in ("entity_value", "item_code", "item_name", "item_path", "label_path")}
+
+
+def test_recognition_links_entities_to_items(client, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+
+    data = client.post("/api/v1/intent-recognition/", json={"text": "伺服 SV660A 和 SV660系列"}).json()["data"]
+    assert [_link(e) for e in data["extracted_entities"]] == [
+        {"entity_value": "SV660系列", "item_code": "sv660", "item_name": "SV660系列",
+         "item_path": [], "label_path": SERVO_LABEL_PATH},
+        {"entity_value": "SV660A", "item_code": "sv660a", "item_name": "SV660A",
+         "item_path": [{"item_code": "sv660", "item_name": "SV660系列"}], "label_path": SERVO_LABEL_PATH},
+    ]
+
+
+def test_synonym_links_to_its_item(db, entity_system):
+    db.add(ItemSynonym(item_code="sv660n", synonym="660N总线型"))
+    db.commit()
+
+    entities = get_recognition_bundle(db).extract_entities("请问 660N总线型 的参数")
+    assert [(e["entity_value"], e["item_code"], e["item_name"]) for e in entities] == [
+        ("660N总线型", "sv660n", "SV660N"),
+    ]
+    assert entities[0]["item_path"] == [{"item_code": "sv660", "item_name": "SV660系列"}]
+
+
+def test_bundles_without_ancestor_sections_link_the_same(db, entity_system, tmp_path):
+    db.add(Item(item_name="SV660A-1", item_code="sv660a1", parent_item_code="sv660a", label_code="servo"))
+    db.commit()
+    sections = build_bundle_sections(db, "v1")
+    current = RecognitionBundle(write_bundle(sections, tmp_path / "current.bin").read_bytes())
+
+    # 早期编译的数据包没有祖先数组和实体标签序号
+    for name in ("item_anc_start", "item_anc", "label_anc_start", "label_anc", "item_label_idx"):
+        del sections[name]
+    legacy = RecognitionBundle(write_bundle(sections, tmp_path / "legacy.bin").read_bytes())
+
+    text = "SV660A-1 SV660N"
+    assert legacy.extract_entities(text) == current.extract_entities(text)
+    deepest = next(e for e in current.extract_entities(text) if e["item_code"] == "sv660a1")
+    assert [i["item_code"] for i in deepest["item_path"]] == ["sv660", "sv660a"]
@@ -0,0 +1,45 @@
+import pytest
+
+from backend.app.core.cache import cache
+from backend.app.core.database import SessionLocal
+from backend.app.services.change_log import change_log
+
+
+@pytest.fixture
+def shared_versions(monkeypatch):
+    """把进程内缓存当作共享版本源（单进程测试中与 Redis 等价）"""
+    monkeypatch.setattr(cache.backend, "shared", True)
+
+
+def test_not_modified_until_write(client, entity_system, shared_versions):
+    first = client.get("/api/v1/systems/")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/v1/systems/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    assert client.put(f"/api/v1/systems/{entity_system}", json={"description": "changed"}).status_code == 200
+    changed = client.get("/api/v1/systems/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["description"] == "changed"
+
+
+def test_process_local_versions_follow_change_sequence(client, entity_system):
+    assert not cache.backend.shared
+    first = client.get("/api/v1/systems/")
+    etag = first.headers["ETag"]
+    assert client.get("/api/v1/systems/", headers={"If-None-Match": etag}).status_code == 304
+
+    # 其他 worker 的写入: 提交了变更序号，但没有使本进程的缓存版本号失效
+    other = SessionLocal()
+    try:
+        change_log.record(other, "tag_systems", [entity_system])
+        other.commit()
+    finally:
+        other.close()
+    changed = client.get("/api/v1/systems/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
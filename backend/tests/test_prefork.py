@@ -0,0 +1,36 @@
+from backend.app.core import prefork
+from backend.app.core.config import settings
+from backend.app.core.prefork import PreforkServer
+
+
+def _server(workers=2):
+    return PreforkServer("backend.app.main:app", workers=workers)
+
+
+def test_refuses_memory_backends_with_workers(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "SESSION_CONTEXT_BACKEND", "redis")
+    assert "CACHE_BACKEND=memory" in _server()._check_shared_state()
+    assert _server().run() == 1
+    assert _server(workers=1)._check_shared_state() is None
+
+
+def test_crash_backoff_and_limit(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_CRASH_LIMIT", 3)
+    monkeypatch.setattr(settings, "WORKER_RESPAWN_MAX_DELAY", 3.0)
+    monkeypatch.setattr(prefork.time, "monotonic", lambda: 100.0)
+    server = _server()
+
+    delays = []
+    for _ in range(3):
+        server._record_crash(0, uptime=1.0)
+        delays.append(server._respawn_at[0] - 100.0)
+    assert delays == [1, 2, 3]
+    assert not server._stopping
+
+    server._record_crash(0, uptime=prefork.HEALTHY_UPTIME)
+    assert server._crashes[0] == 1
+
+    for _ in range(3):
+        server._record_crash(0, uptime=1.0)
+    assert server._stopping and server._exit_code == 1
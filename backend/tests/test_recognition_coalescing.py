@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from backend.app.services.recognition_coalescing import SingleFlight, coalescing_key
+
+
+def _run_concurrently(flight, key, fn, n):
+    """n 个线程同时以相同的键调用 flight.do，返回各自的 (结果, 是否复用) 或异常"""
+    outcomes = [None] * n
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, outcomes
+
+
+def _wait_followers(flight, n):
+    """等待 n 个 follower 进入等待"""
+    for _ in range(500):
+        if flight.stats()["coalesced"] >= n:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("followers did not arrive")
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight(wait_timeout=5.0)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    threads, outcomes = _run_concurrently(flight, ("伺服", "", 1), fn, 4)
+    _wait_followers(flight, 3)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True]
+    assert all(result == "result" for result, _ in outcomes)
+    stats = flight.stats()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 3 and stats["max_followers"] == 3
+    assert stats["in_flight"] == 0 and stats["coalesced_ratio"] == 0.75
+
+
+def test_leader_error_is_shared_with_followers():
+    flight = SingleFlight(wait_timeout=5.0)
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    threads, outcomes = _run_concurrently(flight, "k", fn, 3)
+    _wait_followers(flight, 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert flight.stats()["shared_errors"] == 2
+    # 键在 leader 结束后失效，下一次调用重新执行
+    assert flight.do("k", lambda: "again") == ("again", False)
+
+
+def test_follower_runs_itself_after_wait_timeout():
+    flight = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("k", lambda: release.wait(5)))
+    leader.start()
+    while flight.stats()["in_flight"] == 0:
+        threading.Event().wait(0.01)
+
+    assert flight.do("k", lambda: "own") == ("own", False)
+    release.set()
+    leader.join()
+    stats = flight.stats()
+    assert stats["wait_timeouts"] == 1 and stats["coalesced"] == 0
+
+
+@pytest.mark.parametrize("flight, key", [(SingleFlight(5.0, enabled=False), "k"), (SingleFlight(5.0), None)])
+def test_disabled_or_unkeyed_calls_run_directly(flight, key):
+    assert flight.do(key, lambda: 1) == (1, False)
+    assert flight.stats()["leaders"] == 0
+
+
+def test_coalescing_key():
+    assert coalescing_key("伺服", None, 3) == coalescing_key("伺服", {}, 3)
+    assert coalescing_key("伺服", {"b": 1, "a": 2}, 3) == coalescing_key("伺服", {"a": 2, "b": 1}, 3)
+    assert coalescing_key("伺服", None, 3) != coalescing_key("伺服", None, 4)
+    # 多轮会话的结果依赖上一轮，不合并
+    assert coalescing_key("伺服", {"session_id": "s1"}, 3) is None
+
+
+def test_batch_reuses_duplicate_texts(client, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+
+    resp = client.post("/api/v1/intent-recognition/batch", json={"texts": ["伺服报警", "变频器", "伺服报警"]})
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["coalesced"] == 1
+    first, other, repeated = data["results"]
+    assert repeated == first and first["matched_rules"] and not other["matched_rules"]
+
+    # 同一会话内的每条文本都是一轮，不复用
+    resp = client.post("/api/v1/intent-recognition/batch",
+                       json={"texts": ["伺服报警", "伺服报警"], "context": {"session_id": "batch-s1"}})
+    assert resp.json()["data"]["coalesced"] == 0
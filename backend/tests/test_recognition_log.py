@@ -0,0 +1,51 @@
+import json
+import threading
+
+import pytest
+
+from backend.app.core.config import settings
+from backend.app.services import recognition_log as log_module
+from backend.app.services.recognition_log import JsonlLogWriter, RecognitionLog
+from backend.app.services.traffic_replay import log_files
+
+
+def _record(i):
+    return {"id": str(i), "timestamp": "t", "text": f"text {i}", "context": None, "response": {}, "latency_ms": 1.0}
+
+
+def test_jsonl_files_are_per_process(tmp_path, monkeypatch):
+    writer = JsonlLogWriter(tmp_path, max_bytes=1 << 20)
+    monkeypatch.setattr(log_module.os, "getpid", lambda: 100)
+    writer.write([_record(1)])
+    # fork 之后的 worker 换用自己的文件
+    monkeypatch.setattr(log_module.os, "getpid", lambda: 200)
+    writer.write([_record(2)])
+    writer.close()
+
+    files = log_files([tmp_path])
+    assert [p.name.split("-")[2] for p in files] == ["100", "200"]
+    assert [json.loads(p.read_text(encoding="utf-8"))["id"] for p in files] == ["1", "2"]
+
+
+def test_counters_are_consistent_across_threads():
+    log = RecognitionLog(writer=object(), queue_size=10, batch_size=10, flush_interval=0.1)
+    threads = [threading.Thread(target=lambda: [log.submit("t", None, {}, 1.0) for _ in range(1000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = log.stats()
+    assert stats["submitted"] == 4000
+    assert stats["dropped"] == 4000 - stats["queue_depth"]
+
+
+def test_invalid_log_settings_are_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "RECOGNITION_LOG_BACKEND", "kafka")
+    with pytest.raises(ValueError, match="RECOGNITION_LOG_BACKEND"):
+        log_module.create_recognition_log()
+
+    monkeypatch.setattr(settings, "RECOGNITION_LOG_BACKEND", "none")
+    monkeypatch.setattr(settings, "RECOGNITION_LOG_POLICY", "retry")
+    with pytest.raises(ValueError, match="policy"):
+        log_module.create_recognition_log()
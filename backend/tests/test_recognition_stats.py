@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from backend.app.models import RecognitionStat
+from backend.app.services import recognition_stats as stats_module
+from backend.app.services.recognition_stats import RecognitionStats
+from backend.app.services.statistics_service import StatisticsService
+
+
+def _stats(**kwargs):
+    return RecognitionStats(bucket_seconds=300, flush_interval=10, max_unrecognized_texts=10, **kwargs)
+
+
+def test_flush_accumulates_into_one_row_per_key(db, monkeypatch):
+    monkeypatch.setattr(stats_module.time, "time", lambda: 3000.0)
+    stats = _stats()
+    for _ in range(3):
+        stats.record_recognition("servo", "伺服", 1.5)
+        stats.record_recognition(None, "你好", 3.0)
+        stats.flush()
+
+    keys = db.execute(
+        select(RecognitionStat.dimension, RecognitionStat.stat_key, func.count())
+        .group_by(RecognitionStat.dimension, RecognitionStat.stat_key)
+    ).all()
+    assert keys and all(count == 1 for _, _, count in keys)
+
+    report = StatisticsService(db).recognition_stats()
+    assert (report["total"], report["recognized"], report["unrecognized"]) == (6, 3, 3)
+    assert report["top_unrecognized"] == [{"text": "你好", "count": 3}]
+    assert len(report["timeline"]) == 1
+
+
+def test_flush_purges_expired_buckets(db):
+    db.add(RecognitionStat(bucket_start=datetime.now() - timedelta(days=10), dimension="label",
+                           stat_key="servo", hit_count=5))
+    db.commit()
+    stats = _stats(retention_days=7)
+    stats.record_recognition("servo", "伺服", 1.0)
+    stats.flush()
+    db.expire_all()
+    assert db.scalars(select(RecognitionStat.hit_count).where(RecognitionStat.dimension == "label")).all() == [1]
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.services import regex_rules
+from backend.app.services.regex_rules import RegexRuleSet, regex_stats, validate_regex
+
+
+def _rule(code, pattern, label_code="servo"):
+    return {"rule_code": code, "rule_type": "regex", "rule_entity": pattern, "label_code": label_code}
+
+
+@pytest.mark.parametrize("pattern", [r"E\d{2,3}", r"Er\.\d+", r"(?i:sv)660[an]", r"(?>a+)b", r"(ab|cd)+e"])
+def test_accepts_safe_patterns(pattern):
+    validate_regex(pattern)
+
+
+@pytest.mark.parametrize("pattern, message", [
+    ("", "empty"),
+    ("a" * 501, "exceeds"),
+    ("E(\\d", "Invalid regex"),
+    (r"(?P<code>E\d+)", "named groups"),
+    (r"(a)\1", "backreferences"),
+    (r"(a)?(?(1)b|c)", "conditional groups"),
+    (r"(a+)+b", "nested unbounded quantifiers"),
+    (r"(\w*)*x", "nested unbounded quantifiers"),
+    (r"(?i)sv660", "global inline flags"),
+    (r"\d*", "empty string"),
+])
+def test_rejects_unsafe_patterns(pattern, message):
+    with pytest.raises(ValueError, match=message):
+        validate_regex(pattern)
+
+
+def test_rule_api_validates_regex(client, entity_system):
+    resp = client.post("/api/v1/intent-rules/", json=_rule("r1", r"(a+)+b"))
+    assert resp.status_code == 400 and "nested unbounded" in resp.json()["detail"]
+
+    assert client.post("/api/v1/intent-rules/", json=_rule("r1", r"Er\.\d+")).status_code == 200
+    assert client.put("/api/v1/intent-rules/r1", json={"rule_entity": r"\d*"}).status_code == 400
+    # 改为非正则类型时不再按正则校验
+    assert client.put("/api/v1/intent-rules/r1", json={"rule_type": "keyword", "rule_entity": "(伺服"}).status_code == 200
+
+
+def test_recognizes_with_regex_rule(client, entity_system):
+    assert client.post("/api/v1/intent-rules/", json=_rule("r1", r"Er\.\d{3}")).status_code == 200
+    data = client.post("/api/v1/intent-recognition/", json={"text": "SV660A 报 er.201 怎么处理"}).json()["data"]
+    assert data["intent"] == "伺服"
+    assert [(r["rule_code"], r["matched_text"]) for r in data["matched_rules"]] == [("r1", "er.201")]
+
+
+def test_rule_set_groups_and_skips_invalid_rules():
+    before = regex_stats.stats()["invalid_rules"]
+    rules = [(0, "servo", r"E\d{3}"), (1, "servo", r"(a+)+"), (2, "servo", r"AL\d+"), (3, "inverter", r"Err\d+")]
+    rule_set = RegexRuleSet(rules, group_size=1)
+
+    assert len(rule_set) == 3 and len(rule_set.groups) == 3
+    assert regex_stats.stats()["invalid_rules"] == before + 1
+    assert rule_set.match("E201 AL5 Err9") == [(0, "E201"), (2, "AL5"), (3, "Err9")]
+    assert rule_set.match("nothing here") == []
+
+
+class StepClock:
+    """每次读取前进 step 秒"""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def perf_counter(self):
+        self.now += self.step
+        return self.now
+
+
+def test_budget_exhausted_skips_remaining_groups(monkeypatch):
+    rule_set = RegexRuleSet([(i, "servo", rf"E{i}\d") for i in range(4)], group_size=1)
+    before = regex_stats.stats()
+
+    assert rule_set.match("E01 E31", budget_ms=0) == []
+    after = regex_stats.stats()
+    assert after["budget_exhausted"] == before["budget_exhausted"] + 1
+    assert after["skipped_groups"] == before["skipped_groups"] + 4
+
+    # 每次读时钟耗去 8ms，20ms 预算只够扫描前两组；已完成部分的结果照常返回
+    monkeypatch.setattr(regex_rules, "time", SimpleNamespace(perf_counter=StepClock(0.008).perf_counter))
+    assert rule_set.match("E01 E31", budget_ms=20) == [(0, "E01")]
+    assert regex_stats.stats()["skipped_groups"] == after["skipped_groups"] + 2
+
+
+def test_search_timeout_is_counted(monkeypatch):
+    rule_set = RegexRuleSet([(0, "servo", r"E\d+"), (1, "servo", r"AL\d+")], group_size=1)
+    search = RegexRuleSet._search
+
+    def slow_second_group(source, text, remaining):
+        # 模拟 regex 包在超时后中断单个失控的匹配
+        if source == rule_set.groups[1].combined:
+            raise TimeoutError
+        return search(source, text, remaining)
+
+    monkeypatch.setattr(RegexRuleSet, "_search", staticmethod(slow_second_group))
+    before = regex_stats.stats()
+
+    assert rule_set.match("E201 AL5") == [(0, "E201")]
+    after = regex_stats.stats()
+    assert after["timeouts"] == before["timeouts"] + 1
+    assert after["budget_exhausted"] == before["budget_exhausted"] + 1
+    assert after["skipped_groups"] == before["skipped_groups"] + 1
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.core.config import settings
+from backend.app.services import session_context
+from backend.app.services.session_context import MemorySessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_context, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """每个用例使用独立的会话存储，不受其他用例的会话影响"""
+    store = MemorySessionStore(ttl=60, max_sessions=100, max_bytes=1 << 20)
+    monkeypatch.setattr(session_context, "session_store", store)
+    return store
+
+
+@pytest.fixture
+def servo_rule(client, entity_system):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+
+
+def _recognize(client, text, session_id):
+    resp = client.post("/api/v1/intent-recognition/", json={"text": text, "context": {"session_id": session_id}})
+    assert resp.status_code == 200
+    return resp.json()["data"]
+
+
+def _entities(data):
+    return [(e["item_code"], e["from_context"]) for e in data["extracted_entities"]]
+
+
+def test_session_carries_intent_and_entities(client, servo_rule, store):
+    first = _recognize(client, "伺服 SV660A 怎么调", "s1")
+    assert first["intent"] == "伺服" and _entities(first) == [("sv660a", False)]
+
+    # 本轮只匹配到意图，实体由上一轮补全
+    second = _recognize(client, "伺服报警", "s1")
+    assert _entities(second) == [("sv660a", True)]
+
+    # 本轮只说了型号，意图沿用上一轮，同类型实体以本轮为准
+    third = _recognize(client, "SV660N", "s1")
+    assert third["intent"] == "伺服" and third["intent_from_context"]
+    assert _entities(third) == [("sv660n", False)]
+    assert store.get("s1")["turns"] == 3
+
+    # 其他会话和不带会话的请求不受影响
+    assert not _recognize(client, "SV660N", "s2")["intent_from_context"]
+    resp = client.post("/api/v1/intent-recognition/", json={"text": "SV660N"})
+    assert resp.json()["data"]["intent_from_context"] is False
+
+
+def test_session_expires_after_ttl(client, servo_rule, store, clock):
+    _recognize(client, "伺服 SV660A", "s1")
+    clock.now += 59
+    assert _recognize(client, "SV660N", "s1")["intent_from_context"]
+
+    # 过期时间从最近一次写入算起
+    clock.now += 61
+    data = _recognize(client, "SV660N", "s1")
+    assert not data["intent_from_context"] and data["matched_rules"] == []
+    assert store.get("s1")["turns"] == 1
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemorySessionStore(ttl=60, max_sessions=2, max_bytes=1 << 20)
+    store.set("a", {"turns": 1})
+    store.set("b", {"turns": 1})
+    assert store.get("a") is not None
+    store.set("c", {"turns": 1})
+
+    assert store.get("b") is None and store.get("a") is not None
+    assert store.stats()["sessions"] == 2 and store.evictions == 1
+
+    # 过期的会话先被清理，不计入淘汰
+    clock.now += 61
+    store.set("d", {"turns": 1})
+    assert store.stats()["sessions"] == 1 and store.evictions == 1
+
+
+def test_memory_store_respects_byte_limit():
+    store = MemorySessionStore(ttl=60, max_sessions=100, max_bytes=1000)
+    for i in range(10):
+        store.set(f"s{i}", {"entities": ["x" * 100]})
+    stats = store.stats()
+    assert stats["estimated_bytes"] <= 1000 and stats["sessions"] < 10
+    assert store.get("s9") is not None
+
+
+def test_invalid_session_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_CONTEXT_BACKEND", "memcached")
+    with pytest.raises(ValueError, match="SESSION_CONTEXT_BACKEND"):
+        session_context.create_session_store()
+
+    monkeypatch.setattr(settings, "SESSION_CONTEXT_ENABLED", False)
+    assert session_context.create_session_store() is None
+    assert session_context.create_isolated_store() is None
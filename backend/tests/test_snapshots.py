@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+
+from backend.app.core.config import settings
+from backend.app.core.schemas import IntentRuleCreate, IntentRuleUpdate
+from backend.app.models import RecognitionSnapshot
+from backend.app.services.intent_rule_service import IntentRuleService
+from backend.app.services.recognition_bundle import RecognitionBundleManager, SnapshotError
+from backend.app.services.snapshot_service import SnapshotService
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RECOGNITION_PUBLISH_MODE", "manual")
+    return RecognitionBundleManager(tmp_path, snapshot_keep=5)
+
+
+def _add_rule(db, code: str, keyword: str) -> None:
+    IntentRuleService(db).create(IntentRuleCreate(
+        rule_code=code, rule_type="keyword", rule_entity=keyword, label_code="servo",
+    ))
+
+
+def _matched(manager, db, text: str):
+    return [m["rule_code"] for m in manager.get(db).match_rules(text)]
+
+
+def _unpublished(db) -> bool:
+    return SnapshotService(db).draft_status()["has_unpublished_changes"]
+
+
+def test_edits_take_effect_only_after_publish(db, entity_system, manager):
+    _add_rule(db, "r1", "伺服报警")
+    first = manager.publish(db, "first")
+    assert first.version == "v1"
+    assert _matched(manager, db, "伺服报警") == ["r1"]
+
+    _add_rule(db, "r2", "编码器故障")
+    assert _matched(manager, db, "编码器故障") == []
+
+    second = manager.publish(db, "second")
+    assert second.version == "v2"
+    assert _matched(manager, db, "编码器故障") == ["r2"]
+
+
+def test_rollback_restores_previous_snapshot(db, entity_system, manager):
+    _add_rule(db, "r1", "伺服报警")
+    manager.publish(db)
+    _add_rule(db, "r2", "编码器故障")
+    manager.publish(db)
+
+    snapshot = manager.rollback(db, "v1")
+    assert snapshot.is_current
+    assert manager.current_snapshot(db).version == "v1"
+    assert _matched(manager, db, "编码器故障") == []
+    # 回滚不影响草稿
+    assert _unpublished(db)
+
+    with pytest.raises(SnapshotError):
+        manager.rollback(db, "v9")
+
+
+def test_draft_status_detects_every_edit(db, entity_system, manager):
+    _add_rule(db, "r1", "伺服报警")
+    manager.publish(db)
+    assert not _unpublished(db)
+
+    # 与发布在同一秒内的修改
+    IntentRuleService(db).update("r1", IntentRuleUpdate(rule_entity="伺服过载"))
+    assert _unpublished(db)
+    manager.publish(db)
+    assert not _unpublished(db)
+
+    # 删除一行再新增一行，行数不变
+    IntentRuleService(db).delete("r1")
+    _add_rule(db, "r0", "伺服过载")
+    assert _unpublished(db)
+
+
+def test_publish_by_other_process_is_picked_up(db, entity_system, manager, monkeypatch):
+    _add_rule(db, "r1", "伺服报警")
+    manager.publish(db)
+    _add_rule(db, "r2", "编码器故障")
+    manager.publish(db)
+    manager.rollback(db, "v1")
+    assert _matched(manager, db, "编码器故障") == []
+
+    # 其他进程把 v2 设为当前快照: 直接改数据库，本进程的缓存版本号不变
+    db.query(RecognitionSnapshot).update({"is_current": False})
+    db.query(RecognitionSnapshot).filter(RecognitionSnapshot.version == "v2").update(
+        {"is_current": True, "activated_at": datetime.now()}
+    )
+    db.commit()
+
+    monkeypatch.setattr(settings, "RECOGNITION_VERSION_CHECK_INTERVAL", 3600)
+    assert _matched(manager, db, "编码器故障") == []
+    monkeypatch.setattr(settings, "RECOGNITION_VERSION_CHECK_INTERVAL", 0)
+    assert _matched(manager, db, "编码器故障") == ["r2"]
+
+
+def test_first_use_publishes_initial_snapshot(db, entity_system, manager):
+    _add_rule(db, "r1", "伺服报警")
+    assert _matched(manager, db, "伺服报警") == ["r1"]
+    current = manager.current_snapshot(db)
+    assert current.note == "初始快照"
+
+
+def test_auto_mode_recompiles_in_background(db, entity_system, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RECOGNITION_PUBLISH_MODE", "auto")
+    manager = RecognitionBundleManager(tmp_path)
+    assert _matched(manager, db, "伺服报警") == []
+    _add_rule(db, "r1", "伺服报警")
+    # 编译期间继续使用上一个数据包
+    assert _matched(manager, db, "伺服报警") == []
+    manager.wait_for_compile(timeout=10)
+    assert _matched(manager, db, "伺服报警") == ["r1"]
+    assert manager.current_snapshot(db) is None
@@ -0,0 +1,101 @@
+from backend.app.core.schemas import IntentRuleCreate
+from backend.app.models import IntentRule, Item, ItemSynonym, Label
+from backend.app.services.change_log import change_log
+from backend.app.services.intent_rule_service import IntentRuleService
+from backend.app.utils import subtree
+
+
+def _feed(db, since=0):
+    return [(c["namespace"], c["key"], c["operation"]) for c in change_log.changes_since(db, since, 100)["changes"]]
+
+
+def test_move_label_subtree_recomputes_levels(client, db, entity_system):
+    response = client.post("/api/v1/labels/servo/move", json={"new_parent_code": "inverter"})
+    assert response.status_code == 200
+    assert response.json()["data"]["level_delta"] == 1
+    db.expire_all()
+    servo = db.query(Label).filter_by(label_code="servo").one()
+    assert (servo.parent_label_code, servo.level) == ("inverter", 3)
+    assert _feed(db) == [("labels", "servo", "upsert")]
+
+    cycle = client.post("/api/v1/labels/product_root/move", json={"new_parent_code": "servo"})
+    assert cycle.status_code == 400
+
+
+def test_copy_item_subtree(client, db, entity_system):
+    db.add(ItemSynonym(item_code="sv660a", synonym="660A"))
+    db.commit()
+    response = client.post("/api/v1/items/sv660/copy", json={"code_prefix": "copy_"})
+    assert response.status_code == 200
+    assert response.json()["data"]["items"] == 3
+
+    copies = {item.item_code: item for item in db.query(Item).filter(Item.item_code.like("copy_%"))}
+    assert set(copies) == {"copy_sv660", "copy_sv660a", "copy_sv660n"}
+    assert copies["copy_sv660"].parent_item_code is None
+    assert copies["copy_sv660a"].parent_item_code == "copy_sv660"
+    assert not any(item.is_active for item in copies.values())
+    assert [s.synonym for s in copies["copy_sv660a"].synonyms] == ["660A"]
+
+    again = client.post("/api/v1/items/sv660/copy", json={"code_prefix": "copy_"})
+    assert again.status_code == 400
+
+
+def test_hard_delete_label_subtree(client, db, entity_system):
+    db.add(Item(item_name="MD500", item_code="md500", label_code="inverter", parent_item_code="sv660"))
+    db.commit()
+    IntentRuleService(db).create(IntentRuleCreate(
+        rule_code="r1", rule_type="keyword", rule_entity="伺服", label_code="servo",
+    ))
+    since = change_log.latest_seq(db)
+
+    response = client.delete("/api/v1/labels/servo/subtree")
+    assert response.status_code == 200
+    assert response.json()["data"] == {"label_code": "servo", "labels": 1, "items": 3, "rules": 1, "hard": True}
+
+    db.expire_all()
+    assert db.query(Label).filter_by(label_code="servo").first() is None
+    assert db.query(Item).filter(Item.label_code == "servo").count() == 0
+    assert db.query(IntentRule).count() == 0
+    # 子树外指向被删实体的引用被置空
+    assert db.query(Item).filter_by(item_code="md500").one().parent_item_code is None
+
+    assert sorted(_feed(db, since)) == [
+        ("intent_rules", "r1", "delete"),
+        ("items", "md500", "upsert"),
+        ("items", "sv660", "delete"),
+        ("items", "sv660a", "delete"),
+        ("items", "sv660n", "delete"),
+        ("labels", "servo", "delete"),
+    ]
+
+
+def test_soft_delete_label_subtree_deactivates_items_and_rules(client, db, entity_system):
+    IntentRuleService(db).create(IntentRuleCreate(
+        rule_code="r1", rule_type="keyword", rule_entity="伺服", label_code="servo",
+    ))
+    since = change_log.latest_seq(db)
+
+    response = client.delete("/api/v1/labels/product_root/subtree", params={"hard": False})
+    assert response.status_code == 200
+    assert response.json()["data"] == {"label_code": "product_root", "labels": 3, "items": 3, "rules": 1, "hard": False}
+
+    db.expire_all()
+    assert db.query(Label).count() == 3
+    assert db.query(Item).filter(Item.is_active == True).count() == 0
+    assert db.query(IntentRule).one().is_active is False
+    assert {op for _, _, op in _feed(db, since)} == {"upsert"}
+
+
+def test_depth_cap_raises_instead_of_truncating(client, db, entity_system, monkeypatch):
+    monkeypatch.setattr(subtree, "MAX_DEPTH", 1)
+    # sv660 -> sv660a/sv660n 只有一层子节点，不受影响
+    assert client.delete("/api/v1/items/sv660/subtree").status_code == 200
+
+    # product_root -> servo -> servo_sub 有两层子节点，整体拒绝而不是只删前两层
+    db.add(Label(label_name="伺服子类", label_code="servo_sub", parent_label_code="servo", system_code="product", level=3))
+    db.commit()
+    response = client.delete("/api/v1/labels/product_root/subtree")
+    assert response.status_code == 400
+    assert "deeper than 1 levels" in response.json()["detail"]
+    db.expire_all()
+    assert db.query(Label).count() == 4
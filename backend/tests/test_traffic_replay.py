@@ -0,0 +1,26 @@
+from backend.app.services import session_context
+from backend.app.services.session_context import MemorySessionStore
+from backend.app.services.traffic_replay import TrafficReplayer
+
+
+def test_replay_uses_isolated_session_store(client, entity_system, monkeypatch):
+    rule = {"rule_code": "r1", "rule_type": "keyword", "rule_entity": "伺服", "label_code": "servo"}
+    assert client.post("/api/v1/intent-rules/", json=rule).status_code == 200
+
+    live = MemorySessionStore(ttl=60, max_sessions=100, max_bytes=1 << 20)
+    live_state = {"label_code": "inverter", "intent": "变频器", "confidence": 1.0, "entities": [], "turns": 3}
+    live.set("s1", live_state)
+    monkeypatch.setattr(session_context, "session_store", live)
+
+    records = [
+        (1, {"text": "伺服怎么调", "context": {"session_id": "s1"}}),
+        (2, {"text": "SV660A", "context": {"session_id": "s1"}}),
+    ]
+    replayer = TrafficReplayer()
+    report = replayer.run(records)
+
+    assert report["total"] == 2 and report["errors"] == 0
+    assert live.get("s1") == live_state and live.stats()["sessions"] == 1
+    # 第二轮从回放自己的会话状态沿用意图，而不是线上的 inverter
+    replayed = replayer.session_store.get("s1")
+    assert replayed["label_code"] == "servo" and replayed["turns"] == 2
@@ -0,0 +1,40 @@
+from backend.app.core.config import settings
+from backend.app.services.warmup import WarmupState
+
+
+def _flaky(failures: int):
+    calls = {"n": 0}
+
+    def phase() -> dict:
+        calls["n"] += 1
+        if calls["n"] <= failures:
+            raise RuntimeError("database unavailable")
+        return {"calls": calls["n"]}
+    return phase
+
+
+def test_failed_phase_is_retried_until_ready(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_RETRY_INITIAL_DELAY", 0.01)
+    state = WarmupState([("ok", lambda: {}), ("flaky", _flaky(2))])
+
+    assert not state.run_once()
+    assert state.report()["status"] == "retrying"
+    assert state.results["flaky"]["status"] == "failed"
+
+    state.start()
+    state._thread.join(5)
+    assert state.ready
+    assert state.report()["status"] == "ready"
+    assert state.results["flaky"]["attempts"] == 3
+    # 已成功的阶段不重复执行
+    assert state.results["ok"]["attempts"] == 1
+
+
+def test_stop_interrupts_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_RETRY_INITIAL_DELAY", 30)
+    state = WarmupState([("broken", _flaky(100))])
+    state.start()
+    state.stop()
+    state._thread.join(5)
+    assert not state._thread.is_alive()
+    assert not state.ready
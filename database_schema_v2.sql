@@ -78,3 +78,50 @@ CREATE TABLE intent_rules (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     FOREIGN KEY (label_code) REFERENCES labels(label_code) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='意图规则表';
+
+-- 6. 识别统计汇总表 (recognition_stats)
+-- 识别服务在内存中计数，定期累加到 (时间桶, 维度, 键) 唯一的行上，超过保留天数的时间桶定期删除
+CREATE TABLE recognition_stats (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '主键ID',
+    bucket_start DATETIME NOT NULL COMMENT '时间桶起始时间',
+    dimension VARCHAR(20) NOT NULL COMMENT '统计维度 (request, label, rule, unrecognized, latency)',
+    stat_key VARCHAR(200) NOT NULL DEFAULT '' COMMENT '统计键 (规则编码/标签编码/未识别文本/耗时桶上界)',
+    hit_count INT NOT NULL DEFAULT 0 COMMENT '计数',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '写入时间',
+    UNIQUE KEY uq_recognition_stats_key (bucket_start, dimension, stat_key),
+    INDEX ix_recognition_stats_dimension_bucket (dimension, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='识别统计汇总表';
+
+-- 7. 识别快照表 (recognition_snapshots)
+-- 每次发布把当前规则/实体数据（草稿）编译为一个不可变的识别数据包，识别只读取当前快照；保留最近若干个快照用于回滚
+CREATE TABLE recognition_snapshots (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '主键ID',
+    version VARCHAR(50) NOT NULL UNIQUE COMMENT '快照版本号',
+    fingerprint VARCHAR(64) NOT NULL COMMENT '发布时草稿数据的版本 (变更序号，如 r42)，用于判断是否有未发布的修改',
+    file_path VARCHAR(500) NOT NULL COMMENT '识别数据包文件路径',
+    counts TEXT COMMENT '规则/实体/标签数量 (JSON)',
+    note VARCHAR(500) COMMENT '发布说明',
+    status VARCHAR(20) NOT NULL DEFAULT 'active' COMMENT '状态 (active: 可回滚; expired: 已超出保留数量，文件已删除)',
+    is_current BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否为识别当前使用的快照',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '发布时间',
+    activated_at TIMESTAMP NULL COMMENT '最近一次成为当前快照的时间 (发布或回滚)'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='识别快照表';
+
+-- 8. 变更日志表 (change_log)
+-- 标签体系、标签、实体、意图规则的每次写操作在同一事务中记入一条或多条变更，供下游镜像按序号增量同步
+CREATE TABLE change_log (
+    seq BIGINT PRIMARY KEY COMMENT '变更序号 (按提交顺序单调递增)',
+    namespace VARCHAR(50) NOT NULL COMMENT '命名空间 (tag_systems, labels, items, intent_rules)',
+    entity_key VARCHAR(100) COMMENT '业务编码 (批量变更为空)',
+    operation VARCHAR(10) NOT NULL COMMENT '操作 (upsert, delete, bulk)',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '记录时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='变更日志表';
+
+-- 9. 变更序号计数器 (change_sequence)
+-- 单行计数器，写变更日志时先更新该行，行锁保证序号顺序与提交顺序一致
+CREATE TABLE change_sequence (
+    id INT PRIMARY KEY COMMENT '固定为 1',
+    last_seq BIGINT NOT NULL DEFAULT 0 COMMENT '最近分配的变更序号'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='变更序号计数器';
+
+INSERT INTO change_sequence (id, last_seq) VALUES (1, 0);
@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 import uvicorn
@@ -5,15 +6,46 @@ import uvicorn
 def main():
     backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
 
+    from backend.app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="启动 FastAPI 服务")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS,
+                        help="worker 数量；大于 1 时为生产模式 (主进程预加载后 fork，不自动重载)")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--max-requests", type=int, default=settings.WORKER_MAX_REQUESTS,
+                        help="每个 worker 处理多少请求后优雅重启 (0: 不重启)")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.WORKER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.WORKER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--no-preload", action="store_true", help="不在主进程中预加载 (每个 worker 各自预热)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        from backend.app.core.prefork import PreforkServer
+
+        print(f"🚀 准备以生产模式启动 FastAPI 服务 ({args.workers} 个 worker)...")
+        print("🔄 kill -HUP <主进程> 可滚动重启全部 worker")
+        return PreforkServer(
+            "backend.app.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            graceful_timeout=args.graceful_timeout,
+            preload=not args.no_preload,
+        ).run()
+
     print("🚀 准备启动 FastAPI 服务...")
     
     uvicorn.run(
         "backend.app.main:app", 
-        host="0.0.0.0", 
-        port=8000,
+        host=args.host, 
+        port=args.port,
         reload=True,
         reload_dirs=[backend_path]
     )
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -2,6 +2,7 @@
 """
 标签体系管理系统后端启动脚本
 """
+import argparse
 import os
 import sys
 import subprocess
@@ -9,6 +10,11 @@ from pathlib import Path
 
 def main():
     """启动后端服务"""
+    parser = argparse.ArgumentParser(description="启动标签体系管理系统后端服务")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker 数量；大于 1 时为生产模式 (预加载 + fork，不自动重载)")
+    args = parser.parse_args()
+
     # 获取项目根目录
     project_root = Path(__file__).parent
     backend_dir = project_root / "backend"
@@ -33,14 +39,20 @@ def main():
     print("📚 API文档: http://localhost:8000/docs")
     print("🛑 按 Ctrl+C 停止服务")
     
-    try:
-        subprocess.run([
+    if args.workers > 1:
+        # 生产模式由 run.py 中的 prefork 启动器负责
+        command = [sys.executable, str(project_root / "run.py"), "--workers", str(args.workers)]
+    else:
+        command = [
             sys.executable, "-m", "uvicorn", 
             "backend.app.main:app", 
             "--reload", 
             "--host", "0.0.0.0", 
             "--port", "8000"
-        ])
+        ]
+    
+    try:
+        subprocess.run(command)
     except KeyboardInterrupt:
         print("\n👋 服务已停止")
         return 0